@@ -0,0 +1,530 @@
+# Objective: score the whole catalogue of booster packs with a few array operations, so that it can be re-run cheaply
+#            after every refresh of market orders.
+#
+# The engine holds aligned arrays (one entry per badge) of gem price, sell price, bid, ask and volumes.
+#
+# NB: prices are integer numbers of cents, so that comparisons are exact.
+
+import numpy as np
+
+from listing_catalogue import get_app_id
+from sack_of_gems import get_num_gems_per_sack_of_gems
+from transaction_fee import compute_seller_prices_in_cents
+
+
+def build_badge_arrays(
+    badge_data: dict[int | str, dict],
+    market_order_dict: dict[str, dict] = None,
+) -> dict[str, list | np.ndarray]:
+    if market_order_dict is None:
+        market_order_dict = {}
+
+    app_ids = list(badge_data.keys())
+    listing_hashes = [badge_data[app_id]['listing_hash'] for app_id in app_ids]
+
+    # NB: the gem price is missing for dummy badge data (profile backgrounds and emoticons).
+    has_gem_price = np.array(
+        ['gem_price' in badge_data[app_id] for app_id in app_ids],
+        dtype=bool,
+    )
+    gem_prices = np.array(
+        [badge_data[app_id].get('gem_price', 0) for app_id in app_ids],
+        dtype=np.int64,
+    )
+    sell_prices = np.array(
+        [badge_data[app_id]['sell_price'] for app_id in app_ids],
+        dtype=np.int64,
+    )
+
+    # NB: the market orders are missing if they were not retrieved, hence -1, as for a failed query.
+    missing_market_order = {'bid': -1, 'ask': -1, 'bid_volume': -1, 'ask_volume': -1}
+    market_orders = [
+        market_order_dict.get(listing_hash, missing_market_order)
+        for listing_hash in listing_hashes
+    ]
+
+    badge_arrays = {
+        'app_id': app_ids,
+        'listing_hash': listing_hashes,
+        'has_gem_price': has_gem_price,
+        'gem_price': gem_prices,
+        'sell_price': sell_prices,
+        'has_market_order': np.array(
+            [listing_hash in market_order_dict for listing_hash in listing_hashes],
+            dtype=bool,
+        ),
+    }
+
+    # NB: the prices of market orders are stored as integer numbers of cents, like every other price.
+    for field in ['bid', 'ask', 'bid_volume', 'ask_volume']:
+        badge_arrays[field] = np.array(
+            [market_order[field] for market_order in market_orders],
+            dtype=np.int64,
+        )
+
+    return badge_arrays
+
+
+def compute_arbitrage_mask(badge_arrays: dict[str, list | np.ndarray]) -> dict[str, np.ndarray]:
+    # Sell a pack to the highest buy order (bid, fee excluded) for more than the cost to craft it (gem price).
+    bids_without_fee = compute_seller_prices_in_cents(badge_arrays['bid'])
+
+    deltas = bids_without_fee - badge_arrays['gem_price']
+
+    is_an_arbitrage = badge_arrays['has_gem_price'] & (badge_arrays['bid'] >= 0) & (deltas > 0)
+
+    # Rank arbitrages by decreasing profit. NB: the sort is stable, so ties keep the order of the badge data.
+    ranking = np.flatnonzero(is_an_arbitrage)
+    ranking = ranking[np.argsort(-deltas[ranking], kind='stable')]
+
+    scores = {
+        'bid_without_fee': bids_without_fee,
+        'delta': deltas,
+        'is_an_arbitrage': is_an_arbitrage,
+        'ranking': ranking,
+    }
+
+    return scores
+
+
+def compute_low_sell_price_mask(
+    badge_arrays: dict[str, list | np.ndarray],
+    user_chosen_price_threshold: int = None,  # in cents
+) -> dict[str, np.ndarray]:
+    # The bid is necessarily lower than the ask, so there cannot be any arbitrage if the ask (fee excluded) is lower
+    # than the price threshold.
+    sell_prices = badge_arrays['sell_price']
+
+    if user_chosen_price_threshold is None:
+        price_thresholds = badge_arrays['gem_price']
+
+        if not badge_arrays['has_gem_price'].all():
+            raise AssertionError()
+    else:
+        price_thresholds = np.full(len(sell_prices), user_chosen_price_threshold)
+
+    sell_price_is_unknown = sell_prices <= 0
+
+    an_arbitrage_might_exist = price_thresholds < compute_seller_prices_in_cents(sell_prices)
+
+    masks = {
+        'sell_price_is_unknown': sell_price_is_unknown,
+        'an_arbitrage_might_exist': an_arbitrage_might_exist,
+        'is_kept': sell_price_is_unknown | an_arbitrage_might_exist,
+    }
+
+    return masks
+
+
+def compute_gem_prices_in_cents(
+    gem_amounts: np.ndarray,
+    sack_of_gems_price_in_cents: int,
+    num_gems_per_sack_of_gems: int,
+) -> np.ndarray:
+    # The cost of the gems required to craft each pack, rounded up to the cent, as in aggregate_badge_data().
+    gem_prices = -(-gem_amounts * sack_of_gems_price_in_cents // num_gems_per_sack_of_gems)
+
+    return gem_prices
+
+
+def compute_break_even_sack_prices_in_cents(
+    gem_amounts: np.ndarray,
+    bids_without_fee: np.ndarray,
+    num_gems_per_sack_of_gems: int,
+) -> np.ndarray:
+    # The highest price of a sack of gems (in cents) for which crafting a pack, then selling it to the highest buy
+    # order, is profitable. With integer cents:
+    #       ceil(gem_amount * p / num_gems) < bid  <=>  p <= floor(num_gems * (bid - 1) / gem_amount)
+    #
+    # NB: the value is -1 for packs which can never be profitable, e.g. without any buy order.
+
+    has_valid_gem_amount = gem_amounts > 0
+
+    break_even_sack_prices = np.full(len(gem_amounts), -1, dtype=np.int64)
+
+    break_even_sack_prices[has_valid_gem_amount] = (
+        num_gems_per_sack_of_gems
+        * (bids_without_fee[has_valid_gem_amount] - 1)
+        // gem_amounts[has_valid_gem_amount]
+    )
+
+    break_even_sack_prices = np.maximum(break_even_sack_prices, -1)
+
+    return break_even_sack_prices
+
+
+def build_arbitrage_state(
+    badge_data: dict[int | str, dict],
+    market_order_dict: dict[str, dict],
+    sack_of_gems_price_in_cents: int,
+    num_gems_per_sack_of_gems: int = None,
+) -> dict[str, object]:
+    # Objective: keep the arbitrage state as gem amounts plus a single parameter (the price of a sack of gems), so that
+    # a new gem price re-ranks the catalogue without going through file parsing and aggregation again.
+
+    if num_gems_per_sack_of_gems is None:
+        num_gems_per_sack_of_gems = get_num_gems_per_sack_of_gems()
+
+    state = build_badge_arrays(badge_data, market_order_dict)
+    state['position'] = {listing_hash: i for i, listing_hash in enumerate(state['listing_hash'])}
+
+    # NB: the gem amount is missing for dummy badge data (profile backgrounds and emoticons), hence 0, never profitable.
+    state['gem_amount'] = np.array(
+        [badge_data[app_id].get('gem_amount') or 0 for app_id in state['app_id']],
+        dtype=np.int64,
+    )
+    state['num_gems_per_sack_of_gems'] = num_gems_per_sack_of_gems
+
+    bids_without_fee = compute_seller_prices_in_cents(state['bid'])
+    bids_without_fee[state['bid'] < 0] = -1
+    state['bid_without_fee'] = bids_without_fee
+
+    state['break_even_sack_price'] = compute_break_even_sack_prices_in_cents(
+        state['gem_amount'],
+        bids_without_fee,
+        num_gems_per_sack_of_gems,
+    )
+
+    # Sorted index of break-even prices: the packs which are profitable for a sack price p are the suffix of the index
+    # with break-even prices greater than or equal to p.
+    state['break_even_order'] = np.argsort(state['break_even_sack_price'], kind='stable')
+    state['sorted_break_even_sack_price'] = state['break_even_sack_price'][state['break_even_order']]
+
+    state['is_an_arbitrage'] = np.zeros(len(state['app_id']), dtype=bool)
+    state['sack_of_gems_price'] = None
+
+    update_arbitrage_state(state, sack_of_gems_price_in_cents)
+
+    return state
+
+
+def update_arbitrage_state(
+    state: dict[str, object],
+    sack_of_gems_price_in_cents: int,
+) -> np.ndarray:
+    # Objective: update the state for a new price of a sack of gems (in cents).
+    #
+    # Only the packs with a break-even price between the previous price and the new price cross the profitability
+    # threshold. They are found with two binary searches in the sorted index. Return their positions.
+
+    sorted_break_even_sack_prices = state['sorted_break_even_sack_price']
+
+    new_start = np.searchsorted(
+        sorted_break_even_sack_prices,
+        sack_of_gems_price_in_cents,
+        side='left',
+    )
+
+    if state['sack_of_gems_price'] is None:
+        crossing_positions = state['break_even_order'][new_start:]
+        state['is_an_arbitrage'][crossing_positions] = True
+    else:
+        previous_start = np.searchsorted(
+            sorted_break_even_sack_prices,
+            state['sack_of_gems_price'],
+            side='left',
+        )
+
+        lower, upper = sorted([previous_start, new_start])
+        crossing_positions = state['break_even_order'][lower:upper]
+
+        # A cheaper sack turns packs into arbitrages, a more expensive sack turns arbitrages into losses.
+        state['is_an_arbitrage'][crossing_positions] = bool(new_start < previous_start)
+
+    state['sack_of_gems_price'] = sack_of_gems_price_in_cents
+
+    state['gem_price'] = compute_gem_prices_in_cents(
+        state['gem_amount'],
+        sack_of_gems_price_in_cents,
+        state['num_gems_per_sack_of_gems'],
+    )
+
+    return crossing_positions
+
+
+def update_market_orders_in_arbitrage_state(
+    state: dict[str, object],
+    market_order_dict: dict[str, dict],
+) -> np.ndarray:
+    # Objective: update the state with the order books which were downloaded again, e.g. right before crafting.
+    #
+    # Only the packs with a new bid are moved in the sorted index of break-even prices. Return their positions.
+
+    positions = np.array(
+        [state['position'][listing_hash] for listing_hash in market_order_dict if listing_hash in state['position']],
+        dtype=np.int64,
+    )
+
+    if len(positions) == 0:
+        return positions
+
+    bids = np.array(
+        [market_order_dict[state['listing_hash'][i]]['bid'] for i in positions],
+        dtype=np.int64,
+    )
+
+    bids_without_fee = compute_seller_prices_in_cents(bids)
+    bids_without_fee[bids < 0] = -1
+
+    state['bid'][positions] = bids
+    state['bid_without_fee'][positions] = bids_without_fee
+    state['has_market_order'][positions] = True
+    state['break_even_sack_price'][positions] = compute_break_even_sack_prices_in_cents(
+        state['gem_amount'][positions],
+        bids_without_fee,
+        state['num_gems_per_sack_of_gems'],
+    )
+
+    # Remove the packs from the sorted index, then insert them back at their new break-even price.
+    is_kept = ~np.isin(state['break_even_order'], positions)
+    break_even_order = state['break_even_order'][is_kept]
+    sorted_break_even_sack_prices = state['sorted_break_even_sack_price'][is_kept]
+
+    new_break_even_sack_prices = state['break_even_sack_price'][positions]
+    new_order = np.argsort(new_break_even_sack_prices, kind='stable')
+
+    insertion_points = np.searchsorted(
+        sorted_break_even_sack_prices,
+        new_break_even_sack_prices[new_order],
+        side='left',
+    )
+
+    state['break_even_order'] = np.insert(break_even_order, insertion_points, positions[new_order])
+    state['sorted_break_even_sack_price'] = np.insert(
+        sorted_break_even_sack_prices,
+        insertion_points,
+        new_break_even_sack_prices[new_order],
+    )
+
+    state['is_an_arbitrage'][positions] = state['break_even_sack_price'][positions] >= state['sack_of_gems_price']
+
+    return positions
+
+
+def get_gem_price_from_arbitrage_state(state: dict[str, object], listing_hash: str) -> int:
+    # The cost of the gems required to craft a pack, at the price of a sack of gems of the state (in cents).
+    gem_price = int(state['gem_price'][state['position'][listing_hash]])
+
+    return gem_price
+
+
+def rank_arbitrages(state: dict[str, object]) -> list[tuple[str, int]]:
+    # Return the (listing hash, profit in cents) of the arbitrages, ranked by decreasing profit.
+
+    positions = np.flatnonzero(state['is_an_arbitrage'])
+
+    profits = state['bid_without_fee'][positions] - state['gem_price'][positions]
+
+    ranking = positions[np.argsort(-profits, kind='stable')]
+
+    ranked_arbitrages = [
+        (state['listing_hash'][i], int(state['bid_without_fee'][i] - state['gem_price'][i]))
+        for i in ranking
+    ]
+
+    return ranked_arbitrages
+
+
+def sweep_sack_of_gems_prices(
+    state: dict[str, object],
+    sack_of_gems_prices_in_cents: list[int] | np.ndarray,
+) -> dict[str, np.ndarray]:
+    # Objective: from one market snapshot, compute the profit curve of every pack over a grid of prices of a sack of
+    # gems, in one vectorized pass, to choose how many gems to buy and at what price.
+    #
+    # NB: the profit of a pack is counted if the pack is an arbitrage, i.e. if the sack price is at most its break-even.
+
+    sack_prices = np.asarray(sack_of_gems_prices_in_cents, dtype=np.int64)
+
+    # Shape: (num_sack_prices, num_packs)
+    gem_prices = -(
+        -state['gem_amount'][np.newaxis, :]
+        * sack_prices[:, np.newaxis]
+        // state['num_gems_per_sack_of_gems']
+    )
+    is_an_arbitrage = state['break_even_sack_price'][np.newaxis, :] >= sack_prices[:, np.newaxis]
+
+    profits = np.where(
+        is_an_arbitrage,
+        state['bid_without_fee'][np.newaxis, :] - gem_prices,
+        0,
+    )
+
+    num_gems_required = (is_an_arbitrage * state['gem_amount'][np.newaxis, :]).sum(axis=1)
+
+    sweep = {
+        'sack_of_gems_price': sack_prices,
+        'break_even_sack_price': state['break_even_sack_price'],
+        'profit': profits,
+        'num_profitable_packs': is_an_arbitrage.sum(axis=1),
+        'num_gems_required': num_gems_required,
+        'num_sacks_required': -(-num_gems_required // state['num_gems_per_sack_of_gems']),
+        'total_profit': profits.sum(axis=1),
+    }
+
+    return sweep
+
+
+def compute_depth_aware_profits(
+    buy_order_ladder: list[list[int]],
+    gem_price_in_cents: int,
+    max_quantity: int = None,
+) -> dict[str, int | np.ndarray]:
+    # Objective: size the sale of crafted packs with the depth of the buy orders, instead of the highest buy order only.
+    #
+    # The ladder is a list of [price in cents, cumulative quantity], by decreasing price, as in the buy order graph.
+    # The k-th pack is bought at the price of the first level whose cumulative quantity is at least k. The packs are all
+    # listed at a single price, so selling q packs requires the price of the q-th pack, and earns, for every pack, the
+    # difference between this price and the gem price:
+    #       profit(q) = q * (unit_seller_price[q] - gem_price)
+
+    if len(buy_order_ladder) == 0:
+        max_quantity = 0
+    elif max_quantity is None:
+        max_quantity = int(buy_order_ladder[-1][1])
+    else:
+        max_quantity = min(max_quantity, int(buy_order_ladder[-1][1]))
+
+    ladder_prices = np.array(
+        [level[0] for level in buy_order_ladder],
+        dtype=np.int64,
+    )
+    ladder_cumulative_quantities = np.array(
+        [level[1] for level in buy_order_ladder],
+        dtype=np.int64,
+    )
+
+    units = np.arange(1, max_quantity + 1, dtype=np.int64)
+    levels = np.searchsorted(ladder_cumulative_quantities, units, side='left')
+
+    unit_buyer_prices = ladder_prices[levels]
+    unit_seller_prices = compute_seller_prices_in_cents(unit_buyer_prices)
+    marginal_profits = unit_seller_prices - gem_price_in_cents
+    total_profits = units * marginal_profits
+
+    if len(total_profits) > 0 and total_profits.max() > 0:
+        optimal_quantity = int(np.argmax(total_profits)) + 1
+        optimal_profit = int(total_profits[optimal_quantity - 1])
+        # The lowest price to list at, so that every pack up to the optimal quantity is bought. The price without fee is
+        # the one to send to the sell API, as for 'bid_without_fee'.
+        optimal_price = int(unit_seller_prices[optimal_quantity - 1])
+        optimal_buyer_price = int(unit_buyer_prices[optimal_quantity - 1])
+    else:
+        optimal_quantity = 0
+        optimal_profit = 0
+        optimal_price = -1
+        optimal_buyer_price = -1
+
+    depth_aware_profits = {
+        'unit_buyer_price': unit_buyer_prices,
+        'unit_seller_price': unit_seller_prices,
+        'marginal_profit': marginal_profits,
+        'total_profit': total_profits,
+        'optimal_quantity': optimal_quantity,
+        'optimal_profit': optimal_profit,
+        'optimal_price': optimal_price,
+        'optimal_buyer_price': optimal_buyer_price,
+    }
+
+    return depth_aware_profits
+
+
+def build_foil_card_arrays(
+    listing_hashes: list[str],
+    all_listings: dict[str, dict],
+    all_goo_details: dict[int | str, int],
+    app_ids_with_unreliable_goo_details: list[int] = None,
+    app_ids_with_unknown_goo_value: list[int] = None,
+) -> dict[str, list | np.ndarray]:
+    # Aligned arrays (one entry per listing of a foil card) of ask, ask volume and goo value, with reliability flags.
+
+    if app_ids_with_unreliable_goo_details is None:
+        app_ids_with_unreliable_goo_details = []
+
+    if app_ids_with_unknown_goo_value is None:
+        app_ids_with_unknown_goo_value = []
+
+    app_ids = np.array(
+        [get_app_id(listing_hash) for listing_hash in listing_hashes],
+        dtype=np.int64,
+    )
+
+    # NB: the keys of the goo details are str, as in the dictionary loaded from disk.
+    goo_amounts = [all_goo_details.get(str(app_id)) for app_id in app_ids]
+
+    foil_card_arrays = {
+        'listing_hash': listing_hashes,
+        'app_id': app_ids,
+        'ask': np.array(
+            [all_listings[listing_hash]['sell_price'] for listing_hash in listing_hashes],
+            dtype=np.int64,
+        ),
+        'ask_volume': np.array(
+            [all_listings[listing_hash]['sell_listings'] for listing_hash in listing_hashes],
+            dtype=np.int64,
+        ),
+        'is_reliable': ~np.isin(app_ids, list(app_ids_with_unreliable_goo_details)),
+        'has_goo_value': ~np.isin(app_ids, list(app_ids_with_unknown_goo_value))
+        & np.array([goo_amount is not None for goo_amount in goo_amounts], dtype=bool),
+        'goo_amount': np.array(
+            [goo_amount or 0 for goo_amount in goo_amounts],
+            dtype=np.int64,
+        ),
+    }
+
+    return foil_card_arrays
+
+
+def score_foil_cards(
+    foil_card_arrays: dict[str, list | np.ndarray],
+    sack_of_gems_prices_in_cents: list[float] | np.ndarray,
+    num_gems_per_sack_of_gems: int = None,
+) -> dict[str, np.ndarray]:
+    # Objective: compute the profit of buying each foil card to turn it into gems, for a grid of prices of a sack of
+    # gems, in one vectorized pass. The profit is computed from the perspective of the buyer, i.e. fee included.
+    #
+    # NB: a listing is an arbitrage if its goo value is reliable and known, if its ask is positive, and if the value of
+    #     its gems is higher than its ask. Each appID is scored with its best listing.
+
+    if num_gems_per_sack_of_gems is None:
+        num_gems_per_sack_of_gems = get_num_gems_per_sack_of_gems()
+
+    sack_prices = np.asarray(sack_of_gems_prices_in_cents, dtype=float)
+
+    # Shape: (num_sack_prices, num_listings)
+    goo_values = (
+        foil_card_arrays['goo_amount'][np.newaxis, :]
+        / num_gems_per_sack_of_gems
+        * sack_prices[:, np.newaxis]
+    )
+    profits = goo_values - foil_card_arrays['ask'][np.newaxis, :]
+
+    is_scorable = (
+        foil_card_arrays['is_reliable']
+        & foil_card_arrays['has_goo_value']
+        & (foil_card_arrays['ask'] > 0)
+    )
+    is_an_arbitrage = is_scorable[np.newaxis, :] & (profits > 0)
+
+    # Shape: (num_sack_prices, num_app_ids)
+    app_ids, app_id_positions = np.unique(foil_card_arrays['app_id'], return_inverse=True)
+
+    best_profits_per_app_id = np.full((len(sack_prices), len(app_ids)), -np.inf)
+    np.maximum.at(
+        best_profits_per_app_id,
+        (slice(None), app_id_positions),
+        np.where(is_scorable[np.newaxis, :], profits, -np.inf),
+    )
+
+    scores = {
+        'sack_of_gems_price': sack_prices,
+        'is_scorable': is_scorable,
+        'goo_value': goo_values,
+        'profit': profits,
+        'is_an_arbitrage': is_an_arbitrage,
+        'num_arbitrages': is_an_arbitrage.sum(axis=1),
+        'app_id': app_ids,
+        'best_profit_per_app_id': best_profits_per_app_id,
+    }
+
+    return scores
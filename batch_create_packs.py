@@ -1,8 +1,15 @@
 # Create many booster packs (without being sure to sell them)
 
-from creation_time_utils import get_formatted_time, get_time_struct_from_str
+from creation_time_utils import (
+    build_cooldown_queue,
+    convert_epoch_to_time_struct,
+    get_formatted_time,
+    get_soonest_creation_epoch,
+    load_next_creation_epochs,
+)
 from inventory_utils import create_booster_pack, update_and_save_next_creation_times
 from market_arbitrage import get_filtered_badge_data
+from src.money_utils import format_price_in_cents
 
 
 def get_manually_selected_app_ids() -> list[int]:
@@ -76,9 +83,9 @@ def create_packs_for_app_ids(
 
         if verbose:
             print(
-                '{}\t{:.3f}€'.format(
+                '{}\t{}'.format(
                     filtered_badge_data[app_id]['name'],
-                    filtered_badge_data[app_id]['gem_price'],
+                    format_price_in_cents(filtered_badge_data[app_id]['gem_price']),
                 ),
             )
 
@@ -88,23 +95,23 @@ def create_packs_for_app_ids(
         ignored_app_ids = set(manually_selected_app_ids).difference(app_ids)
         print(f'There are {len(ignored_app_ids)} ignored appIDs: {ignored_app_ids}')
 
-        # Below, the parameter 'use_current_year' is toggled ON, because the year information is necessary to deal with
-        # February 29th during leap years.
-        next_creation_times_for_manually_selected_app_ids = [
-            get_time_struct_from_str(
-                next_creation_times[app_id],
-                use_current_year=True,
-            )
-            for app_id in manually_selected_app_ids
-            if app_id in next_creation_times
-        ]
+        # NB: timestamps do not require any date parsing, and the year is known.
+        next_creation_epochs = load_next_creation_epochs()
 
-        try:
-            soonest_creation_time = min(
-                next_creation_times_for_manually_selected_app_ids,
-            )
-        except ValueError:
+        cooldown_queue = build_cooldown_queue(
+            {
+                app_id: next_creation_epochs[app_id]
+                for app_id in manually_selected_app_ids
+                if app_id in next_creation_epochs
+            },
+        )
+
+        soonest_creation_epoch = get_soonest_creation_epoch(cooldown_queue)
+
+        if soonest_creation_epoch is None:
             soonest_creation_time = None
+        else:
+            soonest_creation_time = convert_epoch_to_time_struct(soonest_creation_epoch)
 
         print(
             f'The soonest creation time is {get_formatted_time(soonest_creation_time)}.',
@@ -0,0 +1,124 @@
+# Objective: compare the memory footprint and the runtime of a typical filter, with nested dictionaries vs. records,
+#            on the .json files shipped in data/.
+
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from market_records import (
+    convert_dict_to_listing,
+    convert_dict_to_listing_details,
+    convert_dict_to_market_order,
+    convert_dicts_to_records,
+)
+from src.json_utils import load_json
+from utils import (
+    get_listing_details_output_file_name,
+    get_listing_output_file_name,
+    get_market_order_file_name,
+)
+
+
+def measure_memory_in_bytes(build_function: Callable[[], object]) -> tuple[object, int]:
+    tracemalloc.start()
+    data = build_function()
+    memory_in_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return data, memory_in_bytes
+
+
+def measure_runtime_in_seconds(
+    run_function: Callable[[], object],
+    num_repetitions: int = 10,
+) -> float:
+    start_time = time.perf_counter()
+    for _ in range(num_repetitions):
+        run_function()
+    runtime_in_seconds = (time.perf_counter() - start_time) / num_repetitions
+
+    return runtime_in_seconds
+
+
+def filter_listing_dicts(all_listings: dict[str, dict], price_threshold_in_cents: int) -> list[str]:
+    return [
+        listing_hash
+        for listing_hash, listing in all_listings.items()
+        if listing['sell_listings'] > 0 and 0 < listing['sell_price'] < price_threshold_in_cents
+    ]
+
+
+def filter_listing_records(all_listings: dict[str, object], price_threshold_in_cents: int) -> list[str]:
+    return [
+        listing_hash
+        for listing_hash, listing in all_listings.items()
+        if listing.sell_listings > 0 and 0 < listing.sell_price < price_threshold_in_cents
+    ]
+
+
+def benchmark_file(
+    file_name: str,
+    convert_function: Callable[[dict], object],
+) -> dict[str, float]:
+    raw_data = load_json(file_name)
+
+    # NB: both variants are built from the same parsed data, so that only the per-listing containers are measured.
+    dicts, dict_memory = measure_memory_in_bytes(
+        lambda: {listing_hash: dict(v) for listing_hash, v in raw_data.items()},
+    )
+    records, record_memory = measure_memory_in_bytes(
+        lambda: convert_dicts_to_records(raw_data, convert_function),
+    )
+
+    stats = {
+        'num_entries': len(raw_data),
+        'dict_memory_in_bytes': dict_memory,
+        'record_memory_in_bytes': record_memory,
+    }
+
+    if convert_function == convert_dict_to_listing:
+        price_threshold_in_cents = 100
+        stats['dict_filter_in_seconds'] = measure_runtime_in_seconds(
+            lambda: filter_listing_dicts(dicts, price_threshold_in_cents),
+        )
+        stats['record_filter_in_seconds'] = measure_runtime_in_seconds(
+            lambda: filter_listing_records(records, price_threshold_in_cents),
+        )
+
+    return stats
+
+
+def print_stats(file_name: str, stats: dict[str, float]) -> None:
+    print(f'{file_name} ({stats["num_entries"]} entries)')
+    print(
+        '\tmemory: {:.2f} MB with dicts vs. {:.2f} MB with records'.format(
+            stats['dict_memory_in_bytes'] / 1e6,
+            stats['record_memory_in_bytes'] / 1e6,
+        ),
+    )
+
+    if 'dict_filter_in_seconds' in stats:
+        print(
+            '\tfilter: {:.2f} ms with dicts vs. {:.2f} ms with records'.format(
+                1e3 * stats['dict_filter_in_seconds'],
+                1e3 * stats['record_filter_in_seconds'],
+            ),
+        )
+
+
+def main() -> bool:
+    files_to_benchmark = [
+        (get_listing_output_file_name(), convert_dict_to_listing),
+        (get_listing_details_output_file_name(), convert_dict_to_listing_details),
+        (get_market_order_file_name(), convert_dict_to_market_order),
+    ]
+
+    for file_name, convert_function in files_to_benchmark:
+        stats = benchmark_file(file_name, convert_function)
+        print_stats(file_name, stats)
+
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+# Objective: craft then sell booster packs as soon as their cooldown ends, instead of waiting for the next manual run.
+#
+# The scheduler sleeps until the soonest next creation time. Then, the price of a sack of gems and the market orders of
+# the booster packs which came off cooldown are refreshed, and these packs are crafted and listed if they are still
+# profitable.
+
+import time
+from collections.abc import Callable
+
+from arbitrage_engine import (
+    build_arbitrage_state,
+    get_gem_price_from_arbitrage_state,
+    update_arbitrage_state,
+    update_market_orders_in_arbitrage_state,
+)
+from creation_time_utils import (
+    build_cooldown_queue,
+    convert_epoch_to_creation_time,
+    fill_in_badges_with_next_creation_times_loaded_from_disk,
+    get_crafting_cooldown_duration_in_seconds,
+    get_current_epoch,
+    get_soonest_creation_epoch,
+    pop_craftable_app_ids,
+    push_next_creation_epoch,
+)
+from inventory_utils import create_then_sell_booster_packs_for_batch
+from market_arbitrage import (
+    convert_arbitrages_for_batch_create_then_sell,
+    filter_out_badges_never_crafted,
+    filter_out_badges_with_low_sell_price,
+    find_badge_arbitrages,
+)
+from market_order import load_market_order_data, load_market_order_data_from_disk
+from market_utils import load_aggregated_badge_data
+from sack_of_gems import load_sack_of_gems_price
+from src.money_utils import convert_euros_to_cents
+
+
+def get_recheck_delay_in_seconds() -> int:
+    # A booster pack which came off cooldown, but which was not profitable, is checked again after this delay.
+    recheck_delay_in_seconds = 3600
+
+    return recheck_delay_in_seconds
+
+
+def get_scheduled_badge_data(
+    retrieve_listings_from_scratch: bool = False,
+    enforced_sack_of_gems_price: float = None,
+    minimum_allowed_sack_of_gems_price: float = None,
+    from_javascript: bool = False,
+) -> dict[int, dict]:
+    # Similar to get_filtered_badge_data(), except that booster packs on cooldown are kept, since they are the ones
+    # to schedule. Only booster packs which were crafted at least once are tracked.
+
+    aggregated_badge_data = load_aggregated_badge_data(
+        retrieve_listings_from_scratch,
+        enforced_sack_of_gems_price=enforced_sack_of_gems_price,
+        minimum_allowed_sack_of_gems_price=minimum_allowed_sack_of_gems_price,
+        from_javascript=from_javascript,
+    )
+
+    aggregated_badge_data = fill_in_badges_with_next_creation_times_loaded_from_disk(
+        aggregated_badge_data,
+    )
+
+    filtered_badge_data = filter_out_badges_with_low_sell_price(aggregated_badge_data)
+
+    filtered_badge_data = filter_out_badges_never_crafted(filtered_badge_data)
+
+    return filtered_badge_data
+
+
+def download_latest_market_orders(badge_data: dict[int, dict]) -> dict[str, dict]:
+    # NB: the market orders are downloaded again, instead of being served from the memory of recent responses.
+    market_order_dict = load_market_order_data(
+        badge_data,
+        trim_output=True,
+        retrieve_market_orders_online=True,
+        freshness_in_seconds=0,
+    )
+
+    return market_order_dict
+
+
+def download_latest_sack_of_gems_price() -> float:
+    sack_of_gems_price = load_sack_of_gems_price(retrieve_gem_price_from_scratch=True)
+
+    return sack_of_gems_price
+
+
+def create_then_sell_if_still_profitable(
+    app_ids: list[int],
+    badge_data: dict[int, dict],
+    profit_threshold: int = 1,  # profit in cents
+    market_order_loader: Callable[[dict[int, dict]], dict[str, dict]] = None,
+    is_a_simulation: bool = True,
+    # Caveat: if False, then packs will be crafted, which costs money!
+    profile_id: str = None,
+    verbose: bool = True,
+) -> list[int]:
+    # Return the appIDs for which a booster pack was crafted.
+
+    if market_order_loader is None:
+        market_order_loader = download_latest_market_orders
+
+    selected_badge_data = {app_id: badge_data[app_id] for app_id in app_ids}
+
+    # Only refresh the order book of the booster packs which just came off cooldown.
+    market_order_dict = market_order_loader(selected_badge_data)
+
+    badge_arbitrages = find_badge_arbitrages(
+        selected_badge_data,
+        market_order_dict,
+    )
+
+    price_dict_for_listing_hashes = convert_arbitrages_for_batch_create_then_sell(
+        badge_arbitrages,
+        profit_threshold=profit_threshold,
+        verbose=verbose,
+    )
+
+    if is_a_simulation or len(price_dict_for_listing_hashes) == 0:
+        crafted_listing_hashes = list(price_dict_for_listing_hashes)
+    else:
+        creation_results, sale_results = create_then_sell_booster_packs_for_batch(
+            price_dict_for_listing_hashes,
+            focus_on_marketable_items=True,
+            profile_id=profile_id,
+        )
+
+        crafted_listing_hashes = [
+            listing_hash
+            for listing_hash in creation_results
+            if creation_results[listing_hash] is not None
+        ]
+
+    crafted_app_ids = [
+        app_id
+        for app_id in app_ids
+        if badge_data[app_id]['listing_hash'] in crafted_listing_hashes
+    ]
+
+    return crafted_app_ids
+
+
+def run_crafting_scheduler(
+    badge_data: dict[int, dict],
+    profit_threshold: int = 1,  # profit in cents
+    end_epoch: int = None,
+    max_num_wake_ups: int = None,
+    market_order_loader: Callable[[dict[int, dict]], dict[str, dict]] = None,
+    sack_of_gems_price_loader: Callable[[], float] = None,
+    market_order_dict: dict[str, dict] = None,
+    get_epoch: Callable[[], float] = None,
+    sleep: Callable[[float], None] = None,
+    is_a_simulation: bool = True,
+    # Caveat: if False, then packs will be crafted, which costs money!
+    profile_id: str = None,
+    verbose: bool = True,
+) -> dict[int, list[int]]:
+    # Return the appIDs crafted at each wake-up, keyed by the epoch of the wake-up.
+    #
+    # NB: the clock and the sleep function can be replaced, e.g. to replay a day of cooldowns in a simulation.
+
+    if market_order_loader is None:
+        market_order_loader = download_latest_market_orders
+
+    if sack_of_gems_price_loader is None:
+        sack_of_gems_price_loader = download_latest_sack_of_gems_price
+
+    if market_order_dict is None:
+        # The last known market orders, which are refreshed for the booster packs which come off cooldown.
+        market_order_dict = load_market_order_data_from_disk() or {}
+
+    if get_epoch is None:
+        get_epoch = get_current_epoch
+
+    if sleep is None:
+        sleep = time.sleep
+
+    # The epoch at which each booster pack is due to be checked: its next creation time, or a later re-check.
+    scheduled_epochs = {
+        app_id: badge_data[app_id]['next_creation_epoch']
+        for app_id in badge_data
+        if badge_data[app_id].get('next_creation_epoch') is not None
+    }
+
+    cooldown_queue = build_cooldown_queue(scheduled_epochs)
+
+    # The gem amounts do not change: the arbitrage state is built once, then updated with each new price of a sack of
+    # gems, and with each order book which is downloaded again.
+    arbitrage_state = None
+
+    def load_market_orders_into_arbitrage_state(selected_badge_data: dict[int, dict]) -> dict[str, dict]:
+        latest_market_order_dict = market_order_loader(selected_badge_data)
+        update_market_orders_in_arbitrage_state(arbitrage_state, latest_market_order_dict)
+
+        return latest_market_order_dict
+
+    crafting_log = {}
+    num_wake_ups = 0
+
+    while max_num_wake_ups is None or num_wake_ups < max_num_wake_ups:
+        soonest_creation_epoch = get_soonest_creation_epoch(cooldown_queue, scheduled_epochs)
+
+        if soonest_creation_epoch is None:
+            break
+
+        if end_epoch is not None and soonest_creation_epoch > end_epoch:
+            break
+
+        delay_in_seconds = soonest_creation_epoch - get_epoch()
+
+        if delay_in_seconds > 0:
+            if verbose:
+                print(
+                    f'Sleeping until {convert_epoch_to_creation_time(soonest_creation_epoch)}.',
+                )
+            sleep(delay_in_seconds)
+
+        current_epoch = get_epoch()
+        num_wake_ups += 1
+
+        app_ids = pop_craftable_app_ids(
+            cooldown_queue,
+            scheduled_epochs,
+            current_epoch=current_epoch,
+        )
+
+        if len(app_ids) == 0:
+            continue
+
+        # The price of a sack of gems may have changed while the scheduler was sleeping: it is loaded again, and the gem
+        # price of the booster packs which came off cooldown is updated in place.
+        sack_of_gems_price_in_cents = convert_euros_to_cents(sack_of_gems_price_loader())
+
+        if arbitrage_state is None:
+            arbitrage_state = build_arbitrage_state(badge_data, market_order_dict, sack_of_gems_price_in_cents)
+        else:
+            crossing_positions = update_arbitrage_state(arbitrage_state, sack_of_gems_price_in_cents)
+
+            if verbose and len(crossing_positions) > 0:
+                print(
+                    f'{len(crossing_positions)} booster packs crossed the profitability threshold with the last known '
+                    'market orders, due to the new price of a sack of gems.',
+                )
+
+        for app_id in app_ids:
+            badge_data[app_id]['gem_price'] = get_gem_price_from_arbitrage_state(
+                arbitrage_state,
+                badge_data[app_id]['listing_hash'],
+            )
+
+        crafted_app_ids = create_then_sell_if_still_profitable(
+            app_ids,
+            badge_data,
+            profit_threshold=profit_threshold,
+            market_order_loader=load_market_orders_into_arbitrage_state,
+            is_a_simulation=is_a_simulation,
+            profile_id=profile_id,
+            verbose=verbose,
+        )
+
+        crafting_log[current_epoch] = crafted_app_ids
+
+        for app_id in app_ids:
+            if app_id in crafted_app_ids:
+                scheduled_epoch = current_epoch + get_crafting_cooldown_duration_in_seconds()
+            else:
+                scheduled_epoch = current_epoch + get_recheck_delay_in_seconds()
+
+            scheduled_epochs[app_id] = scheduled_epoch
+            push_next_creation_epoch(cooldown_queue, app_id, scheduled_epoch)
+
+    return crafting_log
+
+
+def main(
+    num_hours: int = 24,
+    is_a_simulation: bool = True,  # Caveat: if False, then packs will be crafted, which costs money!
+    profit_threshold: int = 1,  # profit in cents
+) -> bool:
+    badge_data = get_scheduled_badge_data()
+
+    run_crafting_scheduler(
+        badge_data,
+        profit_threshold=profit_threshold,
+        end_epoch=get_current_epoch() + num_hours * 3600,
+        is_a_simulation=is_a_simulation,
+    )
+
+    return True
+
+
+if __name__ == '__main__':
+    main()
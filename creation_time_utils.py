@@ -1,6 +1,11 @@
 import datetime
+import heapq
 
-from src.json_utils import load_json
+from market_store import (
+    query_next_creation_times,
+    query_next_creation_times_with_epochs,
+    save_next_creation_epochs_to_market_store,
+)
 from utils import get_next_creation_time_file_name
 
 
@@ -10,38 +15,69 @@ def load_next_creation_time_data(
     if next_creation_time_file_name is None:
         next_creation_time_file_name = get_next_creation_time_file_name()
 
+    # NB: the keys in a dictionary loaded from a .json file are always str. The market store keeps appIDs as int.
+
     try:
-        next_creation_times = load_json(next_creation_time_file_name)
+        next_creation_times = query_next_creation_times(next_creation_time_file_name)
     except FileNotFoundError:
         next_creation_times = {}
 
-    # NB: the keys in a dictionary loaded from a .json file are always str. We want to convert them to int now.
+    return next_creation_times
+
 
-    next_creation_times_with_keys_as_int = {}
+def load_next_creation_epochs(
+    next_creation_time_file_name: str = None,
+) -> dict[int, int]:
+    if next_creation_time_file_name is None:
+        next_creation_time_file_name = get_next_creation_time_file_name()
 
-    for app_id_as_str in next_creation_times:
-        app_id_as_int = int(app_id_as_str)
+    # NB: the epochs are stored in the market store, next to the times in Valve's format from which they are derived.
+    #     If the times are modified, e.g. if the .json file is replaced, the epochs are reset, then computed again.
 
-        next_creation_times_with_keys_as_int[app_id_as_int] = next_creation_times[app_id_as_str]
+    try:
+        rows = query_next_creation_times_with_epochs(next_creation_time_file_name)
+    except FileNotFoundError:
+        rows = []
+
+    current_time = get_current_time()
 
-    return next_creation_times_with_keys_as_int
+    next_creation_epochs = {}
+    app_ids_to_convert = []
+
+    for app_id, next_creation_time, next_creation_epoch in rows:
+        if next_creation_epoch is None:
+            app_ids_to_convert.append(app_id)
+            next_creation_epoch = convert_creation_time_to_epoch(next_creation_time, current_time)
+
+        next_creation_epochs[app_id] = next_creation_epoch
+
+    if len(app_ids_to_convert) > 0:
+        # The times are converted, then saved, so that they are converted only once.
+        save_next_creation_epochs_to_market_store(
+            next_creation_time_file_name,
+            {app_id: next_creation_epochs[app_id] for app_id in app_ids_to_convert},
+        )
+
+    return next_creation_epochs
 
 
 def fill_in_badges_with_next_creation_times_loaded_from_disk(
     aggregated_badge_data: dict[int, dict],
     verbose: bool = True,
 ) -> dict[int, dict]:
-    next_creation_times_loaded_from_disk = load_next_creation_time_data()
+    next_creation_epochs_loaded_from_disk = load_next_creation_epochs()
 
     app_ids = set(aggregated_badge_data.keys()).intersection(
-        next_creation_times_loaded_from_disk.keys(),
+        next_creation_epochs_loaded_from_disk.keys(),
     )
 
     for app_id in app_ids:
-        next_creation_time = next_creation_times_loaded_from_disk[app_id]
+        next_creation_epoch = next_creation_epochs_loaded_from_disk[app_id]
+        next_creation_time = convert_epoch_to_creation_time(next_creation_epoch)
 
         previously_loaded_next_creation_time = aggregated_badge_data[app_id]['next_creation_time']
         aggregated_badge_data[app_id]['next_creation_time'] = next_creation_time
+        aggregated_badge_data[app_id]['next_creation_epoch'] = next_creation_epoch
 
         if verbose:
             app_name = aggregated_badge_data[app_id]['name']
@@ -174,6 +210,72 @@ def get_crafting_cooldown_duration_in_seconds() -> int:
     return crafting_cooldown_duration_in_seconds
 
 
+def get_current_epoch() -> int:
+    current_epoch = int(get_current_time().timestamp())
+
+    return current_epoch
+
+
+def convert_creation_time_to_epoch(
+    formatted_time_as_str: str,
+    current_time: datetime.datetime = None,
+) -> int:
+    # Objective: convert a time in Valve's format, e.g. '14 Sep @ 10:48pm', to an absolute timestamp (in seconds).
+    #
+    # NB: the year is not part of Valve's time format, so it is inferred once, here, with respect to the current time.
+
+    if current_time is None:
+        current_time = get_current_time()
+
+    parsed_next_creation_time = get_time_struct_from_str(formatted_time_as_str)
+
+    if (
+        current_time.month == 12
+        and current_time.day == 31
+        and parsed_next_creation_time.month == 1
+        and parsed_next_creation_time.day == 1
+    ):
+        # Today is the Dec 31, and the next creation time is the day after, on January 1.
+        year_to_be_manually_set = current_time.year + 1
+    else:
+        year_to_be_manually_set = current_time.year
+
+    parsed_next_creation_time = parsed_next_creation_time.replace(
+        year=year_to_be_manually_set,
+    )
+
+    delta_in_seconds = (parsed_next_creation_time - current_time).total_seconds()
+
+    # current_time + cooldown < parsed_next_creation_time: the cooldown actually ended last year.
+    if get_crafting_cooldown_duration_in_seconds() < delta_in_seconds:
+        try:
+            parsed_next_creation_time = parsed_next_creation_time.replace(
+                year=year_to_be_manually_set - 1,
+            )
+        except ValueError:
+            # February 29th did not exist last year. Any time in the past is fine, since the cooldown has ended.
+            parsed_next_creation_time = parsed_next_creation_time.replace(
+                year=year_to_be_manually_set - 1,
+                day=28,
+            )
+
+    next_creation_epoch = int(parsed_next_creation_time.timestamp())
+
+    return next_creation_epoch
+
+
+def convert_epoch_to_time_struct(epoch: int) -> datetime.datetime:
+    time_struct = datetime.datetime.fromtimestamp(epoch)
+
+    return time_struct
+
+
+def convert_epoch_to_creation_time(epoch: int) -> str:
+    formatted_time_as_str = get_formatted_time(convert_epoch_to_time_struct(epoch))
+
+    return formatted_time_as_str
+
+
 def determine_whether_a_booster_pack_can_be_crafted(
     badge_data: dict,
     current_time: datetime.datetime = None,
@@ -181,46 +283,86 @@ def determine_whether_a_booster_pack_can_be_crafted(
     if current_time is None:
         current_time = get_current_time()
 
-    next_creation_time = badge_data['next_creation_time']
+    # NB: the timestamp is computed once, when badge data is aggregated, so that no date is parsed here.
+    next_creation_epoch = badge_data.get('next_creation_epoch')
 
-    if next_creation_time is None:
+    if next_creation_epoch is None:
         a_booster_pack_can_be_crafted = True
     else:
-        parsed_next_creation_time = get_time_struct_from_str(next_creation_time)
-
-        if (
-            current_time.month == 12
-            and current_time.day == 31
-            and parsed_next_creation_time.month == 1
-            and parsed_next_creation_time.day == 1
-        ):
-            # Today is the Dec 31, and the next creation time is the day after, on January 1.
-            year_to_be_manually_set = current_time.year + 1
-        else:
-            year_to_be_manually_set = current_time.year
-
-        # Manually set the year, because it was not stored at creation time, following Valve's time format.
-        parsed_next_creation_time = parsed_next_creation_time.replace(
-            year=year_to_be_manually_set,
-        )
+        a_booster_pack_can_be_crafted = bool(next_creation_epoch <= current_time.timestamp())
+
+    return a_booster_pack_can_be_crafted
 
-        delta = parsed_next_creation_time - current_time
-        delta_in_seconds = delta.total_seconds()
 
-        # parsed_next_creation_time < current_time
-        cooldown_has_ended = bool(delta_in_seconds < 0)
+def build_cooldown_queue(next_creation_epochs: dict[int, int]) -> list[tuple[int, int]]:
+    # Min-heap of (next creation epoch, appID): the booster pack which is available the soonest is at the top.
+    cooldown_queue = [
+        (next_creation_epoch, app_id)
+        for app_id, next_creation_epoch in next_creation_epochs.items()
+    ]
 
-        # current_time + cooldown < parsed_next_creation_time
-        # NB: this is necessary because we do not keep track of the year.
-        cooldown_actually_ended_last_year = bool(
-            get_crafting_cooldown_duration_in_seconds() < delta_in_seconds,
-        )
+    heapq.heapify(cooldown_queue)
 
-        a_booster_pack_can_be_crafted = (
-            cooldown_has_ended or cooldown_actually_ended_last_year
-        )
+    return cooldown_queue
 
-    return a_booster_pack_can_be_crafted
+
+def push_next_creation_epoch(
+    cooldown_queue: list[tuple[int, int]],
+    app_id: int,
+    next_creation_epoch: int,
+) -> None:
+    # NB: a previous entry for the same appID is not removed. It is stale, and skipped if the latest next creation
+    #     epochs are provided when popping from the queue.
+    heapq.heappush(cooldown_queue, (next_creation_epoch, app_id))
+
+
+def discard_stale_entries(
+    cooldown_queue: list[tuple[int, int]],
+    next_creation_epochs: dict[int, int] = None,
+) -> None:
+    if next_creation_epochs is None:
+        return
+
+    while cooldown_queue and next_creation_epochs.get(cooldown_queue[0][1]) != cooldown_queue[0][0]:
+        heapq.heappop(cooldown_queue)
+
+
+def get_soonest_creation_epoch(
+    cooldown_queue: list[tuple[int, int]],
+    next_creation_epochs: dict[int, int] = None,
+) -> [int | None]:
+    discard_stale_entries(cooldown_queue, next_creation_epochs)
+
+    try:
+        soonest_creation_epoch = cooldown_queue[0][0]
+    except IndexError:
+        soonest_creation_epoch = None
+
+    return soonest_creation_epoch
+
+
+def pop_craftable_app_ids(
+    cooldown_queue: list[tuple[int, int]],
+    next_creation_epochs: dict[int, int] = None,
+    current_epoch: int = None,
+) -> list[int]:
+    # Objective: pop the appIDs for which a booster pack can be crafted now.
+
+    if current_epoch is None:
+        current_epoch = get_current_epoch()
+
+    craftable_app_ids = []
+
+    while True:
+        discard_stale_entries(cooldown_queue, next_creation_epochs)
+
+        if not cooldown_queue or cooldown_queue[0][0] > current_epoch:
+            break
+
+        _, app_id = heapq.heappop(cooldown_queue)
+        craftable_app_ids.append(app_id)
+
+    return craftable_app_ids
 
 
 def main() -> bool:
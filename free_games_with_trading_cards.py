@@ -9,12 +9,12 @@ from pathlib import Path
 import requests
 import steamspypi
 
+from listing_catalogue import get_app_id
 from market_search import load_all_listings
 from personal_info import (
     get_cookie_dict,
     update_and_save_cookie_to_disk_if_values_changed,
 )
-from utils import convert_listing_hash_to_app_id
 
 
 def get_user_data_url() -> str:
@@ -88,7 +88,7 @@ def load_apps_with_trading_cards(verbose: bool = True) -> list[int]:
     all_listings = load_all_listings()
 
     apps_with_trading_cards = [
-        convert_listing_hash_to_app_id(listing_hash) for listing_hash in all_listings
+        get_app_id(listing_hash) for listing_hash in all_listings
     ]
 
     if verbose:
@@ -1,20 +1,23 @@
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
 
-import requests
-
 from creation_time_utils import (
     get_crafting_cooldown_duration_in_days,
+    get_crafting_cooldown_duration_in_seconds,
+    get_current_epoch,
     get_formatted_current_time,
     load_next_creation_time_data,
 )
+from listing_catalogue import get_app_id, get_app_name
+from market_store import save_next_creation_epochs_to_market_store, save_to_market_store
 from personal_info import (
     get_cookie_dict,
     update_and_save_cookie_to_disk_if_values_changed,
 )
 from src.json_utils import load_json, save_json
+from src.request_utils import acquire_rate_limit_token, get_http_client
 from utils import (
-    convert_listing_hash_to_app_id,
-    convert_listing_hash_to_app_name,
     get_data_folder,
     get_next_creation_time_file_name,
 )
@@ -46,6 +49,47 @@ def get_steam_inventory_url(
     return steam_inventory_url
 
 
+def get_steam_inventory_pagination_url(
+    profile_id: str = None,
+    app_id: int = 753,
+    context_id: int = 6,
+) -> str:
+    if profile_id is None:
+        profile_id = get_my_steam_profile_id()
+
+    # NB: unlike the legacy endpoint, this endpoint returns the inventory page by page.
+    steam_inventory_url = (
+        'https://steamcommunity.com/inventory/' + str(profile_id) + '/'
+    )
+    steam_inventory_url += str(app_id) + '/' + str(context_id)
+
+    return steam_inventory_url
+
+
+def get_max_num_items_per_inventory_page() -> int:
+    max_num_items_per_inventory_page = 2000
+
+    return max_num_items_per_inventory_page
+
+
+def get_steam_inventory_pagination_parameters(
+    start_assetid: str = None,
+    count: int = None,
+) -> dict[str, str]:
+    if count is None:
+        count = get_max_num_items_per_inventory_page()
+
+    params = {}
+
+    params['l'] = 'english'
+    params['count'] = str(count)
+
+    if start_assetid is not None:
+        params['start_assetid'] = str(start_assetid)
+
+    return params
+
+
 def get_steam_inventory_file_name(profile_id: str) -> str:
     steam_inventory_file_name = (
         get_data_folder() + 'inventory_' + str(profile_id) + '.json'
@@ -94,12 +138,12 @@ def download_steam_inventory(
     url = get_steam_inventory_url(profile_id=profile_id)
 
     if has_secured_cookie:
-        resp_data = requests.get(
+        resp_data = get_http_client().get(
             url,
             cookies=cookie,
         )
     else:
-        resp_data = requests.get(url)
+        resp_data = get_http_client().get(url)
 
     status_code = resp_data.status_code
 
@@ -175,7 +219,7 @@ def create_booster_pack(
         is_marketable=is_marketable,
     )
 
-    resp_data = requests.post(
+    resp_data = get_http_client().post(
         url,
         data=req_data,
         cookies=cookie,
@@ -272,7 +316,7 @@ def sell_booster_pack(
         session_id=session_id,
     )
 
-    resp_data = requests.post(
+    resp_data = get_http_client().post(
         url,
         headers=get_request_headers(),
         data=req_data,
@@ -310,54 +354,211 @@ def sell_booster_pack(
     return result
 
 
+def get_empty_inventory_index() -> dict:
+    # Objective: index the inventory once, so that each booster pack to sell is found without scanning the inventory.
+    #
+    # - 'descriptions': market hash name -> [(classid, instanceid, is_marketable)], in the order of the inventory,
+    # - 'asset_ids': (classid, instanceid) -> [asset ids], in the order of the inventory,
+    # - 'consumed_asset_ids': assets already picked within a batch, so that two sales never pick the same asset.
+
+    inventory_index = {
+        'descriptions': {},
+        'asset_ids': {},
+        'consumed_asset_ids': set(),
+    }
+
+    return inventory_index
+
+
+def add_description_to_inventory_index(inventory_index: dict, description: dict) -> None:
+    is_marketable = bool(description['marketable'] != 0)
+
+    item_description = (description['classid'], description['instanceid'], is_marketable)
+
+    matched_descriptions = inventory_index['descriptions'].setdefault(description['market_hash_name'], [])
+
+    # NB: with the paginated endpoint, the same description may be repeated on several pages.
+    if item_description not in matched_descriptions:
+        matched_descriptions.append(item_description)
+
+
+def add_asset_to_inventory_index(inventory_index: dict, asset: dict, asset_id: str) -> None:
+    inventory_index['asset_ids'].setdefault((asset['classid'], asset['instanceid']), []).append(
+        asset_id,
+    )
+
+
+def build_inventory_index(steam_inventory: dict) -> dict:
+    # NB: this is for the legacy endpoint, for which the whole inventory is downloaded at once.
+
+    inventory_index = get_empty_inventory_index()
+
+    for element in steam_inventory['rgDescriptions'].values():
+        add_description_to_inventory_index(inventory_index, element)
+
+    for element in steam_inventory['rgInventory'].values():
+        add_asset_to_inventory_index(inventory_index, element, element['id'])
+
+    return inventory_index
+
+
+def add_inventory_page_to_inventory_index(inventory_index: dict, inventory_page: dict) -> dict:
+    for description in inventory_page.get('descriptions', []):
+        add_description_to_inventory_index(inventory_index, description)
+
+    for asset in inventory_page.get('assets', []):
+        add_asset_to_inventory_index(inventory_index, asset, asset['assetid'])
+
+    return inventory_index
+
+
+def determine_whether_listing_hashes_are_indexed(
+    inventory_index: dict,
+    listing_hashes: list[str],
+) -> bool:
+    for listing_hash in listing_hashes:
+        matched_descriptions = inventory_index['descriptions'].get(listing_hash, [])
+
+        if not any(
+            (classid, instanceid) in inventory_index['asset_ids']
+            for classid, instanceid, _ in matched_descriptions
+        ):
+            return False
+
+    return True
+
+
+def download_steam_inventory_page(
+    profile_id: str = None,
+    start_assetid: str = None,
+    count: int = None,
+) -> [dict | None]:
+    if profile_id is None:
+        profile_id = get_my_steam_profile_id()
+
+    cookie = get_cookie_dict()
+    has_secured_cookie = bool(len(cookie) > 0)
+
+    url = get_steam_inventory_pagination_url(profile_id=profile_id)
+    req_data = get_steam_inventory_pagination_parameters(
+        start_assetid=start_assetid,
+        count=count,
+    )
+
+    if has_secured_cookie:
+        resp_data = get_http_client().get(
+            url,
+            params=req_data,
+            cookies=cookie,
+        )
+    else:
+        resp_data = get_http_client().get(url, params=req_data)
+
+    status_code = resp_data.status_code
+
+    if resp_data.ok:
+        inventory_page = resp_data.json()
+
+        if has_secured_cookie:
+            jar = dict(resp_data.cookies)
+            cookie = update_and_save_cookie_to_disk_if_values_changed(cookie, jar)
+    else:
+        print(
+            f'Inventory page for profile {profile_id} could not be loaded. Status code {status_code} was returned.',
+        )
+        inventory_page = None
+
+    return inventory_page
+
+
+def download_steam_inventory_index(
+    profile_id: str = None,
+    listing_hashes: list[str] = None,
+    page_loader: Callable[[str, str, int], dict | None] = None,
+    verbose: bool = True,
+) -> [dict | None]:
+    # Objective: stream the inventory page by page into the compact index, and stop as soon as every listing hash of
+    # interest is found, e.g. the booster packs which were just crafted, instead of downloading the whole inventory.
+
+    if page_loader is None:
+        page_loader = download_steam_inventory_page
+
+    inventory_index = get_empty_inventory_index()
+
+    start_assetid = None
+    num_pages = 0
+
+    while True:
+        inventory_page = page_loader(profile_id, start_assetid, get_max_num_items_per_inventory_page())
+
+        if inventory_page is None:
+            if num_pages == 0:
+                inventory_index = None
+            break
+
+        num_pages += 1
+        add_inventory_page_to_inventory_index(inventory_index, inventory_page)
+
+        if listing_hashes is not None and determine_whether_listing_hashes_are_indexed(
+            inventory_index,
+            listing_hashes,
+        ):
+            if verbose:
+                print(f'All the items were found in the first {num_pages} page(s) of the inventory.')
+            break
+
+        if not inventory_page.get('more_items', False):
+            break
+
+        start_assetid = inventory_page['last_assetid']
+
+    return inventory_index
+
+
 def retrieve_asset_id(
     listing_hash: str,
     steam_inventory: dict = None,
     focus_on_marketable_items: bool = True,
     profile_id: str = None,
     verbose: bool = True,
+    inventory_index: dict = None,
 ) -> str:
-    if steam_inventory is None:
-        steam_inventory = load_steam_inventory(profile_id=profile_id)
+    if inventory_index is None:
+        if steam_inventory is None:
+            steam_inventory = load_steam_inventory(profile_id=profile_id)
+
+        inventory_index = build_inventory_index(steam_inventory)
 
-    descriptions = steam_inventory['rgDescriptions']
+    matched_descriptions = inventory_index['descriptions'].get(listing_hash, [])
+
+    # Marketable items first, if required. Otherwise, follow the order of the inventory.
+    if focus_on_marketable_items:
+        matched_descriptions = sorted(
+            matched_descriptions,
+            key=lambda x: not x[2],
+        )
 
     matched_element = {}
 
-    for element in descriptions:
-        if descriptions[element]['market_hash_name'] == listing_hash:
-            matched_element['market_hash_name'] = descriptions[element]['market_hash_name']
-            matched_element['appid'] = descriptions[element]['appid']
-            matched_element['classid'] = descriptions[element]['classid']
-            matched_element['instanceid'] = descriptions[element]['instanceid']
-            matched_element['type'] = descriptions[element]['type']
-            matched_element['marketable'] = descriptions[element]['marketable']
-
-            is_marketable_as_int = matched_element['marketable']
-            is_marketable = bool(is_marketable_as_int != 0)
-
-            if is_marketable or (not focus_on_marketable_items):
-                if verbose:
-                    print(
-                        '\nItem found without requiring to go through the entire inventory.',
-                    )
-                break
+    for classid, instanceid, is_marketable in matched_descriptions:
+        for asset_id in inventory_index['asset_ids'].get((classid, instanceid), []):
+            if asset_id in inventory_index['consumed_asset_ids']:
+                continue
 
-    has_been_matched = bool(len(matched_element) > 0)
+            matched_element['market_hash_name'] = listing_hash
+            matched_element['classid'] = classid
+            matched_element['instanceid'] = instanceid
+            matched_element['marketable'] = is_marketable
+            matched_element['id'] = asset_id
+            break
 
-    if has_been_matched:
+        if len(matched_element) > 0:
+            break
 
-        community_inventory = steam_inventory['rgInventory']
+    has_been_matched = bool(len(matched_element) > 0)
 
-        for element in community_inventory:
-            if (
-                community_inventory[element]['classid'] == matched_element['classid']
-                and community_inventory[element]['instanceid'] == matched_element['instanceid']
-            ):
-                matched_element['id'] = community_inventory[element]['id']
-                matched_element['amount'] = community_inventory[element]['amount']
-                matched_element['pos'] = community_inventory[element]['pos']
-                break
+    if has_been_matched:
+        inventory_index['consumed_asset_ids'].add(matched_element['id'])
 
         print(f'\nItem matched in the inventory for {listing_hash}.')
     else:
@@ -378,7 +579,7 @@ def create_booster_packs_for_batch(listing_hashes: list[str]) -> dict[str, dict
     results = {}
 
     for listing_hash in listing_hashes:
-        app_id = convert_listing_hash_to_app_id(listing_hash)
+        app_id = get_app_id(listing_hash)
         result = create_booster_pack(app_id=app_id)
 
         results[listing_hash] = result
@@ -386,27 +587,63 @@ def create_booster_packs_for_batch(listing_hashes: list[str]) -> dict[str, dict
     return results
 
 
+def get_asset_id_from_creation_result(result: [dict | None]) -> [str | None]:
+    # The asset ID of a booster pack which was just created is part of the response, cf. create_booster_pack().
+    try:
+        asset_id = result['purchase_result']['communityitemid']
+    except (KeyError, TypeError):
+        asset_id = None
+
+    return asset_id
+
+
 def sell_booster_packs_for_batch(
     price_dict_for_listing_hashes: dict[str, float],
     update_steam_inventory: bool = True,
     focus_on_marketable_items: bool = True,
     profile_id: str = None,
+    asset_ids: dict[str, str] = None,
 ) -> dict[str, dict | None]:
+    # NB: the asset IDs of booster packs which were just created are known. The inventory is only queried for the
+    #     other booster packs, if any.
+    if asset_ids is None:
+        asset_ids = {}
+
     results = {}
 
-    steam_inventory = load_steam_inventory(
-        profile_id=profile_id,
-        update_steam_inventory=update_steam_inventory,
-    )
+    listing_hashes_to_look_up = [
+        listing_hash
+        for listing_hash in price_dict_for_listing_hashes
+        if asset_ids.get(listing_hash) is None
+    ]
+
+    # NB: the inventory is indexed once for the whole batch. If it is updated, only the first pages are downloaded,
+    #     until every booster pack to look up is found.
+    if len(listing_hashes_to_look_up) == 0:
+        inventory_index = get_empty_inventory_index()
+    elif update_steam_inventory:
+        inventory_index = download_steam_inventory_index(
+            profile_id=profile_id,
+            listing_hashes=listing_hashes_to_look_up,
+        )
+    else:
+        inventory_index = None
+
+    if inventory_index is None:
+        steam_inventory = load_steam_inventory(profile_id=profile_id)
+        inventory_index = build_inventory_index(steam_inventory)
 
     for (listing_hash, price_in_cents) in price_dict_for_listing_hashes.items():
 
-        asset_id = retrieve_asset_id(
-            listing_hash=listing_hash,
-            steam_inventory=steam_inventory,
-            focus_on_marketable_items=focus_on_marketable_items,
-            profile_id=profile_id,
-        )
+        if asset_ids.get(listing_hash) is not None:
+            asset_id = asset_ids[listing_hash]
+        else:
+            asset_id = retrieve_asset_id(
+                listing_hash=listing_hash,
+                focus_on_marketable_items=focus_on_marketable_items,
+                profile_id=profile_id,
+                inventory_index=inventory_index,
+            )
 
         if asset_id is not None:
             result = sell_booster_pack(asset_id=asset_id, price_in_cents=price_in_cents)
@@ -416,24 +653,130 @@ def sell_booster_packs_for_batch(
     return results
 
 
+def get_max_num_in_flight_actions() -> int:
+    # Small bounded concurrency: a few booster packs are created then sold at the same time.
+    max_num_in_flight_actions = 3
+
+    return max_num_in_flight_actions
+
+
+def get_rate_limits_for_actions() -> dict[str, float]:
+    # Maximal number of requests per second, for each endpoint.
+    rate_limits = {
+        'create': 1,
+        'sell': 1,
+    }
+
+    return rate_limits
+
+
+def create_then_sell_booster_pack(
+    listing_hash: str,
+    price_in_cents: float,
+    rate_limits: dict[str, float] = None,
+) -> tuple[dict | None, dict | None, bool]:
+    # Objective: create a booster pack, then immediately sell it with the asset ID from the creation response.
+    #
+    # Return the creation result, the sale result, and whether the asset ID has to be looked up in the inventory.
+
+    if rate_limits is None:
+        rate_limits = get_rate_limits_for_actions()
+
+    app_id = get_app_id(listing_hash)
+
+    acquire_rate_limit_token(get_steam_booster_pack_creation_url(), rate_limits['create'])
+    creation_result = create_booster_pack(app_id=app_id)
+
+    asset_id = get_asset_id_from_creation_result(creation_result)
+
+    if asset_id is None:
+        return creation_result, None, True
+
+    acquire_rate_limit_token(get_steam_market_sell_url(), rate_limits['sell'])
+
+    try:
+        sale_result = sell_booster_pack(asset_id=asset_id, price_in_cents=price_in_cents)
+    except OSError as exception:
+        # NB: the booster pack was created, so its creation result must not be lost if the sale fails, e.g. with a
+        #     connection error. The sale is then reported as failed, as with an error returned by Steam.
+        print(f'Sale of {listing_hash} failed with: {exception!r}')
+        sale_result = None
+
+    return creation_result, sale_result, False
+
+
 def create_then_sell_booster_packs_for_batch(
     price_dict_for_listing_hashes: dict,
     update_steam_inventory: bool = True,
     focus_on_marketable_items: bool = True,
     profile_id: str = None,
+    max_num_in_flight_actions: int = None,
+    rate_limits: dict[str, float] = None,
+    save_next_creation_times: bool = True,
+    next_creation_time_file_name: str = None,
 ) -> tuple[dict[str, dict | None], dict[str, dict | None]]:
-    listing_hashes = list(price_dict_for_listing_hashes.keys())
-
-    creation_results = create_booster_packs_for_batch(listing_hashes)
+    # Objective: minimize the time between the detection of an arbitrage and the sale of the booster pack. Each creation
+    # feeds its sale right away, instead of waiting for the whole batch to be created.
+
+    if max_num_in_flight_actions is None:
+        max_num_in_flight_actions = get_max_num_in_flight_actions()
+
+    with ThreadPoolExecutor(max_workers=max_num_in_flight_actions) as executor:
+        futures = {
+            listing_hash: executor.submit(
+                create_then_sell_booster_pack,
+                listing_hash,
+                price_in_cents,
+                rate_limits,
+            )
+            for listing_hash, price_in_cents in price_dict_for_listing_hashes.items()
+        }
+
+    creation_results = {}
+    sale_results = {}
+    listing_hashes_to_look_up = []
+    exceptions = []
+
+    for listing_hash, future in futures.items():
+        try:
+            creation_result, sale_result, requires_inventory_lookup = future.result()
+        except Exception as exception:
+            # NB: the exception is raised once the next creation times of the booster packs which were created are saved.
+            exceptions.append(exception)
+            creation_results[listing_hash] = None
+            continue
+
+        creation_results[listing_hash] = creation_result
+
+        if requires_inventory_lookup:
+            listing_hashes_to_look_up.append(listing_hash)
+        else:
+            sale_results[listing_hash] = sale_result
 
-    sale_results = sell_booster_packs_for_batch(
-        price_dict_for_listing_hashes,
-        update_steam_inventory=update_steam_inventory,
-        focus_on_marketable_items=focus_on_marketable_items,
-        profile_id=profile_id,
-    )
+    try:
+        # Fallback: if the asset ID is missing from the creation response, look the booster pack up in the inventory.
+        if len(listing_hashes_to_look_up) > 0:
+            sale_results.update(
+                sell_booster_packs_for_batch(
+                    {
+                        listing_hash: price_dict_for_listing_hashes[listing_hash]
+                        for listing_hash in listing_hashes_to_look_up
+                    },
+                    update_steam_inventory=update_steam_inventory,
+                    focus_on_marketable_items=focus_on_marketable_items,
+                    profile_id=profile_id,
+                ),
+            )
+    finally:
+        # NB: gems were spent on the booster packs which were created, so their next creation times are always saved.
+        if save_next_creation_times:
+            update_and_save_next_creation_times(
+                creation_results,
+                next_creation_time_file_name=next_creation_time_file_name,
+            )
 
-    next_creation_times = update_and_save_next_creation_times(creation_results)
+    if len(exceptions) > 0:
+        raise exceptions[0]
 
     return creation_results, sale_results
 
@@ -447,11 +790,13 @@ def update_and_save_next_creation_times(
         next_creation_time_file_name = get_next_creation_time_file_name()
 
     next_creation_times = load_next_creation_time_data(next_creation_time_file_name)
+    next_creation_epochs = {}
 
     delay_in_days = get_crafting_cooldown_duration_in_days()
     formatted_next_creation_time = get_formatted_current_time(
         delay_in_days=delay_in_days,
     )
+    next_creation_epoch = get_current_epoch() + get_crafting_cooldown_duration_in_seconds()
 
     save_to_disk = False
     is_first_displayed_line = True
@@ -460,8 +805,9 @@ def update_and_save_next_creation_times(
         result = creation_results[listing_hash]
 
         if result is not None:
-            app_id = convert_listing_hash_to_app_id(listing_hash)
+            app_id = get_app_id(listing_hash)
             next_creation_times[app_id] = formatted_next_creation_time
+            next_creation_epochs[app_id] = next_creation_epoch
 
             save_to_disk = True
 
@@ -472,13 +818,16 @@ def update_and_save_next_creation_times(
                     print()
                     is_first_displayed_line = False
 
-                app_name = convert_listing_hash_to_app_name(listing_hash)
+                app_name = get_app_name(listing_hash)
                 print(
                     f'Saving the next creation time ({formatted_next_creation_time}) for {app_name} (appID = {app_id}) to disk.',
                 )
 
     if save_to_disk:
-        save_json(next_creation_times, next_creation_time_file_name)
+        # NB: the time in Valve's format is kept for display. The timestamp is used to filter booster packs. The exact
+        #     timestamps of the booster packs which were just created are saved, the others are computed when loaded.
+        save_to_market_store('creation_times', next_creation_time_file_name, next_creation_times)
+        save_next_creation_epochs_to_market_store(next_creation_time_file_name, next_creation_epochs)
 
     return next_creation_times
 
@@ -2,18 +2,19 @@
 # - a booster pack was crafted at least once in the past,
 # - the sell price (without the Steam Market fee) is higher than the cost to craft a Booster Pack.
 
-from creation_time_utils import load_next_creation_time_data
+from creation_time_utils import load_next_creation_epochs
+from listing_catalogue import get_app_id
 from market_search import load_all_listings
 from parsing_utils import parse_badge_creation_details
 from sack_of_gems import get_num_gems_per_sack_of_gems, load_sack_of_gems_price
-from transaction_fee import compute_sell_price_without_fee
-from utils import convert_listing_hash_to_app_id
+from src.money_utils import convert_euros_to_cents, convert_euros_to_cents_rounded_up
+from transaction_fee import compute_seller_price_in_cents
 
 
 def get_app_ids_of_interest() -> list[str]:
     # List appIDs for which a booster pack was crafted at least once in the past.
 
-    data = load_next_creation_time_data()
+    data = load_next_creation_epochs()
 
     app_ids = [str(app_id) for app_id in data]
 
@@ -23,8 +24,8 @@ def get_app_ids_of_interest() -> list[str]:
 def get_sell_prices_without_fee(
     app_ids: list[str],
     price_offset_in_euros: float = 0.0,
-) -> dict[str, float]:
-    # Load sell prices (without fee).
+) -> dict[str, int]:
+    # Load sell prices (without fee), in cents.
     #
     # NB: an arbitrary price offset (greater than or equal to zero) can be input to constrain the problem even more.
     # This is a security: if the price offset is positive (>0), then we know that we can under-cut the lowest sell order
@@ -35,20 +36,21 @@ def get_sell_prices_without_fee(
     sell_prices = {}
 
     for listing_hash in data:
-        app_id_as_int = convert_listing_hash_to_app_id(listing_hash)
+        app_id_as_int = get_app_id(listing_hash)
         app_id = str(app_id_as_int)
 
         if app_id in app_ids:
             current_data = data[listing_hash]
 
-            sell_price_in_cents = current_data['sell_price']
-            sell_price_in_euros = int(sell_price_in_cents) / 100
-            sell_price_after_arbitrary_offset = sell_price_in_euros - abs(price_offset_in_euros)
-            sell_price_in_euros_without_fee = compute_sell_price_without_fee(
+            sell_price_in_cents = int(current_data['sell_price'])
+            sell_price_after_arbitrary_offset = sell_price_in_cents - convert_euros_to_cents(
+                abs(price_offset_in_euros),
+            )
+            sell_price_in_cents_without_fee = compute_seller_price_in_cents(
                 sell_price_after_arbitrary_offset,
             )
 
-            sell_prices[app_id] = sell_price_in_euros_without_fee
+            sell_prices[app_id] = sell_price_in_cents_without_fee
 
     return sell_prices
 
@@ -75,7 +77,7 @@ def get_gem_amount_for_a_booster_pack(app_ids: list[str]) -> dict[str, int]:
 
 def filter_app_ids_with_potential_profit(
     app_ids: list[str],
-    sell_prices_without_fee: dict[str, float],
+    sell_prices_without_fee: dict[str, int],
     gem_amounts_for_a_booster_pack: dict[str, int],
     gem_sack_price_in_euros: float = None,
     verbose: bool = True,
@@ -95,7 +97,9 @@ def filter_app_ids_with_potential_profit(
 
     for app_id in app_ids_as_int:
         gem_amount = gem_amounts_for_a_booster_pack[str(app_id)]
-        gem_price = gem_amount * gem_sack_price_in_euros / num_gems_per_sack
+        gem_price = convert_euros_to_cents_rounded_up(
+            gem_amount * gem_sack_price_in_euros / num_gems_per_sack,
+        )
 
         sell_price_without_fee = sell_prices_without_fee[str(app_id)]
 
@@ -0,0 +1,116 @@
+# Objective: parse each listing hash once, instead of splitting the same strings again and again across modules.
+#
+# Each listing hash is interned into a record. Records are shared: two modules which parse the same listing hash get the
+# same record.
+#
+# NB: the rarity of an item is not encoded in its listing hash. It is only known from the listings themselves.
+
+import sys
+import threading
+from dataclasses import dataclass
+
+from market_listing import get_steam_market_listing_url
+from utils import (
+    convert_listing_hash_to_app_id,
+    convert_listing_hash_to_app_name,
+    get_category_name_for_booster_packs,
+    get_category_name_for_foil_cards,
+    get_foil_suffix,
+    get_listing_hash_suffixe,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class ListingRecord:
+    listing_hash: str
+    app_id: int
+    item_name: str
+    app_name: [str | None]  # only for booster packs
+    category_name: [str | None]  # None if the category cannot be inferred from the listing hash
+    is_foil: bool
+
+
+_listing_records_by_hash = {}
+_catalogue_lock = threading.Lock()
+
+
+def parse_listing_hash(listing_hash: str) -> ListingRecord:
+    app_id = convert_listing_hash_to_app_id(listing_hash)
+    item_name = listing_hash.split('-', 1)[1]
+
+    is_booster_pack = listing_hash.endswith(get_listing_hash_suffixe())
+    is_foil = listing_hash.endswith(get_foil_suffix())
+
+    if is_booster_pack:
+        app_name = convert_listing_hash_to_app_name(listing_hash)
+        category_name = get_category_name_for_booster_packs()
+    elif is_foil:
+        app_name = None
+        category_name = get_category_name_for_foil_cards()
+    else:
+        app_name = None
+        category_name = None
+
+    listing_record = ListingRecord(
+        listing_hash=listing_hash,
+        app_id=app_id,
+        item_name=item_name,
+        app_name=app_name,
+        category_name=category_name,
+        is_foil=is_foil,
+    )
+
+    return listing_record
+
+
+def get_listing_record(listing_hash: str) -> ListingRecord:
+    try:
+        return _listing_records_by_hash[listing_hash]
+    except KeyError:
+        pass
+
+    with _catalogue_lock:
+        # NB: check again, in case another thread parsed the same listing hash in the meantime.
+        try:
+            return _listing_records_by_hash[listing_hash]
+        except KeyError:
+            listing_hash = sys.intern(listing_hash)
+
+            listing_record = parse_listing_hash(listing_hash)
+
+            _listing_records_by_hash[listing_hash] = listing_record
+
+    return listing_record
+
+
+def get_listing_records(listing_hashes: list[str]) -> list[ListingRecord]:
+    listing_records = [get_listing_record(listing_hash) for listing_hash in listing_hashes]
+
+    return listing_records
+
+
+def get_app_id(listing_hash: str) -> int:
+    app_id = get_listing_record(listing_hash).app_id
+
+    return app_id
+
+
+def get_app_name(listing_hash: str) -> [str | None]:
+    app_name = get_listing_record(listing_hash).app_name
+
+    return app_name
+
+
+def get_markdown_compatible_market_url(listing_hash: str) -> str:
+    # NB: the url is only built for the listings which are displayed, and get_steam_market_listing_url() is memoized.
+    listing_record = get_listing_record(listing_hash)
+
+    markdown_compatible_steam_market_url = get_steam_market_listing_url(
+        listing_hash=listing_record.listing_hash,
+        render_as_json=False,
+        replace_spaces=True,
+        # To fix links to listings of **foil** cards, which have '(Foil)' at the end of the url
+        replace_parenthesis=listing_record.is_foil,
+    )
+
+    return markdown_compatible_steam_market_url
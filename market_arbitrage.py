@@ -1,19 +1,35 @@
 # Objective: find market arbitrages, e.g. sell a pack for more (fee excluded) than the cost to craft it (fee included).
 
 
+from arbitrage_engine import (
+    build_arbitrage_state,
+    build_badge_arrays,
+    compute_arbitrage_mask,
+    compute_depth_aware_profits,
+    compute_low_sell_price_mask,
+    get_gem_price_from_arbitrage_state,
+    sweep_sack_of_gems_prices,
+)
 from creation_time_utils import (
     determine_whether_a_booster_pack_can_be_crafted,
     fill_in_badges_with_next_creation_times_loaded_from_disk,
     get_current_time,
 )
 from inventory_utils import create_then_sell_booster_packs_for_batch
-from market_listing import get_steam_market_listing_url, update_marketability_status
+from listing_catalogue import get_app_id, get_markdown_compatible_market_url
+from market_listing import update_marketability_status
 from market_order import load_market_order_data
 from market_utils import load_aggregated_badge_data
-from sack_of_gems import print_gem_price_reminder
-from transaction_fee import compute_sell_price_without_fee
+from sack_of_gems import (
+    get_gem_price,
+    get_num_gems_per_sack_of_gems,
+    load_sack_of_gems_price,
+    print_gem_price_reminder,
+)
+from src.money_utils import convert_euros_to_cents, format_price_in_cents
+from src.ranking_utils import iterate_by_decreasing_key
+from transaction_fee import compute_seller_price_in_cents
 from utils import (
-    convert_listing_hash_to_app_id,
     get_bullet_point_for_display,
     get_steam_store_url,
     get_steamcardexchange_url,
@@ -95,10 +111,10 @@ def filter_out_badges_recently_crafted(
 
 def determine_whether_an_arbitrage_might_exist(
     badge_data: dict,
-    user_chosen_price_threshold: float = None,
+    user_chosen_price_threshold: int = None,  # in cents
 ) -> bool:
     sell_price_including_fee = badge_data['sell_price']
-    sell_price_without_fee = compute_sell_price_without_fee(sell_price_including_fee)
+    sell_price_without_fee = compute_seller_price_in_cents(sell_price_including_fee)
 
     try:
         gem_price_with_fee = badge_data['gem_price']
@@ -139,7 +155,7 @@ def determine_whether_sell_price_is_unknown(badge_data: dict) -> bool:
 
 def filter_out_badges_with_low_sell_price(
     aggregated_badge_data: dict[int | str, dict],
-    user_chosen_price_threshold: float = None,
+    user_chosen_price_threshold: int = None,  # in cents
     category_name: str = None,
     verbose: bool = True,
 ) -> dict[int | str, dict]:
@@ -153,30 +169,23 @@ def filter_out_badges_with_low_sell_price(
         threshold_name = 'gem price'
     else:
         threshold_name = (
-            f'user-chosen price threshold {user_chosen_price_threshold / 100:.2f} €'
+            f'user-chosen price threshold {format_price_in_cents(user_chosen_price_threshold)}'
         )
 
-    filtered_badge_data = {}
-
-    unknown_price_counter = 0
-
-    for app_id in aggregated_badge_data:
-        individual_badge_data = aggregated_badge_data[app_id]
-
-        sell_price_is_unknown = determine_whether_sell_price_is_unknown(
-            individual_badge_data,
-        )
+    badge_arrays = build_badge_arrays(aggregated_badge_data)
 
-        an_arbitrage_might_exist = determine_whether_an_arbitrage_might_exist(
-            individual_badge_data,
-            user_chosen_price_threshold=user_chosen_price_threshold,
-        )
+    masks = compute_low_sell_price_mask(
+        badge_arrays,
+        user_chosen_price_threshold=user_chosen_price_threshold,
+    )
 
-        if sell_price_is_unknown or an_arbitrage_might_exist:
-            filtered_badge_data[app_id] = individual_badge_data
+    filtered_badge_data = {
+        app_id: aggregated_badge_data[app_id]
+        for app_id, is_kept in zip(badge_arrays['app_id'], masks['is_kept'])
+        if is_kept
+    }
 
-            if sell_price_is_unknown:
-                unknown_price_counter += 1
+    unknown_price_counter = int(masks['sell_price_is_unknown'].sum())
 
     if verbose:
         print(
@@ -204,69 +213,68 @@ def find_badge_arbitrages(
             verbose=verbose,
         )
 
-    badge_arbitrages = {}
-
-    for app_id in badge_data:
-        individual_badge_data = badge_data[app_id]
-
-        gem_price_including_fee = individual_badge_data['gem_price']
-
-        listing_hash = individual_badge_data['listing_hash']
-
-        try:
-            bid_including_fee = market_order_dict[listing_hash]['bid']
-        except KeyError:
-            bid_including_fee = -1
-
-            if verbose:
-                print(
-                    'Bid not found for {}. Reason is likely that you asked not to retrieve market orders.'.format(
-                        listing_hash,
-                    ),
-                )
-
-        bid_without_fee = compute_sell_price_without_fee(bid_including_fee)
-
-        if bid_including_fee < 0:
-            continue
+    if verbose:
+        for listing_hash in [badge_data[app_id]['listing_hash'] for app_id in badge_data]:
+            if listing_hash in market_order_dict:
+                continue
+            print(
+                'Bid not found for {}. Reason is likely that you asked not to retrieve market orders.'.format(
+                    listing_hash,
+                ),
+            )
 
-        delta = bid_without_fee - gem_price_including_fee
+    badge_arrays = build_badge_arrays(badge_data, market_order_dict)
 
-        # Check whether there is a profit to be made
-        is_an_arbitrage = bool(delta > 0)
+    scores = compute_arbitrage_mask(badge_arrays)
 
-        if is_an_arbitrage:
-            badge_arbitrages[listing_hash] = {}
+    badge_arbitrages = {}
 
-            # Warning: for profile backgrounds and emoticons, you cannot trust the value of app_id stored here,
-            #          because app_id is a dummy variable, which is simply a copy of listing_hash.
-            #
-            #          However, for booster packs, app_id is correct, because there is a one-to-one mapping between
-            #          appIDs and listing hashes of booster packs.
-            badge_arbitrages[listing_hash]['app_id'] = app_id
+    # NB: arbitrages are ranked by decreasing profit.
+    for i in scores['ranking']:
+        app_id = badge_arrays['app_id'][i]
+        listing_hash = badge_arrays['listing_hash'][i]
+        individual_badge_data = badge_data[app_id]
+        market_order = market_order_dict[listing_hash]
 
-            try:
-                badge_arbitrages[listing_hash]['name'] = individual_badge_data['name']
-            except KeyError:
-                badge_arbitrages[listing_hash]['name'] = None
-            try:
-                badge_arbitrages[listing_hash]['gem_amount'] = individual_badge_data['gem_amount']
-            except KeyError:
-                badge_arbitrages[listing_hash]['gem_amount'] = None
-            badge_arbitrages[listing_hash]['gem_price_including_fee'] = individual_badge_data['gem_price']
-            badge_arbitrages[listing_hash]['sell_price'] = individual_badge_data['sell_price']
+        delta = int(scores['delta'][i])
 
-            badge_arbitrages[listing_hash]['ask_including_fee'] = market_order_dict[listing_hash]['ask']
-            badge_arbitrages[listing_hash]['bid_including_fee'] = market_order_dict[listing_hash]['bid']
-            badge_arbitrages[listing_hash]['ask_volume'] = market_order_dict[listing_hash]['ask_volume']
-            badge_arbitrages[listing_hash]['bid_volume'] = market_order_dict[listing_hash]['bid_volume']
-            badge_arbitrages[listing_hash]['is_marketable'] = market_order_dict[listing_hash]['is_marketable']
+        badge_arbitrages[listing_hash] = {}
 
-            badge_arbitrages[listing_hash]['bid_without_fee'] = bid_without_fee
-            badge_arbitrages[listing_hash]['profit'] = delta
+        # Warning: for profile backgrounds and emoticons, you cannot trust the value of app_id stored here,
+        #          because app_id is a dummy variable, which is simply a copy of listing_hash.
+        #
+        #          However, for booster packs, app_id is correct, because there is a one-to-one mapping between
+        #          appIDs and listing hashes of booster packs.
+        badge_arbitrages[listing_hash]['app_id'] = app_id
+
+        badge_arbitrages[listing_hash]['name'] = individual_badge_data.get('name')
+        badge_arbitrages[listing_hash]['gem_amount'] = individual_badge_data.get('gem_amount')
+        badge_arbitrages[listing_hash]['gem_price_including_fee'] = individual_badge_data['gem_price']
+        badge_arbitrages[listing_hash]['sell_price'] = individual_badge_data['sell_price']
+
+        # NB: all the prices are in cents, including the market orders, which are converted when downloaded.
+        badge_arbitrages[listing_hash]['ask_including_fee'] = market_order['ask']
+        badge_arbitrages[listing_hash]['bid_including_fee'] = market_order['bid']
+        badge_arbitrages[listing_hash]['ask_volume'] = market_order['ask_volume']
+        badge_arbitrages[listing_hash]['bid_volume'] = market_order['bid_volume']
+        badge_arbitrages[listing_hash]['is_marketable'] = market_order['is_marketable']
+
+        badge_arbitrages[listing_hash]['bid_without_fee'] = int(scores['bid_without_fee'][i])
+        badge_arbitrages[listing_hash]['profit'] = delta
+
+        # If the depth of the buy orders is known, size the sale beyond the highest buy order.
+        if 'buy_order_ladder' in market_order:
+            depth_aware_profits = compute_depth_aware_profits(
+                market_order['buy_order_ladder'],
+                individual_badge_data['gem_price'],
+            )
+            badge_arbitrages[listing_hash]['buy_order_ladder'] = market_order['buy_order_ladder']
+            badge_arbitrages[listing_hash]['optimal_quantity'] = depth_aware_profits['optimal_quantity']
+            badge_arbitrages[listing_hash]['optimal_profit'] = depth_aware_profits['optimal_profit']
+            badge_arbitrages[listing_hash]['optimal_price'] = depth_aware_profits['optimal_price']
 
-            if verbose:
-                print(f'{delta:.2f}€\t{listing_hash}')
+        if verbose:
+            print(f'{format_price_in_cents(delta)}\t{listing_hash}')
 
     return badge_arbitrages
 
@@ -280,10 +288,9 @@ def print_arbitrages(
         use_numbered_bullet_points=use_numbered_bullet_points,
     )
 
-    for listing_hash in sorted(
-        badge_arbitrages.keys(),
+    for listing_hash in iterate_by_decreasing_key(
+        badge_arbitrages,
         key=lambda x: badge_arbitrages[x]['profit'],
-        reverse=True,
     ):
         arbitrage = badge_arbitrages[listing_hash]
 
@@ -292,13 +299,9 @@ def print_arbitrages(
             continue
 
         if use_hyperlink:
-            app_id = convert_listing_hash_to_app_id(listing_hash)
+            app_id = get_app_id(listing_hash)
 
-            markdown_compatible_steam_market_url = get_steam_market_listing_url(
-                listing_hash=listing_hash,
-                render_as_json=False,
-                replace_spaces=True,
-            )
+            markdown_compatible_steam_market_url = get_markdown_compatible_market_url(listing_hash)
 
             listing_hash_formatted_for_markdown = (
                 '[[store]({})][[market]({})] [{}]({})'.format(
@@ -315,33 +318,51 @@ def print_arbitrages(
 
         gem_amount_as_str = gem_amount if gem_amount is None else f'{gem_amount:.0f}'
 
+        # If the depth of the buy orders is known, show how many packs could be sold, at what price, for what profit.
+        if arbitrage.get('optimal_quantity', 0) > 0:
+            depth_as_str = ' | depth: sell {} for {} each (profit: {})'.format(
+                arbitrage['optimal_quantity'],
+                format_price_in_cents(arbitrage['optimal_price']),
+                format_price_in_cents(arbitrage['optimal_profit']),
+            )
+        else:
+            depth_as_str = ''
+
+        # NB: prices are stored in cents, and only formatted in euros for display.
         print(
-            '{}Profit: {:.2f}€\t{}\t| craft pack: {} gems ({:.2f}€) | sell for {:.2f}€ ({:.2f}€ incl. fee) (#={})'.format(
+            '{}Profit: {}\t{}\t| craft pack: {} gems ({}) | sell for {} ({} incl. fee) (#={}){}'.format(
                 bullet_point,
-                arbitrage['profit'],
+                format_price_in_cents(arbitrage['profit']),
                 listing_hash_formatted_for_markdown,
                 gem_amount_as_str,
-                arbitrage['gem_price_including_fee'],
-                arbitrage['bid_without_fee'],
-                arbitrage['bid_including_fee'],
+                format_price_in_cents(arbitrage['gem_price_including_fee']),
+                format_price_in_cents(arbitrage['bid_without_fee']),
+                format_price_in_cents(arbitrage['bid_including_fee']),
                 arbitrage['bid_volume'],
+                depth_as_str,
             ),
         )
 
 
 def convert_arbitrages_for_batch_create_then_sell(
     badge_arbitrages: dict[str, dict],
-    profit_threshold: float = 0.01,  # profit in euros
+    profit_threshold: int = 1,  # profit in cents
+    num_packs_per_listing_hash: int = 1,
     verbose: bool = True,
-) -> dict[str, float]:
+) -> dict[str, int]:
     # Code inspired from print_arbitrages()
+    #
+    # NB: if the depth of the buy orders is known, the price is the lowest price without fee at which the packs to sell
+    #     are all bought, and which maximizes the profit. By default, one pack is crafted per listing hash, due to the
+    #     cooldown, in which case this is the highest buy order without fee.
 
     price_dict_for_listing_hashes = {}
 
-    for listing_hash in sorted(
-        badge_arbitrages.keys(),
+    # NB: arbitrages below the profit threshold are discarded before ranking.
+    for listing_hash in iterate_by_decreasing_key(
+        badge_arbitrages,
         key=lambda x: badge_arbitrages[x]['profit'],
-        reverse=True,
+        threshold=profit_threshold,
     ):
         arbitrage = badge_arbitrages[listing_hash]
 
@@ -349,10 +370,20 @@ def convert_arbitrages_for_batch_create_then_sell(
         if not arbitrage['is_marketable']:
             continue
 
-        if arbitrage['profit'] < profit_threshold:
-            break
+        if 'buy_order_ladder' in arbitrage:
+            depth_aware_profits = compute_depth_aware_profits(
+                arbitrage['buy_order_ladder'],
+                arbitrage['gem_price_including_fee'],
+                max_quantity=num_packs_per_listing_hash,
+            )
+
+            if depth_aware_profits['optimal_quantity'] == 0:
+                continue
+
+            price_in_cents = depth_aware_profits['optimal_price']
+        else:
+            price_in_cents = arbitrage['bid_without_fee']
 
-        price_in_cents = 100 * arbitrage['bid_without_fee']
         price_dict_for_listing_hashes[listing_hash] = price_in_cents
 
     if verbose:
@@ -365,9 +396,12 @@ def update_badge_arbitrages_with_latest_market_order_data(
     badge_data: dict[int, dict],
     arbitrage_data: dict[str, dict],
     retrieve_market_orders_online: bool = True,
+    sack_of_gems_price_in_cents: int = None,
     verbose: bool = False,
 ) -> dict[str, dict]:
     # Objective: ensure that we have the latest market orders before trying to automatically create & sell booster packs
+    #
+    # NB: if the price of a sack of gems is provided, e.g. after a new quote, the gem prices are updated with it.
 
     # Based on arbitrage_data, select the badge_data for which we want to download (again) the latest market orders:
     selected_badge_data = {}
@@ -376,15 +410,38 @@ def update_badge_arbitrages_with_latest_market_order_data(
         arbitrage = arbitrage_data[listing_hash]
 
         if arbitrage['is_marketable'] and arbitrage['profit'] > 0:
-            app_id = convert_listing_hash_to_app_id(listing_hash)
+            app_id = get_app_id(listing_hash)
             selected_badge_data[app_id] = badge_data[app_id]
 
+    # NB: the market orders are downloaded again, instead of being served from the memory of recent responses.
     market_order_dict = load_market_order_data(
         badge_data=selected_badge_data,
         retrieve_market_orders_online=retrieve_market_orders_online,
         verbose=verbose,
+        freshness_in_seconds=0,
     )
 
+    if sack_of_gems_price_in_cents is not None:
+        arbitrage_state = build_arbitrage_state(
+            selected_badge_data,
+            market_order_dict,
+            sack_of_gems_price_in_cents,
+        )
+
+        # NB: the gem price is missing for dummy badge data (profile backgrounds and emoticons), and stays missing.
+        selected_badge_data = {
+            app_id: {
+                **selected_badge_data[app_id],
+                'gem_price': get_gem_price_from_arbitrage_state(
+                    arbitrage_state,
+                    selected_badge_data[app_id]['listing_hash'],
+                ),
+            }
+            if 'gem_price' in selected_badge_data[app_id]
+            else selected_badge_data[app_id]
+            for app_id in selected_badge_data
+        }
+
     latest_badge_arbitrages = find_badge_arbitrages(
         badge_data=selected_badge_data,
         market_order_dict=market_order_dict,
@@ -434,7 +491,7 @@ def apply_workflow(
     enforced_sack_of_gems_price: float = None,
     minimum_allowed_sack_of_gems_price: float = None,
     automatically_create_then_sell_booster_packs: bool = False,
-    profit_threshold: float = 0.01,  # profit in euros
+    profit_threshold: int = 1,  # profit in cents
     quick_check_with_tracked_booster_packs: bool = False,
     enforce_update_of_marketability_status: bool = False,
     from_javascript: bool = False,
@@ -491,10 +548,19 @@ def apply_workflow(
     )
     print_arbitrages(badge_arbitrages)
 
+    # The price of a sack of gems is downloaded again before crafting, as it may have changed during the slow update.
+    latest_gem_price = get_gem_price(
+        enforced_sack_of_gems_price=enforced_sack_of_gems_price,
+        minimum_allowed_sack_of_gems_price=minimum_allowed_sack_of_gems_price,
+        retrieve_gem_price_from_scratch=automatically_create_then_sell_booster_packs
+        and enforced_sack_of_gems_price is None,
+    )
+
     latest_badge_arbitrages = update_badge_arbitrages_with_latest_market_order_data(
         badge_data=filtered_badge_data,
         arbitrage_data=badge_arbitrages,
         retrieve_market_orders_online=True,
+        sack_of_gems_price_in_cents=convert_euros_to_cents(latest_gem_price * get_num_gems_per_sack_of_gems()),
         verbose=verbose,
     )
     # Update marketability status
@@ -531,19 +597,122 @@ def apply_workflow(
     return True
 
 
-def main() -> bool:
+def get_default_sack_of_gems_prices_for_sweep(
+    reference_sack_of_gems_price_in_cents: int,
+) -> list[int]:
+    # From half to twice the reference price, with a step of 1 cent.
+    sack_of_gems_prices_in_cents = list(
+        range(
+            max(1, reference_sack_of_gems_price_in_cents // 2),
+            2 * reference_sack_of_gems_price_in_cents + 1,
+        ),
+    )
+
+    return sack_of_gems_prices_in_cents
+
+
+def print_sweep_table(sweep: dict) -> None:
+    print('Sack of gems\t#packs\t#gems\t#sacks\tTotal profit')
+
+    for i, sack_of_gems_price_in_cents in enumerate(sweep['sack_of_gems_price']):
+        print(
+            '{}\t\t{}\t{}\t{}\t{}'.format(
+                format_price_in_cents(sack_of_gems_price_in_cents),
+                sweep['num_profitable_packs'][i],
+                sweep['num_gems_required'][i],
+                sweep['num_sacks_required'][i],
+                format_price_in_cents(sweep['total_profit'][i]),
+            ),
+        )
+
+
+def apply_sweep_workflow(
+    retrieve_listings_from_scratch: bool = False,
+    retrieve_market_orders_online: bool = False,
+    sack_of_gems_prices: list[float] = None,  # prices in euros
+    from_javascript: bool = False,
+    verbose: bool = True,
+) -> dict:
+    # Objective: from one market snapshot, find the break-even price of a sack of gems for every pack, and the profit
+    # over a grid of prices of a sack of gems, instead of running apply_workflow() once per gem price.
+
+    reference_sack_of_gems_price = load_sack_of_gems_price(
+        retrieve_gem_price_from_scratch=False,
+        verbose=verbose,
+    )
+
+    # NB: badge data is not filtered based on the gem price, as the gem price is the parameter of the sweep.
+    badge_data = get_filtered_badge_data(
+        retrieve_listings_from_scratch=retrieve_listings_from_scratch,
+        enforced_sack_of_gems_price=reference_sack_of_gems_price,
+        check_ask_price=False,
+        from_javascript=from_javascript,
+    )
+
+    market_order_dict = load_market_order_data(
+        badge_data,
+        retrieve_market_orders_online=retrieve_market_orders_online,
+        verbose=False,
+    )
+
+    if market_order_dict is None:
+        market_order_dict = {}
+
+    # Skip unmarketable booster packs
+    marketable_badge_data = {
+        app_id: badge_data[app_id]
+        for app_id in badge_data
+        if market_order_dict.get(badge_data[app_id]['listing_hash'], {}).get('is_marketable')
+    }
+
+    reference_sack_of_gems_price_in_cents = convert_euros_to_cents(reference_sack_of_gems_price)
+
+    if sack_of_gems_prices is None:
+        sack_of_gems_prices_in_cents = get_default_sack_of_gems_prices_for_sweep(
+            reference_sack_of_gems_price_in_cents,
+        )
+    else:
+        sack_of_gems_prices_in_cents = [convert_euros_to_cents(p) for p in sack_of_gems_prices]
+
+    state = build_arbitrage_state(
+        marketable_badge_data,
+        market_order_dict,
+        reference_sack_of_gems_price_in_cents,
+    )
+
+    sweep = sweep_sack_of_gems_prices(state, sack_of_gems_prices_in_cents)
+
+    if verbose:
+        print_sweep_table(sweep)
+
+    return sweep
+
+
+def main(sweep_sack_of_gems_prices: bool = False) -> bool:
     retrieve_listings_from_scratch = True
     retrieve_market_orders_online = True
     enforced_sack_of_gems_price = None
     minimum_allowed_sack_of_gems_price = None
     automatically_create_then_sell_booster_packs = True
-    profit_threshold = 0.0  # profit in euros
+    profit_threshold = 0  # profit in cents
     quick_check_with_tracked_booster_packs = False
     enforce_update_of_marketability_status = True
     from_javascript = True
     profile_id = None
     verbose = True
 
+    if sweep_sack_of_gems_prices:
+        # Print the number of profitable packs, the number of sacks of gems to buy, and the total profit, over a range
+        # of prices of a sack of gems, instead of crafting then selling packs at the current price.
+        apply_sweep_workflow(
+            retrieve_listings_from_scratch=retrieve_listings_from_scratch,
+            retrieve_market_orders_online=retrieve_market_orders_online,
+            from_javascript=from_javascript,
+            verbose=verbose,
+        )
+
+        return True
+
     apply_workflow(
         retrieve_listings_from_scratch=retrieve_listings_from_scratch,
         retrieve_market_orders_online=retrieve_market_orders_online,
@@ -5,26 +5,35 @@
 #
 # In summary, we do not care about buy orders here! We only care about sell orders!
 
-import requests
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
+import numpy as np
+
+from arbitrage_engine import build_foil_card_arrays, score_foil_cards
+from creation_time_utils import get_current_epoch
+from listing_catalogue import get_app_id, get_markdown_compatible_market_url
 from market_gamble_detector import update_all_listings_for_foil_cards
 from market_listing import (
     get_item_nameid_batch,
-    get_steam_market_listing_url,
     load_all_listing_details,
     update_all_listing_details,
 )
 from market_search import load_all_listings
+from market_store import query_goo_values, save_to_market_store
 from personal_info import (
     get_cookie_dict,
     update_and_save_cookie_to_disk_if_values_changed,
 )
 from sack_of_gems import get_num_gems_per_sack_of_gems, load_sack_of_gems_price
-from src.json_utils import load_json, save_json
+from src.json_utils import load_json, save_json, save_json_in_background
+from src.ranking_utils import iterate_by_decreasing_key
+from src.request_utils import acquire_rate_limit_token, get_http_session
 from utils import (
-    convert_listing_hash_to_app_id,
     get_bullet_point_for_display,
+    get_foil_suffix,
     get_goo_details_file_nam_for_for_foil_cards,
+    get_goo_value_cache_file_name,
+    get_listing_details_output_file_name,
     get_listing_details_output_file_name_for_foil_cards,
     get_listing_output_file_name_for_foil_cards,
 )
@@ -82,6 +91,7 @@ def get_item_type_no_for_trading_cards(
         if all_listing_details is None:
             all_listing_details = load_all_listing_details(
                 listing_details_output_file_name=listing_details_output_file_name,
+                read_only=True,
             )
 
         try:
@@ -155,8 +165,12 @@ def query_goo_value(
     app_id: int,
     item_type: int,
     verbose: bool = True,
+    cookie: dict[str, str] = None,
+    is_foil: bool = True,
 ) -> [int | None]:
-    cookie = get_cookie_dict()
+    # NB: the cookie can be provided, so that it is read from disk once for a batch of queries.
+    if cookie is None:
+        cookie = get_cookie_dict()
     has_secured_cookie = bool(len(cookie) > 0)
 
     url = get_steam_goo_value_url()
@@ -164,12 +178,15 @@ def query_goo_value(
     req_data = get_steam_goo_value_parameters(
         app_id=app_id,
         item_type=item_type,
+        is_foil=is_foil,
     )
 
+    session = get_http_session()
+
     if has_secured_cookie:
-        resp_data = requests.get(url, params=req_data, cookies=cookie)
+        resp_data = session.get(url, params=req_data, cookies=cookie)
     else:
-        resp_data = requests.get(url, params=req_data)
+        resp_data = session.get(url, params=req_data)
     status_code = resp_data.status_code
 
     if resp_data.ok:
@@ -202,7 +219,7 @@ def get_listings_for_foil_cards(
     if listing_output_file_name is None:
         listing_output_file_name = get_listing_output_file_name_for_foil_cards()
 
-    all_listings = load_all_listings(listing_output_file_name)
+    all_listings = load_all_listings(listing_output_file_name, read_only=True)
 
     if verbose:
         print(f'#listings = {len(all_listings)}')
@@ -216,7 +233,7 @@ def group_listing_hashes_by_app_id(
 ) -> dict[int, list[str]]:
     groups_by_app_id = {}
     for listing_hash in all_listings:
-        app_id = convert_listing_hash_to_app_id(listing_hash)
+        app_id = get_app_id(listing_hash)
 
         try:
             groups_by_app_id[app_id].append(listing_hash)
@@ -238,12 +255,12 @@ def find_cheapest_listing_hashes(
     for app_id in groups_by_app_id:
         listing_hashes = groups_by_app_id[app_id]
 
-        # Sort with respect to two attributes:
+        # Compare with respect to two attributes:
         #   - ascending sell prices,
         #   - **descending** volumes.
         #  So that, in case the sell price is equal for two listings, the listing with the highest volume is favored.
 
-        sorted_listing_hashes = sorted(
+        cheapest_listing_hash = min(
             listing_hashes,
             key=lambda x: (
                 all_listings[x]['sell_price'],
@@ -251,8 +268,6 @@ def find_cheapest_listing_hashes(
             ),
         )
 
-        cheapest_listing_hash = sorted_listing_hashes[0]
-
         cheapest_listing_hashes.append(cheapest_listing_hash)
 
     return cheapest_listing_hashes
@@ -279,11 +294,9 @@ def find_representative_listing_hashes(
 
         listing_hashes = groups_by_app_id[app_id]
 
-        # Sort with respect to lexicographical order.
+        # First element with respect to lexicographical order.
 
-        sorted_listing_hashes = sorted(listing_hashes)
-
-        representative_listing_hash = sorted_listing_hashes[0]
+        representative_listing_hash = min(listing_hashes)
 
         if (
             previously_used_listing_hashes_for_app_id is None
@@ -345,7 +358,7 @@ def load_all_goo_details(
         goo_details_file_name = get_goo_details_file_nam_for_for_foil_cards()
 
     try:
-        all_goo_details = load_json(goo_details_file_name)
+        all_goo_details = query_goo_values(goo_details_file_name)
     except FileNotFoundError:
         all_goo_details = {}
 
@@ -361,7 +374,8 @@ def save_all_goo_details(
 ) -> None:
     if goo_details_file_name is None:
         goo_details_file_name = get_goo_details_file_nam_for_for_foil_cards()
-    save_json(all_goo_details, goo_details_file_name)
+
+    save_to_market_store('goo_values', goo_details_file_name, all_goo_details)
 
 
 def update_all_goo_details(
@@ -372,7 +386,7 @@ def update_all_goo_details(
         goo_details_file_name = get_goo_details_file_nam_for_for_foil_cards()
 
     all_goo_details = load_all_goo_details(goo_details_file_name)
-    all_goo_details.update(new_goo_details)
+    all_goo_details.update({str(app_id): new_goo_details[app_id] for app_id in new_goo_details})
 
     save_all_goo_details(
         all_goo_details,
@@ -380,6 +394,107 @@ def update_all_goo_details(
     )
 
 
+def get_goo_value_multiplier_for_foil_items() -> int:
+    # The goo value of an item with a foil border is 10 times higher than with the default border.
+    goo_value_multiplier_for_foil_items = 10
+
+    return goo_value_multiplier_for_foil_items
+
+
+def get_goo_value_cache_key(app_id: int, item_type: int, is_foil: bool = True) -> str:
+    border_color = get_border_color_no_for_trading_cards(is_foil=is_foil)
+
+    goo_value_cache_key = f'{app_id}-{item_type}-{border_color}'
+
+    return goo_value_cache_key
+
+
+def load_goo_value_cache(goo_value_cache_file_name: str = None) -> dict[str, dict]:
+    if goo_value_cache_file_name is None:
+        goo_value_cache_file_name = get_goo_value_cache_file_name()
+
+    try:
+        goo_value_cache = load_json(goo_value_cache_file_name)
+    except FileNotFoundError:
+        goo_value_cache = {}
+
+    return goo_value_cache
+
+
+def save_goo_value_cache(
+    goo_value_cache: dict[str, dict],
+    goo_value_cache_file_name: str = None,
+    in_background: bool = False,
+) -> None:
+    if goo_value_cache_file_name is None:
+        goo_value_cache_file_name = get_goo_value_cache_file_name()
+
+    if in_background:
+        save_json_in_background(goo_value_cache, goo_value_cache_file_name)
+    else:
+        save_json(goo_value_cache, goo_value_cache_file_name)
+
+
+def add_goo_value_to_cache(
+    goo_value_cache: dict[str, dict],
+    app_id: int,
+    item_type: int,
+    goo_value: [int | None],
+    is_foil: bool = True,
+    fetch_epoch: int = None,
+) -> dict[str, dict]:
+    # NB: failed queries, and queries with an unknown item type, are not cached, so that they are tried again.
+    if goo_value is None or item_type is None:
+        return goo_value_cache
+
+    if fetch_epoch is None:
+        fetch_epoch = get_current_epoch()
+
+    goo_value_cache_key = get_goo_value_cache_key(app_id, item_type, is_foil=is_foil)
+
+    goo_value_cache[goo_value_cache_key] = {
+        'goo_value': goo_value,
+        'fetch_epoch': fetch_epoch,
+    }
+
+    return goo_value_cache
+
+
+def find_goo_value_in_cache(
+    goo_value_cache: dict[str, dict],
+    app_id: int,
+    item_type: int,
+    is_foil: bool = True,
+) -> [int | None]:
+    # Return None if the goo value is neither cached, nor derivable from the goo value for the other border.
+
+    if item_type is None:
+        return None
+
+    try:
+        goo_value_cache_key = get_goo_value_cache_key(app_id, item_type, is_foil=is_foil)
+        return goo_value_cache[goo_value_cache_key]['goo_value']
+    except KeyError:
+        pass
+
+    multiplier = get_goo_value_multiplier_for_foil_items()
+
+    try:
+        goo_value_cache_key = get_goo_value_cache_key(app_id, item_type, is_foil=not is_foil)
+        other_goo_value = goo_value_cache[goo_value_cache_key]['goo_value']
+    except KeyError:
+        return None
+
+    if is_foil:
+        goo_value = other_goo_value * multiplier
+    elif other_goo_value % multiplier == 0:
+        goo_value = other_goo_value // multiplier
+    else:
+        goo_value = None
+
+    return goo_value
+
+
 def filter_out_listing_hashes_if_goo_details_are_already_known_for_app_id(
     filtered_cheapest_listing_hashes: list[str],
     goo_details_file_name_for_for_foil_cards: str = None,
@@ -397,14 +512,14 @@ def filter_out_listing_hashes_if_goo_details_are_already_known_for_app_id(
         verbose=verbose,
     )
 
-    app_ids_with_previously_downloaded_goo_details = [
+    app_ids_with_previously_downloaded_goo_details = {
         int(app_id) for app_id in previously_downloaded_all_goo_details
-    ]
+    }
 
     filtered_cheapest_listing_hashes = [
         listing_hash
         for listing_hash in filtered_cheapest_listing_hashes
-        if convert_listing_hash_to_app_id(listing_hash)
+        if get_app_id(listing_hash)
         not in app_ids_with_previously_downloaded_goo_details
     ]
 
@@ -415,15 +530,15 @@ def propagate_filter_to_representative_listing_hashes(
     listing_hashes_to_propagate_to: list[str],
     listing_hashes_to_propagate_from: list[str],
 ) -> list[str]:
-    filtered_app_ids_based_on_price_threshold = [
-        convert_listing_hash_to_app_id(listing_hash)
+    filtered_app_ids_based_on_price_threshold = {
+        get_app_id(listing_hash)
         for listing_hash in listing_hashes_to_propagate_from
-    ]
+    }
 
     filtered_representative_listing_hashes = [
         listing_hash
         for listing_hash in listing_hashes_to_propagate_to
-        if convert_listing_hash_to_app_id(listing_hash)
+        if get_app_id(listing_hash)
         in filtered_app_ids_based_on_price_threshold
     ]
 
@@ -435,10 +550,12 @@ def try_again_to_download_item_type(
     filtered_representative_listing_hashes: list[str],
     listing_details_output_file_name: str,
 ) -> None:
+    app_ids_with_unreliable_goo_details = set(app_ids_with_unreliable_goo_details)
+
     listing_hashes_to_process = [
         listing_hash
         for listing_hash in filtered_representative_listing_hashes
-        if convert_listing_hash_to_app_id(listing_hash)
+        if get_app_id(listing_hash)
         in app_ids_with_unreliable_goo_details
     ]
 
@@ -454,7 +571,7 @@ def try_again_to_download_goo_value(
     groups_by_app_id: dict[int, list[str]],
 ) -> None:
     filtered_representative_app_ids = [
-        convert_listing_hash_to_app_id(listing_hash)
+        get_app_id(listing_hash)
         for listing_hash in filtered_representative_listing_hashes
     ]
     app_ids_to_process = list(
@@ -551,9 +668,28 @@ def apply_workflow_for_foil_cards(
     )
 
     # Pre-retrieval of item name ids (and item types at the same time)
+    # NB: listing pages are only loaded for appIDs with an item type which cannot be inferred from data on disk.
+
+    item_types = resolve_item_types_for_app_ids(
+        [
+            get_app_id(listing_hash)
+            for listing_hash in filtered_representative_listing_hashes_with_missing_goo_details
+        ],
+        groups_by_app_id=groups_by_app_id,
+        listing_candidates=filtered_representative_listing_hashes_with_missing_goo_details,
+        listing_details_output_file_name=listing_details_output_file_name,
+        dictionary_of_representative_listing_hashes=dictionary_of_representative_listing_hashes,
+        verbose=verbose,
+    )
+
+    listing_hashes_with_unknown_item_type = [
+        listing_hash
+        for listing_hash in filtered_representative_listing_hashes_with_missing_goo_details
+        if item_types[get_app_id(listing_hash)] is None
+    ]
 
     item_nameids = get_item_nameid_batch(
-        filtered_representative_listing_hashes_with_missing_goo_details,
+        listing_hashes_with_unknown_item_type,
         listing_details_output_file_name=listing_details_output_file_name,
     )
 
@@ -571,6 +707,7 @@ def apply_workflow_for_foil_cards(
 
     all_listing_details = load_all_listing_details(
         listing_details_output_file_name=listing_details_output_file_name,
+        read_only=True,
     )
 
     all_goo_details = download_missing_goo_details(
@@ -603,6 +740,43 @@ def apply_workflow_for_foil_cards(
             listing_details_output_file_name,
         )
 
+    # Query again the goo values of appIDs with an inferred item type, if the goo value was not queried with this item
+    # type, so that the goo details of these appIDs become reliable.
+
+    inferred_item_types = resolve_item_types_for_app_ids(
+        app_ids_with_unreliable_goo_details,
+        groups_by_app_id=groups_by_app_id,
+        listing_candidates=filtered_representative_listing_hashes,
+        all_listing_details=all_listing_details,
+        listing_details_output_file_name=listing_details_output_file_name,
+        dictionary_of_representative_listing_hashes=dictionary_of_representative_listing_hashes,
+        verbose=verbose,
+    )
+
+    item_types_to_query = {
+        app_id: inferred_item_types[app_id]
+        for app_id in inferred_item_types
+        if inferred_item_types[app_id] is not None
+    }
+
+    if len(item_types_to_query) > 0:
+        all_goo_details = download_goo_values_for_batch(
+            item_types_to_query,
+            all_goo_details,
+            goo_details_file_name=goo_details_file_name_for_for_foil_cards,
+            verbose=verbose,
+        )
+
+        app_ids_with_unreliable_goo_details = (
+            find_app_ids_with_unknown_item_type_for_their_representatives(
+                groups_by_app_id=groups_by_app_id,
+                listing_candidates=filtered_representative_listing_hashes,
+                all_listing_details=all_listing_details,
+                listing_details_output_file_name=listing_details_output_file_name,
+                verbose=verbose,
+            )
+        )
+
     # List unknown goo values
 
     try_again_to_find_goo_value = False
@@ -711,8 +885,8 @@ def discard_necessarily_unrewarding_app_ids(
     if app_ids_with_unknown_goo_value is None:
         app_ids_with_unknown_goo_value = []
 
-    app_ids_to_omit = (
-        app_ids_with_unreliable_goo_details + app_ids_with_unknown_goo_value
+    app_ids_to_omit = set(app_ids_with_unreliable_goo_details).union(
+        app_ids_with_unknown_goo_value,
     )
 
     unrewarding_threshold_in_gems = compute_unrewarding_threshold_in_gems(
@@ -767,10 +941,12 @@ def find_listing_hashes_with_unknown_goo_value(
     all_goo_details: dict[int, int],
     verbose: bool = True,
 ) -> list[int]:
+    app_ids_with_unreliable_goo_details = set(app_ids_with_unreliable_goo_details)
+
     app_ids_with_unknown_goo_value = []
 
     for listing_hash in listing_candidates:
-        app_id = convert_listing_hash_to_app_id(listing_hash)
+        app_id = get_app_id(listing_hash)
 
         if app_id in app_ids_with_unreliable_goo_details:
             continue
@@ -819,6 +995,7 @@ def determine_whether_an_arbitrage_might_exist_for_foil_cards(
     if all_listings is None:
         all_listings = load_all_listings(
             listing_output_file_name=listing_output_file_name,
+            read_only=True,
         )
 
     if app_ids_with_unreliable_goo_details is None:
@@ -827,58 +1004,46 @@ def determine_whether_an_arbitrage_might_exist_for_foil_cards(
     if app_ids_with_unknown_goo_value is None:
         app_ids_with_unknown_goo_value = []
 
-    num_gems_per_sack_of_gems = get_num_gems_per_sack_of_gems()
-
-    sack_of_gems_price_in_cents = 100 * sack_of_gems_price_in_euros
+    foil_card_arrays = build_foil_card_arrays(
+        eligible_listing_hashes,
+        all_listings,
+        all_goo_details,
+        app_ids_with_unreliable_goo_details=app_ids_with_unreliable_goo_details,
+        app_ids_with_unknown_goo_value=app_ids_with_unknown_goo_value,
+    )
 
-    arbitrages = {}
+    scores = score_foil_cards(
+        foil_card_arrays,
+        [100 * sack_of_gems_price_in_euros],
+    )
 
-    for listing_hash in eligible_listing_hashes:
-        app_id = convert_listing_hash_to_app_id(listing_hash)
+    if verbose:
+        for i in np.flatnonzero(~scores['is_scorable']):
+            listing_hash = eligible_listing_hashes[i]
 
-        if app_id in app_ids_with_unreliable_goo_details:
-            # NB: This is for goo details which were retrieved with the default item type n° (=2), which can be wrong.
-            if verbose:
+            if not foil_card_arrays['is_reliable'][i]:
+                # NB: This is for goo details which were retrieved with the default item type n° (=2), which can be wrong.
                 print(f'[X]\tUnreliable goo details for {listing_hash}')
-            continue
-
-        goo_value_in_gems = safe_read_from_dict(
-            input_dict=all_goo_details,
-            input_key=app_id,
-        )
-
-        if app_id in app_ids_with_unknown_goo_value or goo_value_in_gems is None:
-            # NB: This is when the goo value is unknown, despite a correct item type n° used to download goo details.
-            if verbose:
+            elif not foil_card_arrays['has_goo_value'][i]:
+                # NB: This is when the goo value is unknown, despite a correct item type n° used to download goo details.
                 print(f'[?]\tUnknown goo value for {listing_hash}')
-            continue
-
-        goo_value_in_cents = (
-            goo_value_in_gems / num_gems_per_sack_of_gems * sack_of_gems_price_in_cents
-        )
-
-        current_listing = all_listings[listing_hash]
-        ask_in_cents = current_listing['sell_price']
-
-        if ask_in_cents == 0:
-            # NB: The ask cannot be equal to zero. So, we skip the listing because of there must be a bug.
-            if verbose:
+            else:
+                # NB: The ask cannot be equal to zero. So, we skip the listing because of there must be a bug.
+                ask_in_cents = foil_card_arrays['ask'][i]
                 print(
                     f'[!]\tImpossible ask price ({ask_in_cents / 100:.2f}€) for {listing_hash}',
                 )
-            continue
 
-        profit_in_cents = goo_value_in_cents - ask_in_cents
-        is_arbitrage = bool(profit_in_cents > 0)
+    arbitrages = {}
 
-        if is_arbitrage:
-            arbitrage = {}
-            arbitrage['profit'] = profit_in_cents / 100
-            arbitrage['ask'] = ask_in_cents / 100
-            arbitrage['goo_amount'] = goo_value_in_gems
-            arbitrage['goo_value'] = goo_value_in_cents / 100
+    for i in np.flatnonzero(scores['is_an_arbitrage'][0]):
+        arbitrage = {}
+        arbitrage['profit'] = float(scores['profit'][0, i]) / 100
+        arbitrage['ask'] = int(foil_card_arrays['ask'][i]) / 100
+        arbitrage['goo_amount'] = int(foil_card_arrays['goo_amount'][i])
+        arbitrage['goo_value'] = float(scores['goo_value'][0, i]) / 100
 
-            arbitrages[listing_hash] = arbitrage
+        arbitrages[eligible_listing_hashes[i]] = arbitrage
 
     return arbitrages
 
@@ -891,10 +1056,9 @@ def print_arbitrages_for_foil_cards(
         use_numbered_bullet_points=use_numbered_bullet_points,
     )
 
-    sorted_arbitrages = sorted(
-        arbitrages.keys(),
+    sorted_arbitrages = iterate_by_decreasing_key(
+        arbitrages,
         key=lambda x: arbitrages[x]['profit'],
-        reverse=True,
     )
 
     print('# Results for arbitrages with foil cards')
@@ -902,12 +1066,7 @@ def print_arbitrages_for_foil_cards(
     for listing_hash in sorted_arbitrages:
         arbitrage = arbitrages[listing_hash]
 
-        markdown_compatible_steam_market_url = get_steam_market_listing_url(
-            listing_hash=listing_hash,
-            render_as_json=False,
-            replace_spaces=True,
-            replace_parenthesis=True,
-        )
+        markdown_compatible_steam_market_url = get_markdown_compatible_market_url(listing_hash)
 
         listing_hash_formatted_for_markdown = (
             f'[{listing_hash}]({markdown_compatible_steam_market_url})'
@@ -935,8 +1094,28 @@ def find_app_ids_with_unknown_item_type_for_their_representatives(
     listing_candidates: list[str],
     all_listing_details: dict[str, dict] = None,
     listing_details_output_file_name: str = None,
+    all_listing_details_for_normal_cards: dict[str, dict] = None,
+    goo_value_cache_file_name: str = None,
     verbose: bool = True,
 ) -> list[int]:
+    # The goo details of an appID are reliable if the item type of its representative listing hash is known, because
+    # this is the item type used to query its goo value. Otherwise, an item type inferred from other data on disk only
+    # makes the goo value reliable if the goo value was queried with this item type, which the goo value cache records.
+    #
+    # Caveat: cards of the same appID can have different item types, e.g. appID 232770 (POSTAL), and a goo value which
+    #         is only keyed by appID may have been queried with the default item type n° (=2).
+
+    if listing_details_output_file_name is None:
+        listing_details_output_file_name = (
+            get_listing_details_output_file_name_for_foil_cards()
+        )
+
+    if all_listing_details is None:
+        all_listing_details = load_all_listing_details(
+            listing_details_output_file_name=listing_details_output_file_name,
+            read_only=True,
+        )
+
     dictionary_of_representative_listing_hashes = (
         build_dictionary_of_representative_listing_hashes(
             all_listing_details,
@@ -944,10 +1123,12 @@ def find_app_ids_with_unknown_item_type_for_their_representatives(
         )
     )
 
-    app_ids_with_unreliable_goo_details = []
+    listing_candidates = set(listing_candidates)
 
-    for app_id in groups_by_app_id:
-        item_type = find_item_type_for_app_id(
+    app_ids_with_unknown_item_type_for_their_representatives = [
+        app_id
+        for app_id in groups_by_app_id
+        if find_item_type_for_app_id(
             app_id,
             groups_by_app_id=groups_by_app_id,
             listing_candidates=listing_candidates,
@@ -955,7 +1136,29 @@ def find_app_ids_with_unknown_item_type_for_their_representatives(
             listing_details_output_file_name=listing_details_output_file_name,
             dictionary_of_representative_listing_hashes=dictionary_of_representative_listing_hashes,
         )
-        if item_type is None:
+        is None
+    ]
+
+    inferred_item_types = resolve_item_types_for_app_ids(
+        app_ids_with_unknown_item_type_for_their_representatives,
+        groups_by_app_id=groups_by_app_id,
+        listing_candidates=listing_candidates,
+        all_listing_details=all_listing_details,
+        listing_details_output_file_name=listing_details_output_file_name,
+        dictionary_of_representative_listing_hashes=dictionary_of_representative_listing_hashes,
+        all_listing_details_for_normal_cards=all_listing_details_for_normal_cards,
+        goo_value_cache_file_name=goo_value_cache_file_name,
+        verbose=verbose,
+    )
+
+    goo_value_cache = load_goo_value_cache(goo_value_cache_file_name)
+
+    app_ids_with_unreliable_goo_details = []
+
+    for app_id in app_ids_with_unknown_item_type_for_their_representatives:
+        item_type = inferred_item_types[app_id]
+
+        if item_type is None or get_goo_value_cache_key(app_id, item_type) not in goo_value_cache:
             app_id_as_int = int(app_id)
             app_ids_with_unreliable_goo_details.append(app_id_as_int)
 
@@ -970,6 +1173,132 @@ def find_app_ids_with_unknown_item_type_for_their_representatives(
     return app_ids_with_unreliable_goo_details
 
 
+def get_max_num_goo_value_workers() -> int:
+    max_num_goo_value_workers = 4
+
+    return max_num_goo_value_workers
+
+
+def get_goo_value_rate_limit() -> float:
+    # Maximal number of queries of goo values per second.
+    goo_value_rate_limit = 2
+
+    return goo_value_rate_limit
+
+
+def download_goo_values_for_batch(
+    item_types: dict[int, int],
+    all_goo_details: dict[int, int],
+    goo_details_file_name: str = None,
+    num_queries_between_save: int = 100,
+    max_num_workers: int = None,
+    rate_limit: float = None,
+    goo_value_cache_file_name: str = None,
+    verbose: bool = True,
+) -> dict[int, int]:
+    # Objective: query the goo values of many appIDs concurrently, under a token bucket, and checkpoint the results as
+    # they arrive. Only completed queries are checkpointed, so that an interrupted run resumes exactly where it stopped:
+    # the appIDs which are still missing from the goo details are the ones to query.
+    #
+    # NB: goo values found in the cache, e.g. for an item type which was already queried, do not cost any request.
+    #
+    # Caveat: the keys of the goo details are str, as in the dictionary loaded from disk, so that each appID appears
+    #         only once, whether its goo value was loaded from disk or downloaded during the current run.
+
+    if max_num_workers is None:
+        max_num_workers = get_max_num_goo_value_workers()
+
+    if rate_limit is None:
+        rate_limit = get_goo_value_rate_limit()
+
+    goo_value_cache = load_goo_value_cache(goo_value_cache_file_name)
+
+    app_ids_to_query = []
+
+    for app_id in item_types:
+        goo_value = find_goo_value_in_cache(goo_value_cache, app_id, item_types[app_id])
+
+        if goo_value is None:
+            app_ids_to_query.append(app_id)
+        else:
+            all_goo_details[str(app_id)] = goo_value
+
+    if verbose:
+        print(
+            f'Goo values found in cache for {len(item_types) - len(app_ids_to_query)} appIDs.',
+        )
+
+    # The cookie is read from disk once for the whole batch.
+    cookie = get_cookie_dict()
+
+    def query_goo_value_with_rate_limit(app_id: int) -> [int | None]:
+        acquire_rate_limit_token(get_steam_goo_value_url(), rate_limit)
+
+        return query_goo_value(
+            app_id=app_id,
+            item_type=item_types[app_id],
+            verbose=verbose,
+            cookie=cookie,
+        )
+
+    query_count = 0
+
+    executor = ThreadPoolExecutor(max_workers=max_num_workers)
+    futures = {
+        executor.submit(query_goo_value_with_rate_limit, app_id): app_id
+        for app_id in app_ids_to_query
+    }
+    pending_futures = set(futures)
+
+    def record_goo_value(future: Future) -> None:
+        app_id = futures[future]
+        all_goo_details[str(app_id)] = future.result()
+        add_goo_value_to_cache(goo_value_cache, app_id, item_types[app_id], all_goo_details[str(app_id)])
+
+    try:
+        for future in as_completed(futures):
+            pending_futures.discard(future)
+            record_goo_value(future)
+            query_count += 1
+
+            if query_count % num_queries_between_save == 0:
+                if verbose:
+                    print(f'Saving after {query_count} queries.')
+                save_all_goo_details(
+                    all_goo_details,
+                    goo_details_file_name,
+                )
+                save_goo_value_cache(
+                    goo_value_cache,
+                    goo_value_cache_file_name,
+                    in_background=True,
+                )
+
+    finally:
+        # NB: if the run is interrupted, queries which were not started yet are cancelled, and the results which
+        #     arrived so far are saved to disk.
+        executor.shutdown(wait=True, cancel_futures=True)
+
+        for future in pending_futures:
+            if not future.cancelled() and future.exception() is None:
+                record_goo_value(future)
+                query_count += 1
+
+        if query_count > 0 or len(app_ids_to_query) < len(item_types):
+            if verbose:
+                print(f'Final save after {query_count} queries.')
+            save_all_goo_details(
+                all_goo_details,
+                goo_details_file_name,
+            )
+            save_goo_value_cache(
+                goo_value_cache,
+                goo_value_cache_file_name,
+            )
+
+    return all_goo_details
+
+
 def download_missing_goo_details(
     groups_by_app_id: dict[int, list[str]],
     listing_candidates: list[str],
@@ -1018,38 +1347,24 @@ def download_missing_goo_details(
         eligible_enforced_app_ids_to_process,
     )
 
-    query_count = 0
-
-    for app_id in app_ids_to_process:
-
-        goo_value = download_goo_value_for_app_id(
-            app_id=app_id,
-            groups_by_app_id=groups_by_app_id,
-            listing_candidates=listing_candidates,
-            all_listing_details=all_listing_details,
-            listing_details_output_file_name=listing_details_output_file_name,
-            dictionary_of_representative_listing_hashes=dictionary_of_representative_listing_hashes,
-            verbose=verbose,
-        )
-        query_count += 1
-
-        all_goo_details[app_id] = goo_value
-
-        if query_count % num_queries_between_save == 0:
-            print(f'Saving after {query_count} queries.')
-            save_all_goo_details(
-                all_goo_details,
-                goo_details_file_name_for_for_foil_cards,
-            )
-
-    # Final save
+    # NB: the item types are found on disk, before any query is sent.
+    item_types = resolve_item_types_for_app_ids(
+        app_ids_to_process,
+        groups_by_app_id,
+        listing_candidates,
+        all_listing_details,
+        listing_details_output_file_name,
+        dictionary_of_representative_listing_hashes,
+        verbose=verbose,
+    )
 
-    if query_count > 0:
-        print(f'Final save after {query_count} queries.')
-        save_all_goo_details(
-            all_goo_details,
-            goo_details_file_name_for_for_foil_cards,
-        )
+    all_goo_details = download_goo_values_for_batch(
+        item_types,
+        all_goo_details,
+        goo_details_file_name=goo_details_file_name_for_for_foil_cards,
+        num_queries_between_save=num_queries_between_save,
+        verbose=verbose,
+    )
 
     return all_goo_details
 
@@ -1078,10 +1393,14 @@ def find_representative_listing_hash_for_app_id(
         list[str],
     ] = None,
 ) -> str:
+    # NB: provide the listing candidates as a set when this function is called for many appIDs, so that the cost of
+    #     each call scales with the number of listing hashes for the appID, instead of the number of candidates.
     if listing_candidates is None:
-        listing_candidates = find_representative_listing_hashes(
-            groups_by_app_id,
-            dictionary_of_representative_listing_hashes,
+        listing_candidates = set(
+            find_representative_listing_hashes(
+                groups_by_app_id,
+                dictionary_of_representative_listing_hashes,
+            ),
         )
 
     if dictionary_of_representative_listing_hashes is not None:
@@ -1096,9 +1415,11 @@ def find_representative_listing_hash_for_app_id(
         previously_used_listing_hashes_for_app_id = None
 
     listing_hashes_for_app_id = groups_by_app_id[app_id]
-    representative_listing_hash_for_app_id_as_a_set = set(
-        listing_hashes_for_app_id,
-    ).intersection(listing_candidates)
+    representative_listing_hash_for_app_id_as_a_set = {
+        listing_hash
+        for listing_hash in listing_hashes_for_app_id
+        if listing_hash in listing_candidates
+    }
 
     if (
         previously_used_listing_hashes_for_app_id is not None
@@ -1110,13 +1431,11 @@ def find_representative_listing_hash_for_app_id(
             )
         )
 
-    # Sort with respect to lexicographical order.
-    sorted_representative_listing_hash_for_app_id_as_list = sorted(
+    # First element with respect to lexicographical order.
+    representative_listing_hash_for_app_id = min(
         representative_listing_hash_for_app_id_as_a_set,
     )
 
-    representative_listing_hash_for_app_id = list(sorted_representative_listing_hash_for_app_id_as_list)[0]
-
     return representative_listing_hash_for_app_id
 
 
@@ -1137,6 +1456,7 @@ def find_item_type_for_app_id(
     if all_listing_details is None:
         all_listing_details = load_all_listing_details(
             listing_details_output_file_name=listing_details_output_file_name,
+            read_only=True,
         )
 
     representative_listing_hash_for_app_id = (
@@ -1162,31 +1482,162 @@ def find_item_type_for_app_id(
     return item_type
 
 
-def download_goo_value_for_app_id(
+def build_dictionary_of_known_item_types(
+    all_listing_details: dict[str, dict],
+) -> dict[int, int]:
+    # Return the item type of a card for each appID, for which the item type of at least one card is known.
+    #
+    # NB: the goo value of a trading card does not depend on which card of the set is queried. Any item type of a card
+    #     of the set can be used to query the goo value for the appID.
+    known_item_types = {}
+
+    for listing_hash in sorted(all_listing_details):
+        item_type = all_listing_details[listing_hash].get('item_type_no')
+
+        if item_type is None:
+            continue
+
+        app_id = get_app_id(listing_hash)
+        known_item_types.setdefault(app_id, item_type)
+
+    return known_item_types
+
+
+def build_dictionary_of_item_types_from_goo_value_cache(
+    goo_value_cache: dict[str, dict],
+) -> dict[int, int]:
+    # Return an item type for each appID, for which goo values were previously queried with a single item type.
+    # NB: appIDs with goo values queried with several item types are skipped, because the item type is ambiguous.
+    cached_item_types = {}
+
+    for goo_value_cache_key in goo_value_cache:
+        app_id, item_type, _ = goo_value_cache_key.split('-')
+        cached_item_types.setdefault(int(app_id), set()).add(int(item_type))
+
+    item_types_from_goo_value_cache = {
+        app_id: next(iter(cached_item_types[app_id]))
+        for app_id in cached_item_types
+        if len(cached_item_types[app_id]) == 1
+    }
+
+    return item_types_from_goo_value_cache
+
+
+def infer_item_type_for_app_id(
     app_id: int,
     groups_by_app_id: dict[int, list[str]],
+    known_item_types_for_foil_cards: dict[int, int],
+    all_listing_details_for_normal_cards: dict[str, dict],
+    item_types_from_goo_value_cache: dict[int, int],
+) -> [int | None]:
+    # Infer the item type from data already on disk, by decreasing order of reliability:
+    # - other foil cards of the same appID,
+    # - the normal card matching a foil card of the appID,
+    # - previous queries of goo values for the same appID.
+
+    try:
+        return known_item_types_for_foil_cards[app_id]
+    except KeyError:
+        pass
+
+    foil_suffix = get_foil_suffix()
+
+    for listing_hash in sorted(groups_by_app_id.get(app_id, [])):
+        if not listing_hash.endswith(foil_suffix):
+            continue
+
+        normal_card_listing_hash = listing_hash[: -len(foil_suffix)]
+
+        try:
+            item_type = all_listing_details_for_normal_cards[normal_card_listing_hash]['item_type_no']
+        except KeyError:
+            continue
+
+        if item_type is not None:
+            return item_type
+
+    item_type = item_types_from_goo_value_cache.get(app_id)
+
+    return item_type
+
+
+def resolve_item_types_for_app_ids(
+    app_ids: list[int],
+    groups_by_app_id: dict[int, list[str]],
     listing_candidates: list[str],
     all_listing_details: dict[str, dict] = None,
     listing_details_output_file_name: str = None,
     dictionary_of_representative_listing_hashes: dict[int, list[str]] = None,
+    all_listing_details_for_normal_cards: dict[str, dict] = None,
+    goo_value_cache_file_name: str = None,
     verbose: bool = True,
-) -> int:
-    item_type = find_item_type_for_app_id(
-        app_id,
-        groups_by_app_id,
-        listing_candidates,
+) -> dict[int, int | None]:
+    # Objective: find the item types without loading any listing page. The item type of the representative listing
+    # hash is used if it is known. Otherwise, the item type is inferred from data already on disk. The item type is None
+    # if it cannot be inferred, in which case the listing page has to be loaded.
+
+    if listing_details_output_file_name is None:
+        listing_details_output_file_name = (
+            get_listing_details_output_file_name_for_foil_cards()
+        )
+
+    if all_listing_details is None:
+        all_listing_details = load_all_listing_details(
+            listing_details_output_file_name=listing_details_output_file_name,
+            read_only=True,
+        )
+
+    if all_listing_details_for_normal_cards is None:
+        all_listing_details_for_normal_cards = load_all_listing_details(
+            listing_details_output_file_name=get_listing_details_output_file_name(),
+            read_only=True,
+        )
+
+    known_item_types_for_foil_cards = build_dictionary_of_known_item_types(
         all_listing_details,
-        listing_details_output_file_name,
-        dictionary_of_representative_listing_hashes,
     )
 
-    goo_value = query_goo_value(
-        app_id=app_id,
-        item_type=item_type,
-        verbose=verbose,
+    listing_candidates = set(listing_candidates)
+
+    item_types_from_goo_value_cache = (
+        build_dictionary_of_item_types_from_goo_value_cache(
+            load_goo_value_cache(goo_value_cache_file_name),
+        )
     )
 
-    return goo_value
+    item_types = {}
+    num_inferred_item_types = 0
+
+    for app_id in sorted(app_ids):
+        item_type = find_item_type_for_app_id(
+            app_id,
+            groups_by_app_id,
+            listing_candidates,
+            all_listing_details,
+            listing_details_output_file_name,
+            dictionary_of_representative_listing_hashes,
+        )
+
+        if item_type is None:
+            item_type = infer_item_type_for_app_id(
+                app_id,
+                groups_by_app_id,
+                known_item_types_for_foil_cards,
+                all_listing_details_for_normal_cards,
+                item_types_from_goo_value_cache,
+            )
+
+            if item_type is not None:
+                num_inferred_item_types += 1
+
+        item_types[app_id] = item_type
+
+    if verbose:
+        print(
+            f'Item types inferred from data on disk for {num_inferred_item_types} appIDs.',
+        )
+
+    return item_types
 
 
 def build_dictionary_of_representative_listing_hashes(
@@ -1201,12 +1652,13 @@ def build_dictionary_of_representative_listing_hashes(
     if all_listing_details is None:
         all_listing_details = load_all_listing_details(
             listing_details_output_file_name=listing_details_output_file_name,
+            read_only=True,
         )
 
     dictionary_of_representative_listing_hashes = {}
 
     for listing_hash in all_listing_details:
-        app_id = convert_listing_hash_to_app_id(listing_hash)
+        app_id = get_app_id(listing_hash)
 
         listing_details = all_listing_details[listing_hash]
 
@@ -6,14 +6,15 @@ from market_arbitrage import (
     find_badge_arbitrages,
     print_arbitrages,
 )
-from market_listing import get_item_nameid_batch, get_steam_market_listing_url
+from listing_catalogue import get_listing_record, get_markdown_compatible_market_url
+from market_listing import get_item_nameid_batch
 from market_order import load_market_order_data
 from market_search import load_all_listings, update_all_listings
 from market_utils import filter_out_dubious_listing_hashes
 from sack_of_gems import get_gem_price
+from src.money_utils import convert_euros_to_cents_rounded_up, format_price_in_cents
+from src.ranking_utils import get_top_k
 from utils import (
-    convert_listing_hash_to_app_id,
-    convert_listing_hash_to_app_name,
     get_category_name_for_booster_packs,
     get_steam_store_url,
     get_steamcardexchange_url,
@@ -30,22 +31,16 @@ def filter_listings(
     if all_listings is None:
         all_listings = load_all_listings()
 
-    # Sort listing hashes with respect to the ask
+    # *Heuristic* filtering of listing hashes, then sort the remaining listing hashes with respect to the ask
 
-    sorted_listing_hashes = sorted(
-        all_listings,
-        reverse=True,
-        key=lambda x: all_listings[x]['sell_price'],
-    )
-
-    # *Heuristic* filtering of listing hashes
-
-    filtered_listing_hashes = list(
-        filter(
-            lambda x: all_listings[x]['sell_price'] >= min_sell_price
-            and all_listings[x]['sell_listings'] >= min_num_listings,
-            sorted_listing_hashes,
+    filtered_listing_hashes = get_top_k(
+        (
+            listing_hash
+            for listing_hash in all_listings
+            if all_listings[listing_hash]['sell_listings'] >= min_num_listings
         ),
+        key=lambda x: all_listings[x]['sell_price'],
+        threshold=min_sell_price,
     )
 
     if verbose:
@@ -65,7 +60,7 @@ def convert_to_badges(
         if max_num_badges is not None and i >= max_num_badges:
             break
 
-        app_id = convert_listing_hash_to_app_id(listing_hash)
+        app_id = get_listing_record(listing_hash).app_id
 
         badge_data[app_id] = {}
         badge_data[app_id]['listing_hash'] = listing_hash
@@ -97,6 +92,7 @@ def filter_out_unmarketable_packs(
 def sort_according_to_buzz(
     market_order_dict: dict[str, dict],
     marketable_market_order_dict: dict[str, dict] = None,
+    num_packs_to_display: int = None,
 ) -> list[str]:
     if marketable_market_order_dict is None:
         (
@@ -104,10 +100,11 @@ def sort_according_to_buzz(
             unknown_market_order_dict,
         ) = filter_out_unmarketable_packs(market_order_dict)
 
-    hashes_for_best_bid = sorted(
+    # NB: only the packs which are displayed are ranked, if their number is specified.
+    hashes_for_best_bid = get_top_k(
         marketable_market_order_dict,
-        reverse=True,
         key=lambda x: market_order_dict[x]['bid'],
+        k=num_packs_to_display,
     )
 
     return hashes_for_best_bid
@@ -130,17 +127,14 @@ def print_packs_with_high_buzz(
         if i >= num_packs_to_display:
             break
 
-        app_id = convert_listing_hash_to_app_id(listing_hash)
-        app_name = convert_listing_hash_to_app_name(listing_hash)
+        listing_record = get_listing_record(listing_hash)
+        app_id = listing_record.app_id
+        app_name = listing_record.app_name
 
         bid = market_order_dict[listing_hash]['bid']
         bid_volume = market_order_dict[listing_hash]['bid_volume']
 
-        markdown_compatible_steam_market_url = get_steam_market_listing_url(
-            listing_hash=listing_hash,
-            render_as_json=False,
-            replace_spaces=True,
-        )
+        markdown_compatible_steam_market_url = get_markdown_compatible_market_url(listing_hash)
 
         if category_name != get_category_name_for_booster_packs():
             # Display the listing hash, because we cannot extract the app name from the listing hash for:
@@ -166,13 +160,13 @@ def print_packs_with_high_buzz(
             item_rarity_pattern_info = ''
 
         print(
-            '{:3}) [[store]({})][[market]({})] [{}]({}) ; bid: {}€ (volume: {}){}'.format(
+            '{:3}) [[store]({})][[market]({})] [{}]({}) ; bid: {} (volume: {}){}'.format(
                 i + 1,
                 get_steam_store_url(app_id),
                 markdown_compatible_steam_market_url,
                 app_name,
                 get_steamcardexchange_url(app_id),
-                bid,
+                format_price_in_cents(bid),
                 bid_volume,
                 item_rarity_pattern_info,
             ),
@@ -205,7 +199,6 @@ def fill_in_badge_data_with_data_from_steam_card_exchange(
         listing_hash = aggregated_badge_data[app_id]['listing_hash']
 
         sell_price_in_cents = all_listings[listing_hash]['sell_price']
-        sell_price_in_euros = sell_price_in_cents / 100
 
         try:
             data_from_steam_card_exchange = dico[app_id]
@@ -220,10 +213,10 @@ def fill_in_badge_data_with_data_from_steam_card_exchange(
         gem_amount_required_to_craft_booster_pack = data_from_steam_card_exchange['gem_amount']
 
         aggregated_badge_data[app_id]['gem_amount'] = gem_amount_required_to_craft_booster_pack
-        aggregated_badge_data[app_id]['gem_price'] = (
-            gem_amount_required_to_craft_booster_pack * gem_price
+        aggregated_badge_data[app_id]['gem_price'] = convert_euros_to_cents_rounded_up(
+            gem_amount_required_to_craft_booster_pack * gem_price,
         )
-        aggregated_badge_data[app_id]['sell_price'] = sell_price_in_euros
+        aggregated_badge_data[app_id]['sell_price'] = sell_price_in_cents
 
     return aggregated_badge_data
 
@@ -311,6 +304,7 @@ def main(
     hashes_for_best_bid = sort_according_to_buzz(
         market_order_dict,
         marketable_market_order_dict,
+        num_packs_to_display=num_packs_to_display,
     )
 
     # Display the highest ranked booster packs
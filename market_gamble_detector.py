@@ -19,6 +19,7 @@ from drop_rate_estimates import (
     get_drop_rate_field,
     get_rarity_fields,
 )
+from listing_catalogue import get_app_id
 from market_arbitrage import (
     filter_out_badges_with_low_sell_price,
     find_badge_arbitrages,
@@ -44,8 +45,8 @@ from market_search import (
 )
 from personal_info import get_cookie_dict
 from sack_of_gems import get_gem_amount_required_to_craft_badge, get_gem_price
+from src.money_utils import convert_euros_to_cents_rounded_up
 from utils import (
-    convert_listing_hash_to_app_id,
     get_category_name_for_booster_packs,
     get_category_name_for_emoticons,
     get_category_name_for_profile_backgrounds,
@@ -188,7 +189,7 @@ def filter_out_candidates_whose_ask_price_is_below_threshold(
 
     badge_data = {}
     for listing_hash in all_listings:
-        app_id = convert_listing_hash_to_app_id(listing_hash)
+        app_id = get_app_id(listing_hash)
 
         item_rarity_pattern = item_rarity_patterns_per_app_id[app_id]
 
@@ -214,15 +215,16 @@ def filter_out_candidates_whose_ask_price_is_below_threshold(
         )
 
         sell_price_in_cents = all_listings[listing_hash]['sell_price']
-        sell_price_in_euros = sell_price_in_cents / 100
 
         # In order to distinguish items linked to the same appID, dummy appIDs are introduced:
         dummy_app_id = listing_hash
 
         badge_data[dummy_app_id] = {}
         badge_data[dummy_app_id]['listing_hash'] = listing_hash
-        badge_data[dummy_app_id]['sell_price'] = sell_price_in_euros
-        badge_data[dummy_app_id]['gem_price'] = item_price_by_crafting_badges
+        badge_data[dummy_app_id]['sell_price'] = sell_price_in_cents
+        badge_data[dummy_app_id]['gem_price'] = convert_euros_to_cents_rounded_up(
+            item_price_by_crafting_badges,
+        )
 
     # Filter out candidates for which the ask is below a given threshold
 
@@ -309,7 +311,7 @@ def count_listing_hashes_per_app_id(all_listings: dict[str, dict]) -> dict[int,
     listing_hashes_per_app_id = {}
 
     for listing_hash in all_listings:
-        app_id = convert_listing_hash_to_app_id(listing_hash)
+        app_id = get_app_id(listing_hash)
         try:
             listing_hashes_per_app_id[app_id] += 1
         except KeyError:
@@ -504,6 +506,7 @@ def main(
     hashes_for_best_bid = sort_according_to_buzz(
         market_order_dict,
         marketable_market_order_dict,
+        num_packs_to_display=num_packs_to_display,
     )
 
     # Display the highest ranked booster packs
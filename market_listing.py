@@ -1,23 +1,27 @@
 # Objective: retrieve i) the item name id of a listing, and ii) whether a *crafted* item would really be marketable.
 import ast
+import functools
 import time
 from http import HTTPStatus
 
-import requests
 from bs4 import BeautifulSoup
 
+from market_records import load_listing_details_records
 from market_search import load_all_listings
+from market_store import get_market_store_revision, query_listing_details, save_to_market_store
 from personal_info import (
     get_cookie_dict,
     update_and_save_cookie_to_disk_if_values_changed,
 )
-from src.json_utils import load_json, save_json
+from src.json_utils import load_memoized
+from src.request_utils import coalesced_get
 from utils import (
     get_cushioned_cooldown_in_seconds,
     get_listing_details_output_file_name,
 )
 
 
+@functools.cache
 def get_steam_market_listing_url(
     app_id: int = None,
     listing_hash: str = None,
@@ -289,10 +293,11 @@ def get_listing_details(
 
     has_secured_cookie = bool(len(cookie) > 0)
 
+    # NB: identical queries are coalesced, and served from memory if they were answered a few seconds ago.
     if has_secured_cookie:
-        resp_data = requests.get(url, params=req_data, cookies=cookie)
+        resp_data = coalesced_get(url, params=req_data, cookies=cookie)
     else:
-        resp_data = requests.get(url, params=req_data)
+        resp_data = coalesced_get(url, params=req_data)
 
     status_code = resp_data.status_code
 
@@ -363,7 +368,8 @@ def get_listing_details_batch(
 
         if query_count >= rate_limits['max_num_queries']:
             if save_to_disk:
-                save_json(all_listing_details, listing_details_output_file_name)
+                # Checkpoint into the market store: a single transaction, instead of writing the whole .json file.
+                save_to_market_store('listing_details', listing_details_output_file_name, all_listing_details)
 
             cooldown_duration = rate_limits['cooldown']
             print(
@@ -375,7 +381,7 @@ def get_listing_details_batch(
         all_listing_details.update(listing_details)
 
     if save_to_disk:
-        save_json(all_listing_details, listing_details_output_file_name)
+        save_to_market_store('listing_details', listing_details_output_file_name, all_listing_details)
 
     return all_listing_details
 
@@ -391,7 +397,7 @@ def update_all_listing_details(
         listing_details_output_file_name = get_listing_details_output_file_name()
 
     try:
-        all_listing_details = load_json(listing_details_output_file_name)
+        all_listing_details = load_all_listing_details(listing_details_output_file_name)
         print(f'Loading {len(all_listing_details)} listing details from disk.')
     except FileNotFoundError:
         print('Downloading listing details from scratch.')
@@ -413,11 +419,28 @@ def update_all_listing_details(
 
 def load_all_listing_details(
     listing_details_output_file_name: str = None,
+    listing_hashes: list[str] = None,
+    read_only: bool = False,
 ) -> dict[str, dict]:
     if listing_details_output_file_name is None:
         listing_details_output_file_name = get_listing_details_output_file_name()
 
-    all_listing_details = load_json(listing_details_output_file_name)
+    if read_only and listing_hashes is None:
+        # NB: the read-only view is shared across the process, and loaded again only if the data is modified.
+        all_listing_details = load_memoized(
+            listing_details_output_file_name,
+            lambda: query_listing_details(listing_details_output_file_name),
+            key='listing_details',
+            get_signature=lambda file_name: get_market_store_revision('listing_details', file_name),
+        )
+
+        return all_listing_details
+
+    # NB: if listing hashes are specified, only the details of these listings are queried from the market store.
+    all_listing_details = query_listing_details(
+        listing_details_output_file_name,
+        listing_hashes=listing_hashes,
+    )
 
     return all_listing_details
 
@@ -458,9 +481,12 @@ def get_item_nameid(
         listing_details_output_file_name = get_listing_details_output_file_name()
 
     try:
-        listing_details = load_json(listing_details_output_file_name)
+        listing_details = load_listing_details_records(
+            listing_details_output_file_name,
+            listing_hashes=[listing_hash],
+        )
 
-        item_nameid = listing_details[listing_hash]['item_nameid']
+        item_nameid = listing_details[listing_hash].item_nameid
     except (FileNotFoundError, KeyError):
         listing_details = update_all_listing_details(
             listing_hashes=[listing_hash],
@@ -483,15 +509,19 @@ def get_item_nameid_batch(
         listing_details_output_file_name = get_listing_details_output_file_name()
 
     try:
-        listing_details = load_json(listing_details_output_file_name)
+        # NB: the listing details are loaded as slotted records, since they are only read here.
+        listing_details_records = load_listing_details_records(
+            listing_details_output_file_name,
+            listing_hashes=list(listing_hashes),
+        )
 
         item_nameids = {}
         listing_hashes_to_process = []
         for listing_hash in listing_hashes:
             item_nameids[listing_hash] = {}
             try:
-                item_nameid = listing_details[listing_hash]['item_nameid']
-                is_marketable = listing_details[listing_hash]['is_marketable']
+                item_nameid = listing_details_records[listing_hash].item_nameid
+                is_marketable = listing_details_records[listing_hash].is_marketable
 
                 item_nameids[listing_hash]['item_nameid'] = item_nameid
                 item_nameids[listing_hash]['is_marketable'] = is_marketable
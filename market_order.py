@@ -6,12 +6,14 @@ from http import HTTPStatus
 import requests
 
 from market_listing import get_item_nameid, get_item_nameid_batch
+from market_store import query_market_orders, save_to_market_store
 from personal_info import (
     get_cookie_dict,
     update_and_save_cookie_to_disk_if_values_changed,
 )
 from src.cookie_utils import force_update_sessionid
-from src.json_utils import load_json, save_json
+from src.money_utils import convert_euros_to_cents, format_price_in_cents
+from src.request_utils import coalesced_get, is_fresh_in_memory
 from utils import get_cushioned_cooldown_in_seconds, get_market_order_file_name
 
 INTER_REQUEST_COOLDOWN_FIELD = 'cooldown_between_each_request'
@@ -77,12 +79,53 @@ def get_market_order_headers():
     return headers
 
 
+def get_max_depth_of_buy_order_ladder() -> int:
+    # Number of price levels of the buy order graph which are kept, to size sales beyond the highest buy order.
+    max_depth = 20
+
+    return max_depth
+
+
+def parse_buy_order_ladder(
+    buy_order_graph: list[list],
+    max_depth: int = None,
+) -> list[list[int]]:
+    # Each level of the buy order graph is [price in euros, cumulative quantity, label], by decreasing price.
+    # Each level of the ladder is [price in cents, cumulative quantity].
+    if max_depth is None:
+        max_depth = get_max_depth_of_buy_order_ladder()
+
+    buy_order_ladder = [[convert_euros_to_cents(level[0]), level[1]] for level in buy_order_graph[:max_depth]]
+
+    return buy_order_ladder
+
+
 def download_market_order_data(
     listing_hash: str,
     item_nameid: str = None,
     verbose: bool = False,
     listing_details_output_file_name: str = None,
-) -> tuple[float, float, int, int]:
+    freshness_in_seconds: float = None,
+) -> tuple[int, int, int, int]:
+    # NB: prices are in cents, and -1 if they could not be retrieved.
+    bid_price, ask_price, bid_volume, ask_volume, _ = download_market_order_data_with_ladder(
+        listing_hash,
+        item_nameid=item_nameid,
+        verbose=verbose,
+        listing_details_output_file_name=listing_details_output_file_name,
+        freshness_in_seconds=freshness_in_seconds,
+    )
+
+    return bid_price, ask_price, bid_volume, ask_volume
+
+
+def download_market_order_data_with_ladder(
+    listing_hash: str,
+    item_nameid: str = None,
+    verbose: bool = False,
+    listing_details_output_file_name: str = None,
+    freshness_in_seconds: float = None,
+) -> tuple[int, int, int, int, list[list[int]]]:
     cookie = get_cookie_dict()
     has_secured_cookie = bool(len(cookie) > 0)
 
@@ -97,19 +140,23 @@ def download_market_order_data(
         url = get_steam_market_order_url()
         req_data = get_market_order_parameters(item_nameid=item_nameid)
 
+        # NB: identical queries are coalesced, and served from memory if they were answered a few seconds ago, unless the
+        #     freshness is set to 0 second.
         try:
             if has_secured_cookie:
-                resp_data = requests.get(
+                resp_data = coalesced_get(
                     url,
                     params=req_data,
                     cookies=cookie,
                     headers=get_market_order_headers(),
+                    freshness_in_seconds=freshness_in_seconds,
                 )
             else:
-                resp_data = requests.get(
+                resp_data = coalesced_get(
                     url,
                     params=req_data,
                     headers=get_market_order_headers(),
+                    freshness_in_seconds=freshness_in_seconds,
                 )
         except requests.exceptions.ConnectionError:
             resp_data = None
@@ -137,15 +184,19 @@ def download_market_order_data(
         try:
             buy_order_graph = result['buy_order_graph']
 
+            buy_order_ladder = parse_buy_order_ladder(buy_order_graph)
+
             try:
                 # highest_buy_order
                 bid_info = buy_order_graph[0]
-                bid_price = bid_info[0]
+                # NB: prices are converted to integer numbers of cents once, here.
+                bid_price = convert_euros_to_cents(bid_info[0])
                 bid_volume = bid_info[1]
             except IndexError:
                 bid_price = -1
                 bid_volume = -1
         except KeyError:
+            buy_order_ladder = []
             bid_price = -1
             bid_volume = -1
 
@@ -155,7 +206,7 @@ def download_market_order_data(
             try:
                 # lowest_sell_order
                 ask_info = sell_order_graph[0]
-                ask_price = ask_info[0]
+                ask_price = convert_euros_to_cents(ask_info[0])
                 ask_volume = ask_info[1]
             except IndexError:
                 ask_price = -1
@@ -179,20 +230,21 @@ def download_market_order_data(
         bid_volume = -1
         ask_price = -1
         ask_volume = -1
+        buy_order_ladder = []
 
     if verbose:
         print(
-            'Listing: {} ; item id: {} ; ask: {:.2f}€ ({}) ; bid: {:.2f}€ ({})'.format(
+            'Listing: {} ; item id: {} ; ask: {} ({}) ; bid: {} ({})'.format(
                 listing_hash,
                 item_nameid,
-                ask_price,
+                format_price_in_cents(ask_price),
                 ask_volume,
-                bid_price,
+                format_price_in_cents(bid_price),
                 bid_volume,
             ),
         )
 
-    return bid_price, ask_price, bid_volume, ask_volume
+    return bid_price, ask_price, bid_volume, ask_volume, buy_order_ladder
 
 
 def download_market_order_data_batch(
@@ -202,6 +254,7 @@ def download_market_order_data_batch(
     save_to_disk: bool = True,
     market_order_output_file_name: str = None,
     listing_details_output_file_name: str = None,
+    freshness_in_seconds: float = None,
 ) -> dict[str, dict]:
     if market_order_output_file_name is None:
         market_order_output_file_name = get_market_order_file_name()
@@ -232,10 +285,25 @@ def download_market_order_data_batch(
 
     for app_id in badge_data:
         listing_hash = badge_data[app_id]['listing_hash']
-        bid_price, ask_price, bid_volume, ask_volume = download_market_order_data(
+
+        # Queries which are served from memory do not count towards the rate limits.
+        is_served_from_memory = is_fresh_in_memory(
+            get_steam_market_order_url(),
+            get_market_order_parameters(item_nameids[listing_hash]['item_nameid']),
+            freshness_in_seconds=freshness_in_seconds,
+        )
+
+        (
+            bid_price,
+            ask_price,
+            bid_volume,
+            ask_volume,
+            buy_order_ladder,
+        ) = download_market_order_data_with_ladder(
             listing_hash,
             verbose=verbose,
             listing_details_output_file_name=listing_details_output_file_name,
+            freshness_in_seconds=freshness_in_seconds,
         )
 
         market_order_dict[listing_hash] = {}
@@ -244,10 +312,15 @@ def download_market_order_data_batch(
         market_order_dict[listing_hash]['bid_volume'] = bid_volume
         market_order_dict[listing_hash]['ask_volume'] = ask_volume
         market_order_dict[listing_hash]['is_marketable'] = item_nameids[listing_hash]['is_marketable']
+        market_order_dict[listing_hash]['buy_order_ladder'] = buy_order_ladder
+
+        if is_served_from_memory:
+            continue
 
         if query_count >= rate_limits['max_num_queries']:
             if save_to_disk:
-                save_json(market_order_dict, market_order_output_file_name)
+                # Checkpoint into the market store: a single transaction, instead of writing the whole .json file.
+                save_to_market_store('market_orders', market_order_output_file_name, market_order_dict)
 
             cooldown_duration = rate_limits['cooldown']
             print(
@@ -260,7 +333,7 @@ def download_market_order_data_batch(
         query_count += 1
 
     if save_to_disk:
-        save_json(market_order_dict, market_order_output_file_name)
+        save_to_market_store('market_orders', market_order_output_file_name, market_order_dict)
 
     return market_order_dict
 
@@ -270,6 +343,7 @@ def load_market_order_data(
     trim_output: bool = False,
     retrieve_market_orders_online: bool = True,
     verbose: bool = False,
+    freshness_in_seconds: float = None,
 ) -> dict[str, dict]:
     market_order_dict = load_market_order_data_from_disk()
 
@@ -279,6 +353,7 @@ def load_market_order_data(
             save_to_disk=True,
             market_order_dict=market_order_dict,
             verbose=verbose,
+            freshness_in_seconds=freshness_in_seconds,
         )
 
     if trim_output:
@@ -325,12 +400,16 @@ def trim_market_order_data(
 
 def load_market_order_data_from_disk(
     market_order_output_file_name: str = None,
+    listing_hashes: list[str] = None,
 ) -> [dict[str, dict] | None]:
     if market_order_output_file_name is None:
         market_order_output_file_name = get_market_order_file_name()
 
     try:
-        market_order_dict = load_json(market_order_output_file_name)
+        market_order_dict = query_market_orders(
+            market_order_output_file_name,
+            listing_hashes=listing_hashes,
+        )
     except FileNotFoundError:
         market_order_dict = None
 
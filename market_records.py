@@ -0,0 +1,227 @@
+# Objective: represent listings, listing details and market orders with slotted records, rather than with a nested
+#            dictionary per listing hash, to save memory and attribute-lookup time when filtering large catalogues.
+#
+# NB: the .json files keep the same shape. Records are converted from and to dictionaries on the fly.
+#
+# Records are used by the loaders which read many listings without modifying them, i.e. the sell prices during the
+# aggregation of badge data, and the item name ids before downloading market orders.
+
+import json
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from market_store import convert_to_optional_bool, query_table
+from utils import (
+    get_listing_details_output_file_name,
+    get_listing_output_file_name,
+    get_market_order_file_name,
+)
+
+
+@dataclass(slots=True)
+class Listing:
+    sell_listings: int
+    sell_price: int  # in cents
+    sell_price_text: str
+
+
+@dataclass(slots=True)
+class ListingDetails:
+    item_nameid: [int | None]
+    is_marketable: [bool | None]
+    item_type_no: [int | None] = None
+    # NB: the field 'item_type_no' is missing for listing details which were downloaded before it was introduced, and
+    #     this is different from a null value, i.e. an item type which could not be parsed.
+    has_item_type_no: bool = False
+
+
+@dataclass(slots=True)
+class MarketOrder:
+    bid: int  # in cents
+    ask: int  # in cents
+    bid_volume: int
+    ask_volume: int
+    is_marketable: [bool | None]
+    # Cumulative buy orders: [[price in cents, cumulative quantity], ...], by decreasing price. None if not downloaded.
+    buy_order_ladder: [list | None] = None
+
+
+def convert_dict_to_listing(listing: dict) -> Listing:
+    return Listing(
+        listing['sell_listings'],
+        listing['sell_price'],
+        listing['sell_price_text'],
+    )
+
+
+def convert_listing_to_dict(listing: Listing) -> dict:
+    return {
+        'sell_listings': listing.sell_listings,
+        'sell_price': listing.sell_price,
+        'sell_price_text': listing.sell_price_text,
+    }
+
+
+def convert_dict_to_listing_details(listing_details: dict) -> ListingDetails:
+    return ListingDetails(
+        listing_details.get('item_nameid'),
+        listing_details.get('is_marketable'),
+        listing_details.get('item_type_no'),
+        'item_type_no' in listing_details,
+    )
+
+
+def convert_listing_details_to_dict(listing_details: ListingDetails) -> dict:
+    d = {
+        'item_nameid': listing_details.item_nameid,
+        'is_marketable': listing_details.is_marketable,
+    }
+    if listing_details.has_item_type_no:
+        d['item_type_no'] = listing_details.item_type_no
+
+    return d
+
+
+def convert_dict_to_market_order(market_order: dict) -> MarketOrder:
+    return MarketOrder(
+        market_order['bid'],
+        market_order['ask'],
+        market_order['bid_volume'],
+        market_order['ask_volume'],
+        market_order.get('is_marketable'),
+        market_order.get('buy_order_ladder'),
+    )
+
+
+def convert_market_order_to_dict(market_order: MarketOrder) -> dict:
+    market_order_as_dict = {
+        'bid': market_order.bid,
+        'ask': market_order.ask,
+        'bid_volume': market_order.bid_volume,
+        'ask_volume': market_order.ask_volume,
+        'is_marketable': market_order.is_marketable,
+    }
+    if market_order.buy_order_ladder is not None:
+        market_order_as_dict['buy_order_ladder'] = market_order.buy_order_ladder
+
+    return market_order_as_dict
+
+
+def convert_dicts_to_records(
+    data: dict[str, dict],
+    convert_function: Callable[[dict], object],
+) -> dict[str, object]:
+    return {listing_hash: convert_function(v) for listing_hash, v in data.items()}
+
+
+def convert_records_to_dicts(
+    records: dict[str, object],
+    convert_function: Callable[[object], dict],
+) -> dict[str, dict]:
+    return {listing_hash: convert_function(v) for listing_hash, v in records.items()}
+
+
+def load_listing_records(
+    listing_output_file_name: str = None,
+    listing_hashes: list[str] = None,
+) -> dict[str, Listing]:
+    if listing_output_file_name is None:
+        listing_output_file_name = get_listing_output_file_name()
+
+    # NB: rows are turned into records directly, without building intermediate dictionaries.
+    try:
+        listings = {
+            listing_hash: Listing(sell_listings, sell_price, sell_price_text)
+            for listing_hash, sell_listings, sell_price, sell_price_text in query_table(
+                'listings',
+                listing_output_file_name,
+                listing_hashes=listing_hashes,
+            )
+        }
+    except FileNotFoundError:
+        listings = {}
+
+    return listings
+
+
+def load_listing_details_records(
+    listing_details_output_file_name: str = None,
+    listing_hashes: list[str] = None,
+) -> dict[str, ListingDetails]:
+    if listing_details_output_file_name is None:
+        listing_details_output_file_name = get_listing_details_output_file_name()
+
+    # Caveat: raise FileNotFoundError if the .json file does not exist, like load_all_listing_details().
+    all_listing_details = {
+        listing_hash: ListingDetails(
+            item_nameid,
+            convert_to_optional_bool(is_marketable),
+            item_type_no,
+            bool(has_item_type_no),
+        )
+        for listing_hash, item_nameid, is_marketable, item_type_no, has_item_type_no in query_table(
+            'listing_details',
+            listing_details_output_file_name,
+            listing_hashes=listing_hashes,
+        )
+    }
+
+    return all_listing_details
+
+
+def load_market_order_records(
+    market_order_output_file_name: str = None,
+    listing_hashes: list[str] = None,
+) -> [dict[str, MarketOrder] | None]:
+    if market_order_output_file_name is None:
+        market_order_output_file_name = get_market_order_file_name()
+
+    try:
+        market_orders = {
+            listing_hash: MarketOrder(
+                bid,
+                ask,
+                bid_volume,
+                ask_volume,
+                convert_to_optional_bool(is_marketable),
+                None if buy_order_ladder is None else json.loads(buy_order_ladder),
+            )
+            for (
+                listing_hash,
+                bid,
+                ask,
+                bid_volume,
+                ask_volume,
+                is_marketable,
+                buy_order_ladder,
+            ) in query_table(
+                'market_orders',
+                market_order_output_file_name,
+                listing_hashes=listing_hashes,
+            )
+        }
+    except FileNotFoundError:
+        market_orders = None
+
+    return market_orders
+
+
+def main() -> bool:
+    listings = load_listing_records()
+    all_listing_details = load_listing_details_records()
+    market_orders = load_market_order_records()
+
+    print(
+        f'#listings = {len(listings)} ; #listing details = {len(all_listing_details)} ; #market orders = {len(market_orders)}',
+    )
+
+    listing_hash = '290970-1849 Booster Pack'
+    print(listings[listing_hash])
+    print(all_listing_details[listing_hash])
+    print(market_orders[listing_hash])
+
+    return True
+
+
+if __name__ == '__main__':
+    main()
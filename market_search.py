@@ -3,15 +3,20 @@
 
 import time
 from http import HTTPStatus
-from pathlib import Path
 
 import requests
 
+from market_store import (
+    get_market_store_revision,
+    is_in_market_store,
+    query_listings,
+    save_to_market_store,
+)
 from personal_info import (
     get_cookie_dict,
     update_and_save_cookie_to_disk_if_values_changed,
 )
-from src.json_utils import load_json, save_json
+from src.json_utils import load_memoized
 from utils import get_cushioned_cooldown_in_seconds, get_listing_output_file_name
 
 
@@ -238,13 +243,13 @@ def download_all_listings(
     if listing_output_file_name is None:
         listing_output_file_name = get_listing_output_file_name()
 
-    if not Path(listing_output_file_name).exists():
+    if not is_in_market_store('listings', listing_output_file_name):
         all_listings = get_all_listings(
             url=url,
             tag_item_class_no=tag_item_class_no,
         )
 
-        save_json(all_listings, listing_output_file_name)
+        save_to_market_store('listings', listing_output_file_name, all_listings)
 
     return True
 
@@ -279,17 +284,33 @@ def update_all_listings(
         rarity=rarity,
     )
 
-    save_json(all_listings, listing_output_file_name)
+    save_to_market_store('listings', listing_output_file_name, all_listings)
 
     return True
 
 
-def load_all_listings(listing_output_file_name: str = None) -> dict[str, dict]:
+def load_all_listings(
+    listing_output_file_name: str = None,
+    listing_hashes: list[str] = None,
+    read_only: bool = False,
+) -> dict[str, dict]:
     if listing_output_file_name is None:
         listing_output_file_name = get_listing_output_file_name()
 
     try:
-        all_listings = load_json(listing_output_file_name)
+        if read_only and listing_hashes is None:
+            # NB: the read-only view is shared across the process, and loaded again only if the data is modified.
+            all_listings = load_memoized(
+                listing_output_file_name,
+                lambda: query_listings(listing_output_file_name),
+                key='listings',
+                get_signature=lambda file_name: get_market_store_revision('listings', file_name),
+            )
+        else:
+            all_listings = query_listings(
+                listing_output_file_name,
+                listing_hashes=listing_hashes,
+            )
     except FileNotFoundError:
         print(
             f'File {listing_output_file_name} not found. Initializing listings with an empty dictionary.',
@@ -0,0 +1,766 @@
+# Objective: keep market data in an embedded SQLite store, with indexed tables, so that startup and joins scale with
+#            what is queried rather than with the total size of the .json files stored in data/.
+#
+# NB: each .json file is imported once into the store. Downloads and checkpoints are then written into the store
+#     directly, so that a save never forces a full import of the .json file. A .json file is imported again only if it
+#     is modified outside of this program, e.g. if it is replaced with a newer version.
+
+import json
+import sqlite3
+import time
+from collections.abc import Callable, Iterable
+from contextlib import closing
+from pathlib import Path
+
+from src.json_utils import load_json, save_json, wait_for_background_writes
+from src.money_utils import convert_cents_to_euros, convert_euros_to_cents
+from utils import (
+    get_goo_details_file_nam_for_for_foil_cards,
+    get_listing_details_output_file_name,
+    get_listing_details_output_file_name_for_emoticons,
+    get_listing_details_output_file_name_for_foil_cards,
+    get_listing_details_output_file_name_for_profile_backgrounds,
+    get_listing_output_file_name,
+    get_listing_output_file_name_for_emoticons,
+    get_listing_output_file_name_for_foil_cards,
+    get_listing_output_file_name_for_profile_backgrounds,
+    get_market_order_file_name,
+    get_market_order_file_name_for_emoticons,
+    get_market_order_file_name_for_profile_backgrounds,
+    get_market_store_file_name,
+    get_next_creation_time_file_name,
+)
+
+# Bump this number whenever the schema changes: the tables are then migrated in place, by copying the columns which
+# exist in both schemas.
+# Caveat: new columns must be nullable or have a default value, so that the rows of the previous schema can be copied.
+
+# The schema version from which the prices of market orders are stored as integer numbers of cents, instead of euros.
+MARKET_STORE_SCHEMA_VERSION_WITH_PRICES_IN_CENTS = 5
+MARKET_STORE_SCHEMA_VERSION = 5
+
+# Maximal number of variables in a single SQL query, to query a selection of listing hashes in chunks.
+MAX_NUM_QUERY_PARAMETERS = 500
+
+
+def get_market_store_schema() -> list[str]:
+    schema = [
+        # NB: the signature (mtime_ns, file_size) of the .json file is null if the data was never imported from a file.
+        #     The revision changes whenever the data is imported or saved, so that loaded data can be memoized.
+        'CREATE TABLE IF NOT EXISTS imported_files ('
+        ' file_name TEXT PRIMARY KEY, mtime_ns INTEGER, file_size INTEGER, revision INTEGER NOT NULL DEFAULT 0)',
+        'CREATE TABLE IF NOT EXISTS listings ('
+        ' file_name TEXT NOT NULL, listing_hash TEXT NOT NULL,'
+        ' sell_listings INTEGER, sell_price INTEGER, sell_price_text TEXT,'
+        ' PRIMARY KEY (file_name, listing_hash))',
+        'CREATE INDEX IF NOT EXISTS listings_by_sell_price ON listings (file_name, sell_price)',
+        'CREATE TABLE IF NOT EXISTS listing_details ('
+        ' file_name TEXT NOT NULL, listing_hash TEXT NOT NULL,'
+        ' item_nameid INTEGER, is_marketable INTEGER, item_type_no INTEGER, has_item_type_no INTEGER NOT NULL,'
+        ' PRIMARY KEY (file_name, listing_hash))',
+        'CREATE INDEX IF NOT EXISTS listing_details_by_hash ON listing_details (listing_hash)',
+        # NB: the prices of market orders, including the buy order ladder, are stored as integer numbers of cents.
+        'CREATE TABLE IF NOT EXISTS market_orders ('
+        ' file_name TEXT NOT NULL, listing_hash TEXT NOT NULL,'
+        ' bid INTEGER, ask INTEGER, bid_volume INTEGER, ask_volume INTEGER,'
+        ' is_marketable INTEGER, buy_order_ladder TEXT,'
+        ' PRIMARY KEY (file_name, listing_hash))',
+        'CREATE INDEX IF NOT EXISTS market_orders_by_hash ON market_orders (listing_hash)',
+        'CREATE TABLE IF NOT EXISTS goo_values ('
+        ' file_name TEXT NOT NULL, app_id INTEGER NOT NULL, goo_value INTEGER,'
+        ' PRIMARY KEY (file_name, app_id))',
+        # NB: the timestamp is derived from the time in Valve's format, and stored next to it. It is null until it is
+        #     computed, e.g. after the .json file of times is imported again.
+        'CREATE TABLE IF NOT EXISTS creation_times ('
+        ' file_name TEXT NOT NULL, app_id INTEGER NOT NULL, next_creation_time TEXT, next_creation_epoch INTEGER,'
+        ' PRIMARY KEY (file_name, app_id))',
+    ]
+
+    return schema
+
+
+def get_market_store_table_names() -> list[str]:
+    table_names = [
+        'imported_files',
+        'listings',
+        'listing_details',
+        'market_orders',
+        'goo_values',
+        'creation_times',
+    ]
+
+    return table_names
+
+
+def get_column_names(connection: sqlite3.Connection, table_name: str) -> list[str]:
+    column_names = [row[1] for row in connection.execute(f'PRAGMA table_info({table_name})')]
+
+    return column_names
+
+
+def migrate_market_store(connection: sqlite3.Connection) -> None:
+    # Objective: change the schema without losing any data, because the store is the only copy of the data which was
+    # downloaded after the import of the .json files.
+
+    previous_schema_version = connection.execute('PRAGMA user_version').fetchone()[0]
+
+    existing_table_names = {
+        row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+
+    previous_table_names = [
+        table_name
+        for table_name in get_market_store_table_names()
+        if table_name in existing_table_names
+    ]
+
+    for table_name in previous_table_names:
+        connection.execute(f'ALTER TABLE {table_name} RENAME TO previous_{table_name}')
+
+    # NB: the indexes follow the renamed tables. They are dropped, so that they are created again for the new tables.
+    index_names = [
+        row[0]
+        for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")
+    ]
+
+    for index_name in index_names:
+        connection.execute(f'DROP INDEX {index_name}')
+
+    for statement in get_market_store_schema():
+        connection.execute(statement)
+
+    for table_name in previous_table_names:
+        previous_column_names = set(get_column_names(connection, f'previous_{table_name}'))
+
+        columns = ', '.join(
+            column_name
+            for column_name in get_column_names(connection, table_name)
+            if column_name in previous_column_names
+        )
+
+        connection.execute(f'INSERT INTO {table_name} ({columns}) SELECT {columns} FROM previous_{table_name}')
+        connection.execute(f'DROP TABLE previous_{table_name}')
+
+    has_prices_in_euros = previous_schema_version < MARKET_STORE_SCHEMA_VERSION_WITH_PRICES_IN_CENTS
+
+    if 'market_orders' in previous_table_names and has_prices_in_euros:
+        convert_stored_market_orders_from_euros_to_cents(connection)
+
+    connection.execute(f'PRAGMA user_version = {MARKET_STORE_SCHEMA_VERSION}')
+
+
+def convert_stored_market_orders_from_euros_to_cents(connection: sqlite3.Connection) -> None:
+    rows = connection.execute(
+        'SELECT file_name, listing_hash, bid, ask, buy_order_ladder FROM market_orders',
+    ).fetchall()
+
+    converted_rows = []
+
+    for file_name, listing_hash, bid, ask, buy_order_ladder in rows:
+        market_order = convert_market_order_prices(
+            {
+                'bid': bid,
+                'ask': ask,
+                'buy_order_ladder': None if buy_order_ladder is None else json.loads(buy_order_ladder),
+            },
+            convert_euros_to_cents,
+        )
+
+        if market_order['buy_order_ladder'] is not None:
+            market_order['buy_order_ladder'] = json.dumps(market_order['buy_order_ladder'])
+
+        converted_rows.append(
+            (market_order['bid'], market_order['ask'], market_order['buy_order_ladder'], file_name, listing_hash),
+        )
+
+    connection.executemany(
+        'UPDATE market_orders SET bid = ?, ask = ?, buy_order_ladder = ? WHERE file_name = ? AND listing_hash = ?',
+        converted_rows,
+    )
+
+
+def connect_to_market_store(store_file_name: str = None) -> sqlite3.Connection:
+    if store_file_name is None:
+        store_file_name = get_market_store_file_name()
+
+    connection = sqlite3.connect(store_file_name)
+
+    schema_version = connection.execute('PRAGMA user_version').fetchone()[0]
+
+    with connection:
+        if schema_version != MARKET_STORE_SCHEMA_VERSION:
+            migrate_market_store(connection)
+
+        for statement in get_market_store_schema():
+            connection.execute(statement)
+
+    return connection
+
+
+def get_file_key(file_name: str) -> str:
+    file_key = Path(file_name).as_posix()
+
+    return file_key
+
+
+def convert_to_optional_bool(value: [int | None]) -> [bool | None]:
+    if value is None:
+        return None
+
+    return bool(value)
+
+
+def convert_listing_to_row(listing: dict) -> tuple:
+    row = (
+        listing['sell_listings'],
+        listing['sell_price'],
+        listing['sell_price_text'],
+    )
+
+    return row
+
+
+def convert_listing_details_to_row(listing_details: dict) -> tuple:
+    # NB: the field 'item_type_no' is missing for listing details which were downloaded before it was introduced, and
+    #     this is different from a null value, i.e. an item type which could not be parsed.
+    row = (
+        listing_details.get('item_nameid'),
+        listing_details.get('is_marketable'),
+        listing_details.get('item_type_no'),
+        'item_type_no' in listing_details,
+    )
+
+    return row
+
+
+def convert_market_order_prices(
+    market_order: dict,
+    convert_price: Callable[[float | int], float | int],
+) -> dict:
+    # NB: the price is -1 if it could not be retrieved, in euros as in cents.
+    converted_market_order = dict(market_order)
+
+    for field in ['bid', 'ask']:
+        if market_order[field] is not None and market_order[field] >= 0:
+            converted_market_order[field] = convert_price(market_order[field])
+
+    if market_order.get('buy_order_ladder') is not None:
+        converted_market_order['buy_order_ladder'] = [
+            [convert_price(price), cumulative_quantity]
+            for price, cumulative_quantity in market_order['buy_order_ladder']
+        ]
+
+    return converted_market_order
+
+
+def convert_market_orders_from_euros_to_cents(market_order_dict: dict[str, dict]) -> dict[str, dict]:
+    # The .json files of market orders keep the prices in euros, as downloaded from Steam. They are converted to cents
+    # once, when the .json file is imported.
+    #
+    # Caveat: the unit cannot be inferred from the values, because Steam sends prices in whole euros as integers.
+    converted_market_order_dict = {
+        listing_hash: convert_market_order_prices(market_order, convert_euros_to_cents)
+        for listing_hash, market_order in market_order_dict.items()
+    }
+
+    return converted_market_order_dict
+
+
+def convert_market_orders_from_cents_to_euros(market_order_dict: dict[str, dict]) -> dict[str, dict]:
+    converted_market_order_dict = {
+        listing_hash: convert_market_order_prices(market_order, convert_cents_to_euros)
+        for listing_hash, market_order in market_order_dict.items()
+    }
+
+    return converted_market_order_dict
+
+
+def convert_market_order_to_row(market_order: dict) -> tuple:
+    # NB: the buy order ladder is only available for market orders downloaded after it was introduced. It is stored as
+    #     a JSON string, because it is only ever read as a whole.
+    try:
+        buy_order_ladder = json.dumps(market_order['buy_order_ladder'])
+    except KeyError:
+        buy_order_ladder = None
+
+    row = (
+        market_order['bid'],
+        market_order['ask'],
+        market_order['bid_volume'],
+        market_order['ask_volume'],
+        market_order.get('is_marketable'),
+        buy_order_ladder,
+    )
+
+    return row
+
+
+def get_insert_statement(table_name: str) -> str:
+    if table_name == 'listings':
+        columns = 'file_name, listing_hash, sell_listings, sell_price, sell_price_text'
+    elif table_name == 'listing_details':
+        columns = 'file_name, listing_hash, item_nameid, is_marketable, item_type_no, has_item_type_no'
+    elif table_name == 'market_orders':
+        columns = 'file_name, listing_hash, bid, ask, bid_volume, ask_volume, is_marketable, buy_order_ladder'
+    elif table_name == 'goo_values':
+        columns = 'file_name, app_id, goo_value'
+    elif table_name == 'creation_times':
+        columns = 'file_name, app_id, next_creation_time'
+    else:
+        raise AssertionError()
+
+    num_columns = len(columns.split(','))
+    placeholders = ', '.join(['?'] * num_columns)
+
+    insert_statement = f'INSERT INTO {table_name} ({columns}) VALUES ({placeholders})'
+
+    return insert_statement
+
+
+def convert_json_data_to_rows(
+    table_name: str,
+    file_key: str,
+    data: dict,
+) -> Iterable[tuple]:
+    if table_name == 'listings':
+        rows = ((file_key, k, *convert_listing_to_row(v)) for k, v in data.items())
+    elif table_name == 'listing_details':
+        rows = ((file_key, k, *convert_listing_details_to_row(v)) for k, v in data.items())
+    elif table_name == 'market_orders':
+        rows = ((file_key, k, *convert_market_order_to_row(v)) for k, v in data.items())
+    elif table_name in ['goo_values', 'creation_times']:
+        # NB: the keys in a dictionary loaded from a .json file are always str. AppIDs are stored as integers. The rows
+        #     are built from a dictionary keyed by int, so that an appID appears once even if keyed both by str and int.
+        data_by_app_id = {int(k): v for k, v in data.items()}
+        rows = ((file_key, k, v) for k, v in data_by_app_id.items())
+    else:
+        raise AssertionError()
+
+    return rows
+
+
+def get_json_file_signature(file_name: str) -> [tuple[int, int] | None]:
+    try:
+        file_stat = Path(file_name).stat()
+    except FileNotFoundError:
+        return None
+
+    file_signature = (file_stat.st_mtime_ns, file_stat.st_size)
+
+    return file_signature
+
+
+def write_rows_into_market_store(
+    connection: sqlite3.Connection,
+    table_name: str,
+    file_name: str,
+    data: dict,
+    file_signature: [tuple[int, int] | None],
+) -> None:
+    # Replace the data stored for this file name, in a single transaction.
+
+    file_key = get_file_key(file_name)
+
+    if file_signature is None:
+        file_signature = (None, None)
+
+    with connection:
+        connection.execute(f'DELETE FROM {table_name} WHERE file_name = ?', (file_key,))
+        connection.executemany(
+            get_insert_statement(table_name),
+            convert_json_data_to_rows(table_name, file_key, data),
+        )
+        connection.execute(
+            'INSERT OR REPLACE INTO imported_files (file_name, mtime_ns, file_size, revision) VALUES (?, ?, ?, ?)',
+            (file_key, *file_signature, time.time_ns()),
+        )
+
+
+def sync_market_store_with_json_file(
+    connection: sqlite3.Connection,
+    table_name: str,
+    file_name: str,
+    verbose: bool = False,
+) -> bool:
+    # Import the .json file into the store, unless the data is already in the store and the .json file has not been
+    # modified since the last import.
+    # Return whether the data is available, either in the store or in the .json file.
+
+    file_key = get_file_key(file_name)
+
+    # Ensure that a checkpoint of this file, if any, has been written to disk before checking whether it was modified.
+    wait_for_background_writes(file_name)
+
+    file_signature = get_json_file_signature(file_name)
+
+    imported_file = connection.execute(
+        'SELECT mtime_ns, file_size FROM imported_files WHERE file_name = ?',
+        (file_key,),
+    ).fetchone()
+
+    if imported_file is not None and (file_signature is None or tuple(imported_file) == file_signature):
+        return True
+
+    if file_signature is None:
+        return False
+
+    data = load_json(file_name)
+
+    if table_name == 'market_orders':
+        data = convert_market_orders_from_euros_to_cents(data)
+
+    write_rows_into_market_store(connection, table_name, file_name, data, file_signature)
+
+    if verbose:
+        print(f'Importing {len(data)} rows from {file_name} into the market store.')
+
+    return True
+
+
+def save_to_market_store(
+    table_name: str,
+    file_name: str,
+    data: dict,
+    store_file_name: str = None,
+) -> None:
+    # Save downloaded data into the store, under the name of the .json file from which the data would be imported.
+    # NB: the signature of the .json file is recorded, so that the .json file is not imported again on top of this data.
+
+    with closing(connect_to_market_store(store_file_name)) as connection:
+        write_rows_into_market_store(
+            connection,
+            table_name,
+            file_name,
+            data,
+            get_json_file_signature(file_name),
+        )
+
+
+def is_in_market_store(
+    table_name: str,
+    file_name: str,
+    store_file_name: str = None,
+) -> bool:
+    with closing(connect_to_market_store(store_file_name)) as connection:
+        is_available = sync_market_store_with_json_file(connection, table_name, file_name)
+
+    return is_available
+
+
+def get_market_store_revision(
+    table_name: str,
+    file_name: str,
+    store_file_name: str = None,
+) -> int:
+    # Caveat: raise FileNotFoundError if the data is neither in the store nor in the .json file, like load_json().
+
+    with closing(connect_to_market_store(store_file_name)) as connection:
+        if not sync_market_store_with_json_file(connection, table_name, file_name):
+            raise FileNotFoundError(file_name)
+
+        row = connection.execute(
+            'SELECT revision FROM imported_files WHERE file_name = ?',
+            (get_file_key(file_name),),
+        ).fetchone()
+
+    revision = row[0]
+
+    return revision
+
+
+def query_rows(
+    connection: sqlite3.Connection,
+    query: str,
+    file_name: str,
+    listing_hashes: Iterable[str] = None,
+) -> list[tuple]:
+    file_key = get_file_key(file_name)
+
+    if listing_hashes is None:
+        rows = connection.execute(query, (file_key,)).fetchall()
+    else:
+        # Only query the selected listing hashes, thanks to the primary key (file_name, listing_hash).
+        listing_hashes = list(dict.fromkeys(listing_hashes))
+
+        rows = []
+        for i in range(0, len(listing_hashes), MAX_NUM_QUERY_PARAMETERS):
+            chunk = listing_hashes[i : i + MAX_NUM_QUERY_PARAMETERS]
+            placeholders = ', '.join(['?'] * len(chunk))
+            rows += connection.execute(
+                f'{query} AND listing_hash IN ({placeholders})',
+                (file_key, *chunk),
+            ).fetchall()
+
+    return rows
+
+
+def query_table(
+    table_name: str,
+    file_name: str,
+    listing_hashes: Iterable[str] = None,
+    store_file_name: str = None,
+) -> list[tuple]:
+    # Caveat: raise FileNotFoundError if the data is neither in the store nor in the .json file, like load_json().
+
+    with closing(connect_to_market_store(store_file_name)) as connection:
+        file_exists = sync_market_store_with_json_file(connection, table_name, file_name)
+
+        if not file_exists:
+            raise FileNotFoundError(file_name)
+
+        if table_name == 'listings':
+            query = 'SELECT listing_hash, sell_listings, sell_price, sell_price_text FROM listings'
+        elif table_name == 'listing_details':
+            query = 'SELECT listing_hash, item_nameid, is_marketable, item_type_no, has_item_type_no FROM listing_details'
+        elif table_name == 'market_orders':
+            query = (
+                'SELECT listing_hash, bid, ask, bid_volume, ask_volume, is_marketable, buy_order_ladder'
+                ' FROM market_orders'
+            )
+        elif table_name == 'goo_values':
+            query = 'SELECT app_id, goo_value FROM goo_values'
+        elif table_name == 'creation_times':
+            query = 'SELECT app_id, next_creation_time FROM creation_times'
+        else:
+            raise AssertionError()
+
+        rows = query_rows(
+            connection,
+            query + ' WHERE file_name = ?',
+            file_name,
+            listing_hashes=listing_hashes,
+        )
+
+    return rows
+
+
+def query_listings(
+    listing_output_file_name: str,
+    listing_hashes: Iterable[str] = None,
+) -> dict[str, dict]:
+    all_listings = {}
+
+    for listing_hash, sell_listings, sell_price, sell_price_text in query_table(
+        'listings',
+        listing_output_file_name,
+        listing_hashes=listing_hashes,
+    ):
+        all_listings[listing_hash] = {
+            'sell_listings': sell_listings,
+            'sell_price': sell_price,
+            'sell_price_text': sell_price_text,
+        }
+
+    return all_listings
+
+
+def query_listing_details(
+    listing_details_output_file_name: str,
+    listing_hashes: Iterable[str] = None,
+) -> dict[str, dict]:
+    all_listing_details = {}
+
+    for (
+        listing_hash,
+        item_nameid,
+        is_marketable,
+        item_type_no,
+        has_item_type_no,
+    ) in query_table(
+        'listing_details',
+        listing_details_output_file_name,
+        listing_hashes=listing_hashes,
+    ):
+        listing_details = {
+            'item_nameid': item_nameid,
+            'is_marketable': convert_to_optional_bool(is_marketable),
+        }
+        if has_item_type_no:
+            listing_details['item_type_no'] = item_type_no
+
+        all_listing_details[listing_hash] = listing_details
+
+    return all_listing_details
+
+
+def query_market_orders(
+    market_order_output_file_name: str,
+    listing_hashes: Iterable[str] = None,
+) -> dict[str, dict]:
+    market_order_dict = {}
+
+    for (
+        listing_hash,
+        bid,
+        ask,
+        bid_volume,
+        ask_volume,
+        is_marketable,
+        buy_order_ladder,
+    ) in query_table(
+        'market_orders',
+        market_order_output_file_name,
+        listing_hashes=listing_hashes,
+    ):
+        market_order_dict[listing_hash] = {
+            'bid': bid,
+            'ask': ask,
+            'bid_volume': bid_volume,
+            'ask_volume': ask_volume,
+            'is_marketable': convert_to_optional_bool(is_marketable),
+        }
+        if buy_order_ladder is not None:
+            market_order_dict[listing_hash]['buy_order_ladder'] = json.loads(buy_order_ladder)
+
+    return market_order_dict
+
+
+def query_goo_values(goo_details_file_name: str) -> dict[str, int]:
+    # NB: the keys are str, as in the dictionary loaded from the .json file.
+    all_goo_details = {
+        str(app_id): goo_value
+        for app_id, goo_value in query_table('goo_values', goo_details_file_name)
+    }
+
+    return all_goo_details
+
+
+def query_next_creation_times(next_creation_time_file_name: str) -> dict[int, str]:
+    next_creation_times = dict(query_table('creation_times', next_creation_time_file_name))
+
+    return next_creation_times
+
+
+def query_next_creation_times_with_epochs(
+    next_creation_time_file_name: str,
+    store_file_name: str = None,
+) -> list[tuple[int, str, int | None]]:
+    # Return (appID, next creation time, next creation epoch) rows. The epoch is None if it has not been computed yet.
+    #
+    # Caveat: raise FileNotFoundError if the data is neither in the store nor in the .json file, like load_json().
+
+    with closing(connect_to_market_store(store_file_name)) as connection:
+        if not sync_market_store_with_json_file(connection, 'creation_times', next_creation_time_file_name):
+            raise FileNotFoundError(next_creation_time_file_name)
+
+        rows = connection.execute(
+            'SELECT app_id, next_creation_time, next_creation_epoch FROM creation_times WHERE file_name = ?',
+            (get_file_key(next_creation_time_file_name),),
+        ).fetchall()
+
+    return rows
+
+
+def save_next_creation_epochs_to_market_store(
+    next_creation_time_file_name: str,
+    next_creation_epochs: dict[int, int],
+    store_file_name: str = None,
+) -> None:
+    # NB: the revision is not changed, because the epochs are derived from the times which are already stored.
+    file_key = get_file_key(next_creation_time_file_name)
+
+    with closing(connect_to_market_store(store_file_name)) as connection:
+        with connection:
+            connection.executemany(
+                'UPDATE creation_times SET next_creation_epoch = ? WHERE file_name = ? AND app_id = ?',
+                [
+                    (next_creation_epoch, file_key, int(app_id))
+                    for app_id, next_creation_epoch in next_creation_epochs.items()
+                ],
+            )
+
+
+def get_json_files_to_import() -> dict[str, list[str]]:
+    listing_output_file_names = [get_listing_output_file_name(), get_listing_output_file_name_for_foil_cards()]
+    for rarity in ['common', 'uncommon', 'rare']:
+        listing_output_file_names += [
+            get_listing_output_file_name_for_profile_backgrounds(rarity=rarity),
+            get_listing_output_file_name_for_emoticons(rarity=rarity),
+        ]
+
+    json_files_to_import = {
+        'listings': listing_output_file_names,
+        'listing_details': [
+            get_listing_details_output_file_name(),
+            get_listing_details_output_file_name_for_foil_cards(),
+            get_listing_details_output_file_name_for_profile_backgrounds(),
+            get_listing_details_output_file_name_for_emoticons(),
+        ],
+        'market_orders': [
+            get_market_order_file_name(),
+            get_market_order_file_name_for_profile_backgrounds(),
+            get_market_order_file_name_for_emoticons(),
+        ],
+        'goo_values': [get_goo_details_file_nam_for_for_foil_cards()],
+        'creation_times': [get_next_creation_time_file_name()],
+    }
+
+    return json_files_to_import
+
+
+def import_json_files_into_market_store(
+    store_file_name: str = None,
+    verbose: bool = True,
+) -> int:
+    num_imported_files = 0
+
+    with closing(connect_to_market_store(store_file_name)) as connection:
+        for table_name, file_names in get_json_files_to_import().items():
+            for file_name in file_names:
+                file_exists = sync_market_store_with_json_file(
+                    connection,
+                    table_name,
+                    file_name,
+                    verbose=verbose,
+                )
+                num_imported_files += int(file_exists)
+
+    if verbose:
+        print(f'{num_imported_files} files are available in the market store.')
+
+    return num_imported_files
+
+
+def export_market_store_to_json_files(verbose: bool = True) -> int:
+    # Write the data of the store back to the .json files, e.g. to share it.
+    query_functions = {
+        'listings': query_listings,
+        'listing_details': query_listing_details,
+        'market_orders': query_market_orders,
+        'goo_values': query_goo_values,
+        'creation_times': query_next_creation_times,
+    }
+
+    num_exported_files = 0
+
+    for table_name, file_names in get_json_files_to_import().items():
+        for file_name in file_names:
+            try:
+                data = query_functions[table_name](file_name)
+            except FileNotFoundError:
+                continue
+
+            if table_name == 'market_orders':
+                save_json(convert_market_orders_from_cents_to_euros(data), file_name)
+            else:
+                save_json(data, file_name)
+
+            # Record the signature of the exported file, so that it is not imported again.
+            save_to_market_store(table_name, file_name, data)
+
+            num_exported_files += 1
+
+    if verbose:
+        print(f'{num_exported_files} files are exported from the market store.')
+
+    return num_exported_files
+
+
+def main() -> bool:
+    import_json_files_into_market_store()
+
+    return True
+
+
+if __name__ == '__main__':
+    main()
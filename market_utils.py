@@ -2,11 +2,14 @@
 
 import random
 
+from creation_time_utils import convert_creation_time_to_epoch, get_current_time
+from listing_catalogue import get_listing_records
 from market_listing import get_item_nameid_batch
+from market_records import Listing, load_listing_records
 from market_search import load_all_listings, update_all_listings
 from parsing_utils import parse_badge_creation_details
 from sack_of_gems import get_gem_price
-from utils import convert_listing_hash_to_app_id, convert_listing_hash_to_app_name
+from src.money_utils import convert_euros_to_cents_rounded_up
 
 
 def determine_whether_listing_hash_is_dubious(listing_hash: str) -> bool:
@@ -18,9 +21,9 @@ def determine_whether_listing_hash_is_dubious(listing_hash: str) -> bool:
 
 
 def filter_out_dubious_listing_hashes(
-    all_listings: dict[str, dict],
+    all_listings: dict[str, dict | Listing],
     verbose: bool = True,
-) -> dict[str, dict]:
+) -> dict[str, dict | Listing]:
     # Filter out listing hashes which hint at a dubious market listing for the booster pack. For instance:
     #   362680-Fran Bow #Economy_TradingCards_ItemType_BoosterPack
     #   844870-#Economy_TradingCards_Type_GameType
@@ -53,7 +56,7 @@ def filter_out_dubious_listing_hashes(
 
 def match_badges_with_listing_hashes(
     badge_creation_details: dict[int, dict] = None,
-    all_listings: dict[str, dict] = None,
+    all_listings: dict[str, dict | Listing] = None,
     verbose: bool = True,
 ) -> dict[int, str | None]:
     # Badges for games which I own
@@ -74,12 +77,9 @@ def match_badges_with_listing_hashes(
 
     listing_matches_with_app_ids = {}
     listing_matches_with_app_names = {}
-    for listing_hash in all_listing_hashes:
-        app_id = convert_listing_hash_to_app_id(listing_hash)
-        app_name = convert_listing_hash_to_app_name(listing_hash)
-
-        listing_matches_with_app_ids[app_id] = listing_hash
-        listing_matches_with_app_names[app_name] = listing_hash
+    for listing_record in get_listing_records(all_listing_hashes):
+        listing_matches_with_app_ids[listing_record.app_id] = listing_record.listing_hash
+        listing_matches_with_app_names[listing_record.app_name] = listing_record.listing_hash
 
     # Match badges with listing hashes
 
@@ -113,7 +113,7 @@ def match_badges_with_listing_hashes(
 def aggregate_badge_data(
     badge_creation_details: dict[int, dict],
     badge_matches: dict[int, str | None],
-    all_listings: dict[str, dict] = None,
+    all_listings: dict[str, Listing] = None,
     enforced_sack_of_gems_price: float = None,
     minimum_allowed_sack_of_gems_price: float = None,
     retrieve_gem_price_from_scratch: bool = False,
@@ -127,7 +127,7 @@ def aggregate_badge_data(
     # NB: ensure the same currency is used.
 
     if all_listings is None:
-        all_listings = load_all_listings()
+        all_listings = load_listing_records()
 
     gem_price = get_gem_price(
         enforced_sack_of_gems_price=enforced_sack_of_gems_price,
@@ -141,6 +141,8 @@ def aggregate_badge_data(
 
     badge_app_ids = list(badge_creation_details.keys())
 
+    current_time = get_current_time()
+
     aggregated_badge_data = {}
 
     for app_id in badge_app_ids:
@@ -157,19 +159,29 @@ def aggregate_badge_data(
             # Reference: https://steamcommunity.com/market/search?appid=753&category_753_Game%5B0%5D=tag_app_612150
             continue
 
-        sell_price_in_cents = all_listings[listing_hash]['sell_price']
-        sell_price_in_euros = sell_price_in_cents / 100
+        # NB: prices are stored as integer numbers of cents.
+        sell_price_in_cents = all_listings[listing_hash].sell_price
 
         aggregated_badge_data[app_id] = {}
         aggregated_badge_data[app_id]['name'] = app_name
         aggregated_badge_data[app_id]['listing_hash'] = listing_hash
         aggregated_badge_data[app_id]['gem_amount'] = gem_amount_required_to_craft_booster_pack
-        aggregated_badge_data[app_id]['gem_price'] = (
-            gem_amount_required_to_craft_booster_pack * gem_price
+        aggregated_badge_data[app_id]['gem_price'] = convert_euros_to_cents_rounded_up(
+            gem_amount_required_to_craft_booster_pack * gem_price,
         )
-        aggregated_badge_data[app_id]['sell_price'] = sell_price_in_euros
+        aggregated_badge_data[app_id]['sell_price'] = sell_price_in_cents
         aggregated_badge_data[app_id]['next_creation_time'] = next_creation_time
 
+        # NB: the 'available_at_time' of the Booster Pack Creator is converted to a timestamp once, here, so that
+        #     filtering booster packs based on the cooldown does not require any date parsing.
+        if next_creation_time is None:
+            aggregated_badge_data[app_id]['next_creation_epoch'] = None
+        else:
+            aggregated_badge_data[app_id]['next_creation_epoch'] = convert_creation_time_to_epoch(
+                next_creation_time,
+                current_time,
+            )
+
     return aggregated_badge_data
 
 
@@ -186,7 +198,8 @@ def load_aggregated_badge_data(
     if retrieve_listings_from_scratch:
         update_all_listings()
 
-    all_listings = load_all_listings()
+    # NB: the whole catalogue of booster packs is loaded as slotted records, since only the sell price is read.
+    all_listings = load_listing_records()
 
     all_listings = filter_out_dubious_listing_hashes(all_listings)
 
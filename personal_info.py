@@ -2,6 +2,9 @@
 
 from src.json_utils import load_json, save_json
 
+# In-memory cookie which replaces the cookie stored on disk, e.g. for an offline stand-in of Steam.
+_cookie_override = None
+
 
 def get_steam_cookie_file_name() -> str:
     steam_cookie_file_name = 'personal_info.json'
@@ -38,8 +41,21 @@ def save_steam_cookie_to_disk(
     return is_cookie_to_be_saved
 
 
+def set_cookie_override(cookie: dict[str, str] = None) -> [dict[str, str] | None]:
+    # Return the previous override, so that it can be restored. If None, the cookie is loaded from disk again.
+    global _cookie_override
+
+    previous_cookie_override = _cookie_override
+    _cookie_override = cookie
+
+    return previous_cookie_override
+
+
 def get_cookie_dict(verbose: bool = False) -> dict[str, str]:
-    cookie = load_steam_cookie_from_disk()
+    if _cookie_override is not None:
+        cookie = dict(_cookie_override)
+    else:
+        cookie = load_steam_cookie_from_disk()
 
     if verbose:
         for field in cookie:
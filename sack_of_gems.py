@@ -6,6 +6,7 @@ from market_listing import get_listing_details
 from market_order import download_market_order_data
 from personal_info import get_cookie_dict
 from src.json_utils import load_json, save_json
+from src.money_utils import convert_cents_to_euros
 from utils import get_sack_of_gems_listing_file_name
 
 
@@ -44,12 +45,14 @@ def download_sack_of_gems_price(
             item_nameid,
             verbose,
         )
-        listing_details[listing_hash]['bid'] = bid_price
-        listing_details[listing_hash]['ask'] = ask_price
+        # NB: the price of a sack of gems is in euros, like the price of a gem, which is a fraction of a cent. The price
+        #     is -1 if it could not be retrieved.
+        listing_details[listing_hash]['bid'] = convert_cents_to_euros(bid_price) if bid_price >= 0 else -1
+        listing_details[listing_hash]['ask'] = convert_cents_to_euros(ask_price) if ask_price >= 0 else -1
         listing_details[listing_hash]['bid_volume'] = bid_volume
         listing_details[listing_hash]['ask_volume'] = ask_volume
 
-        sack_of_gems_price = ask_price
+        sack_of_gems_price = listing_details[listing_hash]['ask']
 
         save_json(listing_details, sack_of_gems_listing_file_name)
     else:
@@ -1,16 +1,233 @@
+import atexit
 import json
+import os
+import threading
+from collections.abc import Callable, Hashable
 from pathlib import Path
+from types import MappingProxyType
+
+# Checkpoints which are waiting to be written to disk by the background writer: file name -> (data, options).
+_pending_writes: dict[str, tuple] = {}
+_writes_in_progress: set[str] = set()
+_writer_condition = threading.Condition()
+_writer_thread = None
+
+# Data loaded from files, shared across the process: (file path, key) -> (file signature, read-only view).
+_memoized_loads: dict[tuple[str, Hashable], tuple[tuple[int, int], object]] = {}
+_memo_lock = threading.Lock()
 
 
 def load_json(fname: str) -> dict:
+    # Ensure that a checkpoint of this file, if any, has been written to disk before reading it.
+    wait_for_background_writes(fname)
+
     with Path(fname).open(encoding="utf8") as f:
         data = json.load(f)
     return data
 
 
-def save_json(data: str, fname: str, prettify: bool = True, indent: int = 4) -> None:
-    with Path(fname).open("w", encoding="utf8") as f:
-        if prettify:
-            json.dump(data, f, indent=indent)
+def encode_json(
+    data: str,
+    prettify: bool = True,
+    indent: int = 4,
+    compact: bool = False,
+) -> bytes:
+    if compact:
+        # Compact encoding: no whitespace at all, and UTF-8 characters are not escaped.
+        encoded_data = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    elif prettify:
+        encoded_data = json.dumps(data, indent=indent)
+    else:
+        encoded_data = json.dumps(data)
+
+    return encoded_data.encode("utf8")
+
+
+def write_bytes_atomically(encoded_data: bytes, fname: str) -> None:
+    # Write to a temporary file in the same folder, flush it to disk, then rename it into place. A crash or a Ctrl-C
+    # leaves either the previous version or the new version of the file, never a truncated file.
+    path = Path(fname)
+    temporary_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    try:
+        with temporary_path.open("xb") as f:
+            f.write(encoded_data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        temporary_path.replace(path)
+        invalidate_memoized_loads(fname)
+    except BaseException:
+        temporary_path.unlink(missing_ok=True)
+        raise
+
+    try:
+        # Persist the rename itself. This is not supported on every platform, e.g. on Windows.
+        folder_descriptor = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(folder_descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(folder_descriptor)
+
+
+def save_json(
+    data: str,
+    fname: str,
+    prettify: bool = True,
+    indent: int = 4,
+    compact: bool = False,
+) -> None:
+    encoded_data = encode_json(data, prettify=prettify, indent=indent, compact=compact)
+
+    # A synchronous write supersedes any checkpoint of the same file which is still waiting in the background.
+    with _writer_condition:
+        _pending_writes.pop(fname, None)
+        while fname in _writes_in_progress:
+            _writer_condition.wait()
+
+    write_bytes_atomically(encoded_data, fname)
+
+
+def run_background_writer() -> None:
+    while True:
+        with _writer_condition:
+            while len(_pending_writes) == 0:
+                _writer_condition.wait()
+
+            fname = next(iter(_pending_writes))
+            data, options = _pending_writes.pop(fname)
+            _writes_in_progress.add(fname)
+
+        try:
+            write_bytes_atomically(encode_json(data, **options), fname)
+        except Exception as e:
+            print(f"[ERROR] The checkpoint could not be saved to {fname}: {e}")
+        finally:
+            with _writer_condition:
+                _writes_in_progress.discard(fname)
+                _writer_condition.notify_all()
+
+
+def save_json_in_background(
+    data: str,
+    fname: str,
+    prettify: bool = True,
+    indent: int = 4,
+    compact: bool = False,
+) -> None:
+    # Offload a checkpoint to a background thread, so that it does not stall the loop which fetches data.
+    #
+    # Caveat: only a *shallow* copy of the data is taken. The caller may add or replace entries afterwards, but must
+    #         not mutate the nested values in place.
+    global _writer_thread
+
+    if isinstance(data, dict):
+        snapshot = dict(data)
+    elif isinstance(data, list):
+        snapshot = list(data)
+    else:
+        snapshot = data
+
+    options = {"prettify": prettify, "indent": indent, "compact": compact}
+
+    with _writer_condition:
+        # If a previous checkpoint of the same file is still pending, it is superseded by this one.
+        _pending_writes[fname] = (snapshot, options)
+
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(target=run_background_writer, daemon=True)
+            _writer_thread.start()
+
+        _writer_condition.notify_all()
+
+
+def wait_for_background_writes(fname: str = None) -> None:
+    with _writer_condition:
+        if fname is None:
+            while len(_pending_writes) > 0 or len(_writes_in_progress) > 0:
+                _writer_condition.wait()
+        else:
+            while fname in _pending_writes or fname in _writes_in_progress:
+                _writer_condition.wait()
+
+
+def get_file_signature(fname: str) -> tuple[int, int]:
+    # Caveat: raise FileNotFoundError if the file does not exist.
+    file_stat = Path(fname).stat()
+
+    return file_stat.st_mtime_ns, file_stat.st_size
+
+
+def get_memo_path(fname: str) -> str:
+    return Path(fname).resolve().as_posix()
+
+
+def freeze(data: object) -> object:
+    # Return a read-only view of the data, so that it can be safely shared by every caller.
+    if isinstance(data, dict):
+        return MappingProxyType({k: freeze(v) for k, v in data.items()})
+    if isinstance(data, list):
+        return tuple(freeze(v) for v in data)
+    return data
+
+
+def load_memoized(
+    fname: str,
+    load_function: Callable[[], object],
+    key: Hashable = None,
+    get_signature: Callable[[str], Hashable] = None,
+) -> object:
+    # Objective: load data from a file once per process, then hand out the same read-only view to every caller,
+    # until the file is modified on disk.
+    #
+    # NB: data which is not loaded from the file itself, e.g. from a database, can provide its own signature.
+    #
+    # Caveat: the view cannot be modified. Callers which need to modify the data should use the usual loaders.
+    if get_signature is None:
+        get_signature = get_file_signature
+
+    wait_for_background_writes(fname)
+
+    memo_key = (get_memo_path(fname), key)
+    file_signature = get_signature(fname)
+
+    with _memo_lock:
+        try:
+            memoized_signature, view = _memoized_loads[memo_key]
+        except KeyError:
+            memoized_signature, view = None, None
+
+    if memoized_signature == file_signature:
+        return view
+
+    view = freeze(load_function())
+
+    with _memo_lock:
+        _memoized_loads[memo_key] = (file_signature, view)
+
+    return view
+
+
+def load_json_read_only(fname: str) -> MappingProxyType:
+    view = load_memoized(fname, lambda: load_json(fname))
+
+    return view
+
+
+def invalidate_memoized_loads(fname: str = None) -> None:
+    with _memo_lock:
+        if fname is None:
+            _memoized_loads.clear()
         else:
-            json.dump(data, f)
+            memo_path = get_memo_path(fname)
+            for memo_key in [k for k in _memoized_loads if k[0] == memo_path]:
+                del _memoized_loads[memo_key]
+
+
+# Flush the pending checkpoints before the interpreter exits, as the background writer is a daemon thread.
+atexit.register(wait_for_background_writes)
@@ -0,0 +1,25 @@
+import math
+
+# Objective: represent prices as integer numbers of cents, and only convert to euros for display.
+#
+# NB: prices are downloaded in euros for market orders, and in cents for listings.
+
+
+def convert_euros_to_cents(price_in_euros: float) -> int:
+    return round(100 * price_in_euros)
+
+
+def convert_euros_to_cents_rounded_up(price_in_euros: float) -> int:
+    # This is used for costs which are fractions of a cent, e.g. the price of the gems required to craft a pack.
+    #
+    # NB: the cost is rounded up, so that "profit >= 1 cent" has the same meaning with the rounded cost as with the
+    #     exact cost. The rounding to 6 decimals removes the noise of float arithmetic, e.g. 12.000000000000002.
+    return math.ceil(round(100 * price_in_euros, 6))
+
+
+def convert_cents_to_euros(price_in_cents: int) -> float:
+    return price_in_cents / 100
+
+
+def format_price_in_cents(price_in_cents: int) -> str:
+    return f"{price_in_cents / 100:.2f}€"
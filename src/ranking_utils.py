@@ -0,0 +1,73 @@
+import heapq
+from collections.abc import Callable, Hashable, Iterable, Iterator
+
+# Objective: rank candidates by decreasing score, when only the first few candidates, or the candidates above a
+# threshold, are actually used.
+#
+# - Each score is computed once per candidate, instead of once per comparison.
+# - Candidates below the threshold are discarded while streaming, before any comparison.
+# - The top-k candidates are kept in a bounded heap: the cost scales with k, instead of N log N for a full sort.
+#
+# NB: ties are broken by the order of the candidates, as with sorted(..., reverse=True), which is stable. Candidates
+#     are never compared, because their position is unique.
+
+
+def get_top_k(
+    candidates: Iterable[Hashable],
+    key: Callable[[Hashable], float],
+    k: int = None,
+    threshold: float = None,
+) -> list[Hashable]:
+    # Return at most k candidates with a score greater than or equal to the threshold, by decreasing score.
+
+    if k is not None and k <= 0:
+        return []
+
+    heap = []
+
+    for i, candidate in enumerate(candidates):
+        score = key(candidate)
+
+        if threshold is not None and score < threshold:
+            continue
+
+        entry = (score, -i, candidate)
+
+        if k is None or len(heap) < k:
+            heap.append(entry)
+
+            if k is not None and len(heap) == k:
+                heapq.heapify(heap)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    top_k = [candidate for _, _, candidate in sorted(heap, reverse=True)]
+
+    return top_k
+
+
+def iterate_by_decreasing_key(
+    candidates: Iterable[Hashable],
+    key: Callable[[Hashable], float],
+    threshold: float = None,
+) -> Iterator[Hashable]:
+    # Lazily yield the candidates with a score greater than or equal to the threshold, by decreasing score.
+    #
+    # NB: this is for callers which skip some candidates and stop early: the heap is built in linear time, and each
+    #     candidate which is actually consumed costs log N.
+
+    heap = []
+
+    for i, candidate in enumerate(candidates):
+        score = key(candidate)
+
+        if threshold is not None and score < threshold:
+            continue
+
+        heap.append((-score, i, candidate))
+
+    heapq.heapify(heap)
+
+    while heap:
+        _, _, candidate = heapq.heappop(heap)
+        yield candidate
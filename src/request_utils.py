@@ -0,0 +1,232 @@
+import threading
+import time
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+
+import requests
+
+# Objective: avoid spending the rate budget twice on the same data within one run.
+#
+# - Identical requests which are in flight at the same time are coalesced: only the first caller queries Steam,
+#   the other callers wait for its response.
+# - Successful responses are kept in memory for a short freshness window, so that repeats are served from memory.
+#   A freshness of 0 second bypasses the memory, e.g. for the latest market orders right before crafting and selling:
+#   only the requests which are in flight at the same time are then coalesced.
+
+_lock = threading.Lock()
+_in_flight_requests: dict[Hashable, Future] = {}
+_recent_responses: dict[Hashable, tuple[float, object]] = {}
+
+# The HTTP client can be swapped, e.g. for an offline stand-in of Steam. It must provide get() and post(), which return
+# objects with the same interface as requests.Response: status_code, ok, cookies and json().
+_http_client = requests
+
+
+def get_http_client() -> object:
+    return _http_client
+
+
+def set_http_client(http_client: object = None) -> object:
+    # Return the previous client, so that it can be restored. By default, the requests module is used.
+    global _http_client
+
+    if http_client is None:
+        http_client = requests
+
+    previous_http_client = _http_client
+    _http_client = http_client
+
+    return previous_http_client
+
+
+_thread_local_data = threading.local()
+
+
+def get_http_session() -> object:
+    # Objective: reuse connections across many requests to the same host, instead of opening a connection per request.
+    #
+    # NB: sessions are not thread-safe, hence one session per thread. A swapped client is returned as is.
+    if _http_client is not requests:
+        return _http_client
+
+    try:
+        session = _thread_local_data.session
+    except AttributeError:
+        session = requests.Session()
+        _thread_local_data.session = session
+
+    return session
+
+
+def get_default_freshness_in_seconds() -> int:
+    # Market orders may change at any time, so the window is short. It is long enough to cover one run of the workflow,
+    # e.g. the *slow* pass of market orders followed by the *quick* pass for a few detected arbitrages.
+    freshness_in_seconds = 60
+
+    return freshness_in_seconds
+
+
+def get_request_key(url: str, params: dict = None) -> tuple:
+    if params is None:
+        params = {}
+
+    # NB: cookies and headers are not part of the key, because they do not change the content of the response.
+    request_key = (url, tuple(sorted((str(k), str(v)) for k, v in params.items())))
+
+    return request_key
+
+
+def read_fresh_response(
+    request_key: Hashable,
+    freshness_in_seconds: float = None,
+) -> [object | None]:
+    if freshness_in_seconds is None:
+        freshness_in_seconds = get_default_freshness_in_seconds()
+
+    if freshness_in_seconds <= 0:
+        return None
+
+    with _lock:
+        try:
+            timestamp, response = _recent_responses[request_key]
+        except KeyError:
+            return None
+
+    if time.monotonic() - timestamp > freshness_in_seconds:
+        response = None
+
+    return response
+
+
+def is_fresh_in_memory(
+    url: str,
+    params: dict = None,
+    freshness_in_seconds: float = None,
+) -> bool:
+    request_key = get_request_key(url, params)
+
+    response = read_fresh_response(request_key, freshness_in_seconds)
+
+    return bool(response is not None)
+
+
+def coalesced_call(
+    request_key: Hashable,
+    fetch_function: Callable[[], object],
+    freshness_in_seconds: float = None,
+    is_worth_caching: Callable[[object], bool] = None,
+) -> object:
+    response = read_fresh_response(request_key, freshness_in_seconds)
+
+    if response is not None:
+        return response
+
+    with _lock:
+        try:
+            future = _in_flight_requests[request_key]
+            is_owner = False
+        except KeyError:
+            future = Future()
+            _in_flight_requests[request_key] = future
+            is_owner = True
+
+    if not is_owner:
+        # Another caller is already querying the same data: wait for its response instead of querying again.
+        return future.result()
+
+    try:
+        response = fetch_function()
+    except BaseException as e:
+        with _lock:
+            del _in_flight_requests[request_key]
+        future.set_exception(e)
+        raise
+
+    with _lock:
+        if is_worth_caching is None or is_worth_caching(response):
+            _recent_responses[request_key] = (time.monotonic(), response)
+        del _in_flight_requests[request_key]
+
+    future.set_result(response)
+
+    return response
+
+
+def coalesced_get(
+    url: str,
+    params: dict = None,
+    cookies: dict[str, str] = None,
+    headers: dict[str, str] = None,
+    freshness_in_seconds: float = None,
+) -> requests.Response:
+    request_key = get_request_key(url, params)
+
+    def fetch_function() -> requests.Response:
+        return get_http_client().get(url, params=params, cookies=cookies, headers=headers)
+
+    # Only successful responses are kept in memory, so that a rate-limited query can be tried again.
+    resp_data = coalesced_call(
+        request_key,
+        fetch_function,
+        freshness_in_seconds=freshness_in_seconds,
+        is_worth_caching=lambda r: bool(r.ok),
+    )
+
+    return resp_data
+
+
+def clear_recent_responses() -> None:
+    with _lock:
+        _recent_responses.clear()
+
+
+# Token buckets, one per endpoint, to rate-limit actions which are sent concurrently, e.g. booster pack creations.
+_token_buckets: dict[Hashable, dict[str, float]] = {}
+
+
+def acquire_rate_limit_token(
+    endpoint: Hashable,
+    num_requests_per_second: float,
+    burst_size: int = 1,
+    clock: Callable[[], float] = None,
+    sleep: Callable[[float], None] = None,
+) -> float:
+    # Objective: wait until a request to the endpoint is allowed by its token bucket. Return the waiting time.
+    #
+    # NB: the token is reserved while holding the lock, but the caller sleeps outside of the lock, so that callers for
+    #     other endpoints are never blocked. The balance may go negative: it is the queue of reserved tokens.
+
+    if clock is None:
+        clock = time.monotonic
+
+    if sleep is None:
+        sleep = time.sleep
+
+    with _lock:
+        now = clock()
+
+        try:
+            bucket = _token_buckets[endpoint]
+        except KeyError:
+            bucket = {"tokens": burst_size, "timestamp": now}
+            _token_buckets[endpoint] = bucket
+
+        bucket["tokens"] = min(
+            burst_size,
+            bucket["tokens"] + (now - bucket["timestamp"]) * num_requests_per_second,
+        )
+        bucket["timestamp"] = now
+
+        bucket["tokens"] -= 1
+
+        waiting_time_in_seconds = max(0, -bucket["tokens"] / num_requests_per_second)
+
+    if waiting_time_in_seconds > 0:
+        sleep(waiting_time_in_seconds)
+
+    return waiting_time_in_seconds
+
+
+def clear_token_buckets() -> None:
+    with _lock:
+        _token_buckets.clear()
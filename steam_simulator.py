@@ -0,0 +1,419 @@
+# Objective: run the create-then-sell workflow offline, against a local stand-in of Steam, in order to measure and tune
+#            the throughput of batch crafting without touching the live account.
+#
+# The stand-in implements the endpoints used by inventory_utils.py:
+# - ajaxcreatebooster, with a gem balance, a 24-hour cooldown per game, and random failures,
+# - sellitem, which moves an asset from the inventory to the market listings,
+# - the inventory, both the legacy endpoint and the paginated endpoint.
+#
+# Each request waits for a simulated latency. The clock and the sleep function can be replaced, e.g. to simulate
+# latency without actually waiting.
+
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http import HTTPStatus
+
+from creation_time_utils import get_crafting_cooldown_duration_in_seconds
+from inventory_utils import (
+    create_then_sell_booster_packs_for_batch,
+    get_rate_limits_for_actions,
+    get_steam_booster_pack_creation_url,
+    get_steam_inventory_pagination_url,
+    get_steam_inventory_url,
+    get_steam_market_sell_url,
+)
+from listing_catalogue import get_app_id
+from personal_info import set_cookie_override
+from src.request_utils import clear_token_buckets, set_http_client
+
+
+@dataclass(slots=True)
+class SimulatedResponse:
+    status_code: int
+    payload: [dict | None] = None
+    cookies: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < HTTPStatus.BAD_REQUEST
+
+    def json(self) -> [dict | None]:
+        return self.payload
+
+
+def get_simulated_profile_id() -> str:
+    simulated_profile_id = '76561190000000000'
+
+    return simulated_profile_id
+
+
+def get_simulated_cookie() -> dict[str, str]:
+    simulated_cookie = {
+        'steamLoginSecure': get_simulated_profile_id() + '%7C%7Csimulated',
+        'sessionid': 'simulated',
+    }
+
+    return simulated_cookie
+
+
+def get_default_latency_in_seconds() -> dict[str, float]:
+    latency_in_seconds = {
+        'create': 0.5,
+        'sell': 0.7,
+        'inventory': 1.5,
+    }
+
+    return latency_in_seconds
+
+
+def build_simulated_account(
+    gem_values: dict[str, int],
+    gem_balance: int = 100000,
+    failure_rate: float = 0.0,
+    latency_in_seconds: dict[str, float] = None,
+    seed: int = 0,
+) -> dict:
+    # gem_values: listing hash -> number of gems required to craft a booster pack of this game.
+
+    if latency_in_seconds is None:
+        latency_in_seconds = get_default_latency_in_seconds()
+
+    account = {
+        'listing_hashes': {
+            get_app_id(listing_hash): listing_hash
+            for listing_hash in gem_values
+        },
+        'gem_values': {
+            get_app_id(listing_hash): gem_values[listing_hash]
+            for listing_hash in gem_values
+        },
+        'gem_balance': gem_balance,
+        'next_creation_epochs': {},
+        # Inventory of booster packs: asset ID -> listing hash, from the oldest to the newest asset.
+        'inventory': {},
+        'market_listings': [],
+        'next_asset_id': 10**10,
+        'failure_rate': failure_rate,
+        'latency_in_seconds': latency_in_seconds,
+        'random_generator': random.Random(seed),
+        'num_requests': {'create': 0, 'sell': 0, 'inventory': 0},
+    }
+
+    return account
+
+
+class SimulatedSteamClient:
+    # Drop-in replacement for the requests module, cf. set_http_client().
+
+    def __init__(
+        self,
+        account: dict,
+        clock: Callable[[], float] = None,
+        sleep: Callable[[float], None] = None,
+    ) -> None:
+        if clock is None:
+            clock = time.time
+
+        if sleep is None:
+            sleep = time.sleep
+
+        self.account = account
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+
+    def get(self, url: str, params: dict = None, **kwargs) -> SimulatedResponse:
+        if params is None:
+            params = {}
+
+        self.wait_for_latency('inventory')
+
+        with self.lock:
+            if url.startswith(get_steam_inventory_pagination_url(get_simulated_profile_id())):
+                response = self.get_inventory_page(params)
+            elif url.startswith(get_steam_inventory_url(get_simulated_profile_id())):
+                response = self.get_legacy_inventory()
+            else:
+                response = SimulatedResponse(HTTPStatus.NOT_FOUND)
+
+        return response
+
+    def post(self, url: str, data: dict = None, **kwargs) -> SimulatedResponse:
+        if data is None:
+            data = {}
+
+        if url == get_steam_booster_pack_creation_url():
+            self.wait_for_latency('create')
+
+            with self.lock:
+                response = self.create_booster_pack(data)
+
+        elif url == get_steam_market_sell_url():
+            self.wait_for_latency('sell')
+
+            with self.lock:
+                response = self.sell_item(data)
+
+        else:
+            response = SimulatedResponse(HTTPStatus.NOT_FOUND)
+
+        return response
+
+    def wait_for_latency(self, endpoint: str) -> None:
+        with self.lock:
+            self.account['num_requests'][endpoint] += 1
+
+        self.sleep(self.account['latency_in_seconds'][endpoint])
+
+    def is_a_random_failure(self) -> bool:
+        return self.account['random_generator'].random() < self.account['failure_rate']
+
+    def create_booster_pack(self, data: dict) -> SimulatedResponse:
+        account = self.account
+        app_id = int(data['appid'])
+
+        try:
+            gem_value = account['gem_values'][app_id]
+        except KeyError:
+            return SimulatedResponse(HTTPStatus.BAD_REQUEST)
+
+        # NB: Steam returns 500 if a booster pack was created less than 24 hours ago.
+        if account['next_creation_epochs'].get(app_id, 0) > self.clock():
+            return SimulatedResponse(HTTPStatus.INTERNAL_SERVER_ERROR)
+
+        if account['gem_balance'] < gem_value:
+            return SimulatedResponse(HTTPStatus.BAD_REQUEST)
+
+        if self.is_a_random_failure():
+            return SimulatedResponse(HTTPStatus.BAD_GATEWAY)
+
+        asset_id = str(account['next_asset_id'])
+        account['next_asset_id'] += 1
+
+        account['gem_balance'] -= gem_value
+        account['next_creation_epochs'][app_id] = self.clock() + get_crafting_cooldown_duration_in_seconds()
+        account['inventory'][asset_id] = account['listing_hashes'][app_id]
+
+        result = {
+            'purchase_result': {
+                'communityitemid': asset_id,
+                'appid': app_id,
+                'item_type': 36,
+                'purchaseid': asset_id,
+                'success': 1,
+                'rwgrsn': -2,
+            },
+            'goo_amount': str(account['gem_balance']),
+            'tradable_goo_amount': str(account['gem_balance']),
+            'untradable_goo_amount': 0,
+        }
+
+        return SimulatedResponse(HTTPStatus.OK, result)
+
+    def sell_item(self, data: dict) -> SimulatedResponse:
+        account = self.account
+        asset_id = str(data['assetid'])
+
+        if asset_id not in account['inventory']:
+            return SimulatedResponse(HTTPStatus.BAD_GATEWAY)
+
+        if self.is_a_random_failure():
+            return SimulatedResponse(HTTPStatus.BAD_GATEWAY)
+
+        listing_hash = account['inventory'].pop(asset_id)
+        account['market_listings'].append(
+            {
+                'asset_id': asset_id,
+                'listing_hash': listing_hash,
+                'price': int(data['price']),
+            },
+        )
+
+        return SimulatedResponse(HTTPStatus.OK, {'success': True, 'requires_confirmation': 0})
+
+    def get_description(self, asset_id: str) -> dict:
+        listing_hash = self.account['inventory'][asset_id]
+
+        # NB: one class per game, which is enough to tell booster packs apart.
+        description = {
+            'appid': 753,
+            'classid': str(get_app_id(listing_hash)),
+            'instanceid': '0',
+            'market_hash_name': listing_hash,
+            'marketable': 1,
+            'type': 'Booster Pack',
+        }
+
+        return description
+
+    def get_inventory_page(self, params: dict) -> SimulatedResponse:
+        # The newest assets come first, as with Steam.
+        asset_ids = sorted(self.account['inventory'], key=int, reverse=True)
+
+        count = int(params.get('count', len(asset_ids)))
+
+        try:
+            start = asset_ids.index(params['start_assetid']) + 1
+        except (KeyError, ValueError):
+            start = 0
+
+        page_asset_ids = asset_ids[start:start + count]
+
+        assets = []
+        descriptions = {}
+
+        for asset_id in page_asset_ids:
+            description = self.get_description(asset_id)
+            descriptions[description['classid']] = description
+
+            assets.append(
+                {
+                    'appid': 753,
+                    'contextid': '6',
+                    'assetid': asset_id,
+                    'classid': description['classid'],
+                    'instanceid': description['instanceid'],
+                    'amount': '1',
+                },
+            )
+
+        inventory_page = {
+            'assets': assets,
+            'descriptions': list(descriptions.values()),
+            'total_inventory_count': len(asset_ids),
+            'success': 1,
+        }
+
+        if start + count < len(asset_ids):
+            inventory_page['more_items'] = 1
+            inventory_page['last_assetid'] = page_asset_ids[-1]
+
+        return SimulatedResponse(HTTPStatus.OK, inventory_page)
+
+    def get_legacy_inventory(self) -> SimulatedResponse:
+        rg_inventory = {}
+        rg_descriptions = {}
+
+        for pos, asset_id in enumerate(self.account['inventory'], start=1):
+            description = self.get_description(asset_id)
+            rg_descriptions[description['classid'] + '_' + description['instanceid']] = description
+
+            rg_inventory[asset_id] = {
+                'id': asset_id,
+                'classid': description['classid'],
+                'instanceid': description['instanceid'],
+                'amount': '1',
+                'pos': pos,
+            }
+
+        steam_inventory = {
+            'success': True,
+            'rgInventory': rg_inventory,
+            'rgDescriptions': rg_descriptions,
+        }
+
+        return SimulatedResponse(HTTPStatus.OK, steam_inventory)
+
+
+@contextmanager
+def use_simulated_steam(client: SimulatedSteamClient) -> Iterator[SimulatedSteamClient]:
+    # Route every request of the workflow to the stand-in, with a dummy cookie, then restore the live settings.
+    previous_http_client = set_http_client(client)
+    previous_cookie_override = set_cookie_override(get_simulated_cookie())
+    clear_token_buckets()
+
+    try:
+        yield client
+    finally:
+        set_http_client(previous_http_client)
+        set_cookie_override(previous_cookie_override)
+        clear_token_buckets()
+
+
+def simulate_create_then_sell(
+    price_dict_for_listing_hashes: dict[str, int],
+    account: dict,
+    max_num_in_flight_actions: int = None,
+    rate_limits: dict[str, float] = None,
+    clock: Callable[[], float] = None,
+    sleep: Callable[[float], None] = None,
+) -> dict:
+    client = SimulatedSteamClient(account, clock=clock, sleep=sleep)
+
+    start_time = time.perf_counter()
+
+    with use_simulated_steam(client):
+        creation_results, sale_results = create_then_sell_booster_packs_for_batch(
+            price_dict_for_listing_hashes,
+            profile_id=get_simulated_profile_id(),
+            max_num_in_flight_actions=max_num_in_flight_actions,
+            rate_limits=rate_limits,
+            save_next_creation_times=False,
+        )
+
+    elapsed_time_in_seconds = time.perf_counter() - start_time
+
+    report = {
+        'num_packs': len(price_dict_for_listing_hashes),
+        'num_created': sum(result is not None for result in creation_results.values()),
+        'num_listed': len(account['market_listings']),
+        'num_requests': dict(account['num_requests']),
+        'gem_balance': account['gem_balance'],
+        'elapsed_time_in_seconds': elapsed_time_in_seconds,
+    }
+
+    return report
+
+
+def main(
+    num_packs: int = 20,
+    failure_rate: float = 0.1,
+    latency_scale: float = 0.01,
+) -> bool:
+    gem_values = {f'{100000 + i}-Simulated Game {i} Booster Pack': 400 + i for i in range(num_packs)}
+    price_dict_for_listing_hashes = {listing_hash: 30 for listing_hash in gem_values}
+
+    # NB: time is scaled down, for both the latency and the rate limits, so that the simulation runs quickly.
+    latency_in_seconds = {
+        endpoint: latency_scale * latency
+        for endpoint, latency in get_default_latency_in_seconds().items()
+    }
+    rate_limits = {
+        endpoint: rate_limit / latency_scale
+        for endpoint, rate_limit in get_rate_limits_for_actions().items()
+    }
+
+    for max_num_in_flight_actions in [1, 3]:
+        account = build_simulated_account(
+            gem_values,
+            failure_rate=failure_rate,
+            latency_in_seconds=latency_in_seconds,
+        )
+
+        report = simulate_create_then_sell(
+            price_dict_for_listing_hashes,
+            account,
+            max_num_in_flight_actions=max_num_in_flight_actions,
+            rate_limits=rate_limits,
+        )
+
+        print(
+            '#in-flight actions = {} ; created: {}/{} ; listed: {} ; requests: {} ; elapsed: {:.2f}s'.format(
+                max_num_in_flight_actions,
+                report['num_created'],
+                report['num_packs'],
+                report['num_listed'],
+                report['num_requests'],
+                report['elapsed_time_in_seconds'],
+            ),
+        )
+
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,63 @@
+import datetime
+import itertools
+import math
+import sqlite3
+import tempfile
+import threading
+import time
 import unittest
+from contextlib import closing
+from pathlib import Path
 
+import arbitrage_engine
 import batch_create_packs
+import crafting_scheduler
 import creation_time_utils
 import drop_rate_estimates
+import inventory_utils
+import listing_catalogue
 import market_arbitrage
+import market_arbitrage_with_foil_cards
 import market_listing
 import market_order
+import market_records
 import market_search
+import market_store
 import market_utils
 import parsing_utils
+import personal_info
 import sack_of_gems
+import steam_simulator
 import transaction_fee
 import utils
+from src import json_utils, ranking_utils, request_utils
+
+
+class TestListingCatalogueMethods(unittest.TestCase):
+    def test_get_listing_record(self):
+        listing_record = listing_catalogue.get_listing_record('290970-1849 Booster Pack')
+
+        assert listing_record.app_id == 290970
+        assert listing_record.app_name == '1849'
+        assert listing_record.category_name == 'booster packs'
+
+        # Each listing hash is parsed once: the record is shared.
+        assert listing_catalogue.get_listing_record('290970-1849 Booster Pack') is listing_record
+
+        listing_record = listing_catalogue.get_listing_record('595770-"Frontline" Striker (Foil)')
+        assert listing_record.is_foil
+        assert listing_record.item_name == '"Frontline" Striker (Foil)'
+        assert listing_record.app_name is None
+
+    def test_get_markdown_compatible_market_url(self):
+        assert (
+            listing_catalogue.get_markdown_compatible_market_url('290970-1849 Booster Pack')
+            == 'https://steamcommunity.com/market/listings/753/290970-1849%20Booster%20Pack/'
+        )
+        assert (
+            listing_catalogue.get_markdown_compatible_market_url('595770-"Frontline" Striker (Foil)')
+            == 'https://steamcommunity.com/market/listings/753/595770-"Frontline"%20Striker%20%28Foil%29/'
+        )
 
 
 class TestMarketListingMethods(unittest.TestCase):
@@ -42,6 +88,51 @@ class TestCreationTimeUtilsMethods(unittest.TestCase):
     def test_main(self):
         assert creation_time_utils.main() is True
 
+    def test_convert_creation_time_to_epoch(self):
+        current_time = datetime.datetime(2023, 12, 31, 20, 0)
+
+        # The year is inferred: the day after Dec 31 is next year, a cooldown which ended long ago ended last year.
+        next_creation_epoch = creation_time_utils.convert_creation_time_to_epoch('01 Jan @ 10:48am', current_time)
+        assert next_creation_epoch == int(datetime.datetime(2024, 1, 1, 10, 48).timestamp())
+
+        next_creation_epoch = creation_time_utils.convert_creation_time_to_epoch('14 Sep @ 10:48pm', current_time)
+        assert next_creation_epoch < current_time.timestamp()
+
+        badge_data = {'next_creation_time': '01 Jan @ 10:48am', 'next_creation_epoch': next_creation_epoch}
+        assert creation_time_utils.determine_whether_a_booster_pack_can_be_crafted(badge_data, current_time) is True
+
+        badge_data = {'next_creation_time': '01 Jan @ 10:48am', 'next_creation_epoch': current_time.timestamp() + 60}
+        assert creation_time_utils.determine_whether_a_booster_pack_can_be_crafted(badge_data, current_time) is False
+
+    def test_load_next_creation_epochs(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            next_creation_time_file_name = str(Path(temporary_folder) / 'next_creation_times.json')
+
+            json_utils.save_json({'290970': '1 Jan @ 7:00pm'}, next_creation_time_file_name)
+            next_creation_epochs = creation_time_utils.load_next_creation_epochs(next_creation_time_file_name)
+
+            # The epoch is computed once, then stored next to the time from which it is derived.
+            assert market_store.query_next_creation_times_with_epochs(next_creation_time_file_name) == [
+                (290970, '1 Jan @ 7:00pm', next_creation_epochs[290970]),
+            ]
+
+            # If the .json file of times is modified, the epoch is computed again, instead of being stale.
+            json_utils.save_json({'290970': '12 Jan @ 7:00pm'}, next_creation_time_file_name)
+            updated_next_creation_epochs = creation_time_utils.load_next_creation_epochs(next_creation_time_file_name)
+
+            assert updated_next_creation_epochs[290970] - next_creation_epochs[290970] == 11 * 24 * 3600
+
+    def test_pop_craftable_app_ids(self):
+        next_creation_epochs = {290970: 300, 281160: 100, 612150: 200}
+        cooldown_queue = creation_time_utils.build_cooldown_queue(next_creation_epochs)
+
+        # The appID 612150 was crafted again: its previous entry in the queue is stale.
+        next_creation_epochs[612150] = 400
+        creation_time_utils.push_next_creation_epoch(cooldown_queue, 612150, 400)
+
+        assert creation_time_utils.pop_craftable_app_ids(cooldown_queue, next_creation_epochs, 300) == [281160, 290970]
+        assert creation_time_utils.get_soonest_creation_epoch(cooldown_queue, next_creation_epochs) == 400
+
 
 class TestSackOfGemsMethods(unittest.TestCase):
     def test_download_sack_of_gems_price(self):
@@ -60,12 +151,203 @@ class TestMarketSearchMethods(unittest.TestCase):
         assert market_search.download_all_listings() is True
 
 
+class TestMarketStoreMethods(unittest.TestCase):
+    def test_main(self):
+        assert market_store.main() is True
+
+    def test_query_listing_details(self):
+        listing_hash = '290970-1849 Booster Pack'
+
+        listing_details = market_store.query_listing_details(
+            utils.get_listing_details_output_file_name(),
+            listing_hashes=[listing_hash],
+        )
+
+        assert list(listing_details) == [listing_hash]
+
+    def test_save_to_market_store(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            store_file_name = str(Path(temporary_folder) / 'market_data.sqlite')
+            goo_details_file_name = str(Path(temporary_folder) / 'goo_details.json')
+            json_utils.save_json({'290970': 60}, goo_details_file_name)
+
+            revision = market_store.get_market_store_revision('goo_values', goo_details_file_name, store_file_name)
+            assert market_store.query_table('goo_values', goo_details_file_name, store_file_name=store_file_name) == [
+                (290970, 60),
+            ]
+
+            # Saves are written into the store directly: the .json file is left untouched, and not imported again.
+            market_store.save_to_market_store('goo_values', goo_details_file_name, {290970: 80}, store_file_name)
+            assert json_utils.load_json(goo_details_file_name) == {'290970': 60}
+            assert market_store.query_table('goo_values', goo_details_file_name, store_file_name=store_file_name) == [
+                (290970, 80),
+            ]
+            assert market_store.get_market_store_revision(
+                'goo_values',
+                goo_details_file_name,
+                store_file_name,
+            ) != revision
+
+            # An appID keyed both by str and int is stored once.
+            market_store.save_to_market_store('goo_values', goo_details_file_name, {'290970': 5, 290970: 6}, store_file_name)
+            assert market_store.query_table('goo_values', goo_details_file_name, store_file_name=store_file_name) == [
+                (290970, 6),
+            ]
+
+            # Data which was never imported from a .json file is available as well.
+            listing_output_file_name = str(Path(temporary_folder) / 'listings.json')
+            assert not market_store.is_in_market_store('listings', listing_output_file_name, store_file_name)
+
+            market_store.save_to_market_store(
+                'listings',
+                listing_output_file_name,
+                {'290970-1849 Booster Pack': {'sell_listings': 1, 'sell_price': 28, 'sell_price_text': '0,28€'}},
+                store_file_name,
+            )
+            assert market_store.is_in_market_store('listings', listing_output_file_name, store_file_name)
+
+            # A .json file which is modified outside of this program is imported again.
+            json_utils.save_json({'290970': 100, '612150': 40}, goo_details_file_name)
+            assert market_store.query_table('goo_values', goo_details_file_name, store_file_name=store_file_name) == [
+                (290970, 100),
+                (612150, 40),
+            ]
+
+    def test_migrate_market_store(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            store_file_name = str(Path(temporary_folder) / 'market_data.sqlite')
+            goo_details_file_name = str(Path(temporary_folder) / 'goo_details.json')
+
+            # A store with the previous schema, which holds data saved after the import of the .json files.
+            with closing(sqlite3.connect(store_file_name)) as connection, connection:
+                connection.execute(
+                    'CREATE TABLE imported_files ('
+                    ' file_name TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, file_size INTEGER NOT NULL)',
+                )
+                connection.execute(
+                    'CREATE TABLE goo_values ('
+                    ' file_name TEXT NOT NULL, app_id INTEGER NOT NULL, goo_value INTEGER,'
+                    ' PRIMARY KEY (file_name, app_id))',
+                )
+                connection.execute(
+                    'INSERT INTO imported_files VALUES (?, ?, ?)',
+                    (market_store.get_file_key(goo_details_file_name), 1, 1),
+                )
+                connection.execute(
+                    'INSERT INTO goo_values VALUES (?, ?, ?)',
+                    (market_store.get_file_key(goo_details_file_name), 290970, 60),
+                )
+                connection.execute('PRAGMA user_version = 2')
+
+            # The data is kept when the schema changes.
+            assert market_store.query_table('goo_values', goo_details_file_name, store_file_name=store_file_name) == [
+                (290970, 60),
+            ]
+            assert market_store.get_market_store_revision('goo_values', goo_details_file_name, store_file_name) == 0
+
+    def test_migrate_market_orders_to_cents(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            store_file_name = str(Path(temporary_folder) / 'market_data.sqlite')
+            market_order_output_file_name = str(Path(temporary_folder) / 'market_orders.json')
+
+            # A store with the previous schema, in which the prices of market orders are stored in euros.
+            with closing(sqlite3.connect(store_file_name)) as connection, connection:
+                connection.execute(
+                    'CREATE TABLE imported_files ('
+                    ' file_name TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, file_size INTEGER NOT NULL)',
+                )
+                connection.execute(
+                    'CREATE TABLE market_orders ('
+                    ' file_name TEXT NOT NULL, listing_hash TEXT NOT NULL,'
+                    ' bid REAL, ask REAL, bid_volume INTEGER, ask_volume INTEGER, is_marketable INTEGER,'
+                    ' buy_order_ladder TEXT, PRIMARY KEY (file_name, listing_hash))',
+                )
+                connection.execute(
+                    'INSERT INTO imported_files VALUES (?, ?, ?)',
+                    (market_store.get_file_key(market_order_output_file_name), 1, 1),
+                )
+                connection.execute(
+                    'INSERT INTO market_orders VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (market_store.get_file_key(market_order_output_file_name), 'a', 0.19, -1, 2, 0, 1, '[[0.8, 1]]'),
+                )
+                connection.execute('PRAGMA user_version = 4')
+
+            assert market_store.query_table(
+                'market_orders',
+                market_order_output_file_name,
+                store_file_name=store_file_name,
+            ) == [('a', 19, -1, 2, 0, 1, '[[80, 1]]')]
+
+            # The .json files keep the prices in euros, as downloaded from Steam, even for prices in whole euros.
+            json_utils.save_json(
+                {'b': {'bid': 1, 'ask': 1.15, 'bid_volume': 3, 'ask_volume': 5, 'is_marketable': True}},
+                market_order_output_file_name,
+            )
+            assert market_store.query_table(
+                'market_orders',
+                market_order_output_file_name,
+                store_file_name=store_file_name,
+            ) == [('b', 100, 115, 3, 5, 1, None)]
+
+
+class TestMarketRecordsMethods(unittest.TestCase):
+    def test_main(self):
+        assert market_records.main() is True
+
+    def test_convert_listing_details(self):
+        all_listing_details = {
+            '290970-1849 Booster Pack': {'item_nameid': 28419077, 'is_marketable': True},
+            '595770-"Frontline" Striker (Foil)': {
+                'item_nameid': 175995414,
+                'is_marketable': True,
+                'item_type_no': None,
+            },
+        }
+
+        records = market_records.convert_dicts_to_records(
+            all_listing_details,
+            market_records.convert_dict_to_listing_details,
+        )
+        assert records['290970-1849 Booster Pack'].item_nameid == 28419077
+
+        # A missing item type is different from a null item type.
+        assert (
+            market_records.convert_records_to_dicts(
+                records,
+                market_records.convert_listing_details_to_dict,
+            )
+            == all_listing_details
+        )
+
+
 class TestMarketUtilsMethods(unittest.TestCase):
     def test_load_aggregated_badge_data(self):
         aggregated_badge_data = market_utils.load_aggregated_badge_data()
 
         assert len(aggregated_badge_data) > 0
 
+    def test_aggregate_badge_data(self):
+        badge_creation_details = {
+            290970: {'name': '1849', 'gem_value': 400, 'next_creation_time': None},
+            612150: {'name': 'Conran - The dinky Raccoon', 'gem_value': 600, 'next_creation_time': None},
+        }
+        badge_matches = {290970: '290970-1849 Booster Pack', 612150: None}
+        all_listings = {
+            '290970-1849 Booster Pack': market_records.Listing(60, 51, '0,51€'),
+        }
+
+        aggregated_badge_data = market_utils.aggregate_badge_data(
+            badge_creation_details,
+            badge_matches,
+            all_listings=all_listings,
+            enforced_sack_of_gems_price=0.3,
+        )
+
+        # The badge without any listing of a booster pack is skipped.
+        assert list(aggregated_badge_data) == [290970]
+        assert aggregated_badge_data[290970]['sell_price'] == 51
+        assert aggregated_badge_data[290970]['gem_price'] == 12
+
 
 class TestMarketArbitrageMethods(unittest.TestCase):
     def test_apply_workflow(self):
@@ -80,6 +362,56 @@ class TestMarketArbitrageMethods(unittest.TestCase):
 
         assert flag is True
 
+    def test_apply_sweep_workflow(self):
+        sweep = market_arbitrage.apply_sweep_workflow(
+            retrieve_listings_from_scratch=False,
+            retrieve_market_orders_online=False,
+            sack_of_gems_prices=[0.2, 0.3],
+            verbose=False,
+        )
+
+        # A more expensive sack of gems cannot make more packs profitable.
+        assert list(sweep['sack_of_gems_price']) == [20, 30]
+        assert sweep['num_profitable_packs'][0] >= sweep['num_profitable_packs'][1]
+        assert sweep['total_profit'][0] >= sweep['total_profit'][1]
+
+    def test_convert_arbitrages_for_batch_create_then_sell(self):
+        arbitrage = {
+            'is_marketable': True,
+            'gem_amount': 400,
+            'gem_price_including_fee': 30,
+            'bid_including_fee': 80,
+            'bid_without_fee': 70,
+            'bid_volume': 1,
+            'profit': 40,
+            # Buy orders: 1 pack at 0.80€, 2 more packs at 0.50€, 7 more packs at 0.20€.
+            'buy_order_ladder': [[80, 1], [50, 3], [20, 10]],
+            'optimal_quantity': 3,
+            'optimal_profit': 42,
+            'optimal_price': 44,
+        }
+        badge_arbitrages = {
+            '290970-1849 Booster Pack': arbitrage,
+            '612150-Conran Booster Pack': {**arbitrage, 'buy_order_ladder': [[30, 5]]},
+        }
+
+        market_arbitrage.print_arbitrages(badge_arbitrages)
+
+        # One pack per listing hash: the pack is sold to the highest buy order, without fee.
+        price_dict_for_listing_hashes = market_arbitrage.convert_arbitrages_for_batch_create_then_sell(
+            badge_arbitrages,
+            verbose=False,
+        )
+        assert price_dict_for_listing_hashes == {'290970-1849 Booster Pack': 70}
+
+        # Several packs per listing hash: the price is lowered along the buy orders, as long as it is profitable.
+        price_dict_for_listing_hashes = market_arbitrage.convert_arbitrages_for_batch_create_then_sell(
+            badge_arbitrages,
+            num_packs_per_listing_hash=5,
+            verbose=False,
+        )
+        assert price_dict_for_listing_hashes == {'290970-1849 Booster Pack': 44}
+
 
 class TestMarketOrderMethods(unittest.TestCase):
     def test_main(self):
@@ -91,6 +423,14 @@ class TestMarketOrderMethods(unittest.TestCase):
 
         assert flag is True
 
+    def test_parse_buy_order_ladder(self):
+        buy_order_graph = [[0.8, 1, '1 buy request at 0,80€'], [0.5, 3, '3 buy requests at 0,50€ or higher']]
+
+        # The prices are converted from euros to cents.
+        assert market_order.parse_buy_order_ladder(buy_order_graph) == [[80, 1], [50, 3]]
+        assert market_order.parse_buy_order_ladder(buy_order_graph, max_depth=1) == [[80, 1]]
+        assert market_order.parse_buy_order_ladder([]) == []
+
 
 class TestUtilsMethods(unittest.TestCase):
     def test_main(self):
@@ -101,6 +441,581 @@ class TestTransactionFeeMethods(unittest.TestCase):
     def test_main(self):
         assert transaction_fee.main() is True
 
+    def test_compute_sell_prices_without_fee(self):
+        sell_prices_including_fee = [i / 100 for i in range(-1, 300)]
+
+        sell_prices_without_fee = transaction_fee.compute_sell_prices_without_fee(
+            sell_prices_including_fee,
+        )
+
+        for price, price_without_fee in zip(sell_prices_including_fee, sell_prices_without_fee):
+            assert price_without_fee == transaction_fee.compute_sell_price_without_fee(price)
+
+    def test_compute_seller_price_in_cents(self):
+        # Reference: https://steamcommunity.com/discussions/forum/1/1679190184065722423/
+        assert transaction_fee.compute_seller_price_in_cents(21) == 19
+        assert transaction_fee.compute_seller_price_in_cents(44) == 39
+        assert transaction_fee.compute_seller_price_in_cents(115) == 100
+
+        for seller_price_in_cents in range(1, 10000):
+            buyer_price_in_cents = transaction_fee.compute_buyer_price_in_cents(seller_price_in_cents)
+            assert transaction_fee.compute_seller_price_in_cents(buyer_price_in_cents) == seller_price_in_cents
+
+
+class TestArbitrageEngineMethods(unittest.TestCase):
+    def test_compute_arbitrage_mask(self):
+        badge_data = {
+            290970: {'listing_hash': '290970-1849 Booster Pack', 'sell_price': 51, 'gem_price': 12},
+            281160: {'listing_hash': '281160-Ultimate Chicken Horse Booster Pack', 'sell_price': 90, 'gem_price': 30},
+            612150: {'listing_hash': '612150-Conran Booster Pack', 'sell_price': 50, 'gem_price': 20},
+        }
+        market_order_dict = {
+            '290970-1849 Booster Pack': {'bid': 19, 'ask': 51, 'bid_volume': 2, 'ask_volume': 4},
+            '281160-Ultimate Chicken Horse Booster Pack': {'bid': 80, 'ask': 90, 'bid_volume': 1, 'ask_volume': 7},
+        }
+
+        badge_arrays = arbitrage_engine.build_badge_arrays(badge_data, market_order_dict)
+        scores = arbitrage_engine.compute_arbitrage_mask(badge_arrays)
+
+        # Ranked by decreasing profit. The pack without market orders is ignored.
+        assert list(scores['ranking']) == [1, 0]
+        assert list(scores['delta'][:2]) == [17 - 12, 70 - 30]
+        assert bool(scores['is_an_arbitrage'][2]) is False
+
+    def test_update_arbitrage_state(self):
+        badge_data = {
+            290970: {'listing_hash': '290970-1849 Booster Pack', 'sell_price': 51, 'gem_amount': 400},
+            281160: {'listing_hash': '281160-Ultimate Chicken Horse Booster Pack', 'sell_price': 90, 'gem_amount': 1000},
+        }
+        market_order_dict = {
+            '290970-1849 Booster Pack': {'bid': 19, 'ask': 51, 'bid_volume': 2, 'ask_volume': 4},
+            '281160-Ultimate Chicken Horse Booster Pack': {'bid': 80, 'ask': 90, 'bid_volume': 1, 'ask_volume': 7},
+        }
+
+        # Bids without fee: 17 and 70 cents. Break-even prices of a sack of 1000 gems: 40 and 69 cents.
+        state = arbitrage_engine.build_arbitrage_state(badge_data, market_order_dict, 30)
+        assert list(state['break_even_sack_price']) == [40, 69]
+        assert arbitrage_engine.rank_arbitrages(state) == [
+            ('281160-Ultimate Chicken Horse Booster Pack', 40),
+            ('290970-1849 Booster Pack', 5),
+        ]
+
+        crossing_positions = arbitrage_engine.update_arbitrage_state(state, 41)
+        assert list(crossing_positions) == [0]
+        assert arbitrage_engine.rank_arbitrages(state) == [('281160-Ultimate Chicken Horse Booster Pack', 29)]
+
+        sweep = arbitrage_engine.sweep_sack_of_gems_prices(state, [30, 41, 70])
+        assert list(sweep['num_profitable_packs']) == [2, 1, 0]
+        assert list(sweep['num_gems_required']) == [1400, 1000, 0]
+        assert list(sweep['total_profit']) == [45, 29, 0]
+
+        # A new buy order at 80 cents: the break-even price of the first pack rises to 172 cents.
+        latest_market_order_dict = {
+            '290970-1849 Booster Pack': {'bid': 80, 'ask': 90, 'bid_volume': 1, 'ask_volume': 4},
+        }
+        updated_positions = arbitrage_engine.update_market_orders_in_arbitrage_state(state, latest_market_order_dict)
+        assert list(updated_positions) == [0]
+        assert list(state['break_even_order']) == [1, 0]
+        assert list(state['sorted_break_even_sack_price']) == [69, 172]
+        assert arbitrage_engine.rank_arbitrages(state) == [
+            ('290970-1849 Booster Pack', 53),
+            ('281160-Ultimate Chicken Horse Booster Pack', 29),
+        ]
+
+    def test_sweep_sack_of_gems_prices(self):
+        num_gems_per_sack_of_gems = 1000
+        gem_amounts = [0, 100, 300, 400, 625, 1000, 1200]
+        bids = [-1, 3, 10, 19, 55, 80, 115]  # in cents
+
+        badge_data = {}
+        market_order_dict = {}
+        for app_id, (gem_amount, bid) in enumerate(itertools.product(gem_amounts, bids)):
+            listing_hash = f'{app_id}-Booster Pack'
+            badge_data[app_id] = {'listing_hash': listing_hash, 'sell_price': 200, 'gem_amount': gem_amount}
+            market_order_dict[listing_hash] = {'bid': bid, 'ask': 200, 'bid_volume': 1, 'ask_volume': 1}
+
+        sack_prices = list(range(0, 150, 7))
+
+        state = arbitrage_engine.build_arbitrage_state(
+            badge_data,
+            market_order_dict,
+            sack_prices[0],
+            num_gems_per_sack_of_gems=num_gems_per_sack_of_gems,
+        )
+        sweep = arbitrage_engine.sweep_sack_of_gems_prices(state, sack_prices)
+
+        def is_profitable(gem_amount, bid_without_fee, sack_price):
+            gem_price = math.ceil(gem_amount * sack_price / num_gems_per_sack_of_gems)
+            return gem_amount > 0 and bid_without_fee >= 0 and gem_price < bid_without_fee
+
+        # The break-even price of a sack of gems is the highest price for which crafting the pack is profitable.
+        for i, (gem_amount, bid_without_fee) in enumerate(zip(state['gem_amount'], state['bid_without_fee'])):
+            profitable_sack_prices = [p for p in range(2000) if is_profitable(gem_amount, bid_without_fee, p)]
+            expected_break_even = max(profitable_sack_prices, default=-1)
+            assert state['break_even_sack_price'][i] == expected_break_even
+
+        for k, sack_price in enumerate(sack_prices):
+            num_gems_required = 0
+            total_profit = 0
+            for gem_amount, bid_without_fee in zip(state['gem_amount'], state['bid_without_fee']):
+                if is_profitable(gem_amount, bid_without_fee, sack_price):
+                    num_gems_required += gem_amount
+                    total_profit += bid_without_fee - math.ceil(gem_amount * sack_price / num_gems_per_sack_of_gems)
+
+            assert sweep['num_sacks_required'][k] == math.ceil(num_gems_required / num_gems_per_sack_of_gems)
+            assert sweep['total_profit'][k] == total_profit
+
+    def test_compute_depth_aware_profits(self):
+        # Buy orders: 1 pack at 0.80€, 2 more packs at 0.50€, 7 more packs at 0.20€.
+        buy_order_ladder = [[80, 1], [50, 3], [20, 10]]
+
+        # Without fee: 70, 44 and 18 cents, for a gem price of 30 cents.
+        depth_aware_profits = arbitrage_engine.compute_depth_aware_profits(buy_order_ladder, 30)
+        assert list(depth_aware_profits['marginal_profit'][:4]) == [40, 14, 14, -12]
+        # Every pack is listed at the price of the last pack to sell: 3 packs at 44 cents earn 3 * (44 - 30) cents.
+        assert list(depth_aware_profits['total_profit'][:4]) == [40, 28, 42, -48]
+        assert depth_aware_profits['optimal_quantity'] == 3
+        assert depth_aware_profits['optimal_profit'] == 42
+        assert depth_aware_profits['optimal_price'] == 44
+        assert depth_aware_profits['optimal_buyer_price'] == 50
+
+        # With a higher gem price, it is more profitable to only sell to the highest buy order.
+        depth_aware_profits = arbitrage_engine.compute_depth_aware_profits(buy_order_ladder, 40)
+        assert depth_aware_profits['optimal_quantity'] == 1
+        assert depth_aware_profits['optimal_profit'] == 30
+        assert depth_aware_profits['optimal_price'] == 70
+
+        depth_aware_profits = arbitrage_engine.compute_depth_aware_profits([], 30)
+        assert depth_aware_profits['optimal_quantity'] == 0
+
+    def test_score_foil_cards(self):
+        all_listings = {
+            '232770-Card 1 (Foil)': {'sell_price': 30, 'sell_listings': 5},
+            '232770-Card 2 (Foil)': {'sell_price': 50, 'sell_listings': 1},
+            '595770-"Frontline" Striker (Foil)': {'sell_price': 20, 'sell_listings': 3},
+            '730-Card (Foil)': {'sell_price': 10, 'sell_listings': 3},
+        }
+        foil_card_arrays = arbitrage_engine.build_foil_card_arrays(
+            list(all_listings),
+            all_listings,
+            {'232770': 400, '595770': 100, '730': 1000},
+            app_ids_with_unreliable_goo_details=[730],
+        )
+
+        scores = arbitrage_engine.score_foil_cards(foil_card_arrays, [50, 100], num_gems_per_sack_of_gems=1000)
+
+        # The goo value is 20 cents, then 40 cents, for appID 232770, and 5 cents, then 10 cents, for appID 595770.
+        assert scores['is_an_arbitrage'].tolist() == [[False, False, False, False], [True, False, False, False]]
+        assert scores['app_id'].tolist() == [730, 232770, 595770]
+        assert scores['best_profit_per_app_id'][:, 1:].tolist() == [[-10, -15], [10, -10]]
+
+
+class TestInventoryUtilsMethods(unittest.TestCase):
+    def test_create_then_sell_booster_packs_for_batch_with_connection_errors(self):
+        class UnreliableSteamClient(steam_simulator.SimulatedSteamClient):
+            def create_booster_pack(self, data):
+                if str(data['appid']) == '612150':
+                    raise ConnectionError()
+                return super().create_booster_pack(data)
+
+            def sell_item(self, data):
+                raise ConnectionError()
+
+        account = steam_simulator.build_simulated_account(
+            {'290970-1849 Booster Pack': 400, '612150-Conran Booster Pack': 400},
+            gem_balance=1000,
+        )
+
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            next_creation_time_file_name = str(Path(temporary_folder) / 'next_creation_times.json')
+
+            with steam_simulator.use_simulated_steam(UnreliableSteamClient(account, sleep=lambda x: None)):
+                with self.assertRaises(ConnectionError):
+                    inventory_utils.create_then_sell_booster_packs_for_batch(
+                        {'290970-1849 Booster Pack': 30, '612150-Conran Booster Pack': 30},
+                        rate_limits={'create': 1000, 'sell': 1000},
+                        next_creation_time_file_name=next_creation_time_file_name,
+                    )
+
+            # The sale failed, but the booster pack was created: its next creation time is saved.
+            assert list(creation_time_utils.load_next_creation_time_data(next_creation_time_file_name)) == [290970]
+
+    def test_update_and_save_next_creation_times(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            next_creation_time_file_name = str(Path(temporary_folder) / 'next_creation_times.json')
+            json_utils.save_json({'612150': '1 Jan @ 7:00pm'}, next_creation_time_file_name)
+
+            next_creation_times = inventory_utils.update_and_save_next_creation_times(
+                {'290970-1849 Booster Pack': {'goo_amount': 400}},
+                verbose=False,
+                next_creation_time_file_name=next_creation_time_file_name,
+            )
+            assert sorted(next_creation_times) == [290970, 612150]
+
+            # The exact epoch of the booster pack which was just created is saved next to its time. The other epochs
+            # are computed when loaded.
+            rows = market_store.query_next_creation_times_with_epochs(next_creation_time_file_name)
+            assert [(app_id, next_creation_epoch is None) for app_id, _, next_creation_epoch in rows] == [
+                (290970, False),
+                (612150, True),
+            ]
+            assert sorted(creation_time_utils.load_next_creation_epochs(next_creation_time_file_name)) == [
+                290970,
+                612150,
+            ]
+
+    def test_retrieve_asset_id(self):
+        listing_hash = '290970-1849 Booster Pack'
+        steam_inventory = {
+            'rgDescriptions': {
+                '1_0': {'market_hash_name': listing_hash, 'classid': '1', 'instanceid': '0', 'marketable': 0},
+                '2_0': {'market_hash_name': listing_hash, 'classid': '2', 'instanceid': '0', 'marketable': 1},
+            },
+            'rgInventory': {
+                '11': {'id': '11', 'classid': '1', 'instanceid': '0'},
+                '21': {'id': '21', 'classid': '2', 'instanceid': '0'},
+                '22': {'id': '22', 'classid': '2', 'instanceid': '0'},
+            },
+        }
+
+        inventory_index = inventory_utils.build_inventory_index(steam_inventory)
+
+        # Marketable items first, and an asset is never picked twice within a batch.
+        asset_ids = [
+            inventory_utils.retrieve_asset_id(listing_hash, inventory_index=inventory_index, verbose=False)
+            for _ in range(4)
+        ]
+        assert asset_ids == ['21', '22', '11', None]
+
+    def test_get_asset_id_from_creation_result(self):
+        result = {
+            'purchase_result': {'communityitemid': '27000000000', 'appid': 685400, 'item_type': 36, 'success': 1},
+            'goo_amount': '22793',
+        }
+
+        assert inventory_utils.get_asset_id_from_creation_result(result) == '27000000000'
+        assert inventory_utils.get_asset_id_from_creation_result(None) is None
+
+    def test_download_steam_inventory_index(self):
+        inventory_pages = {
+            None: {
+                'assets': [{'assetid': '21', 'classid': '2', 'instanceid': '0'}],
+                'descriptions': [
+                    {'market_hash_name': '290970-1849 Booster Pack', 'classid': '2', 'instanceid': '0', 'marketable': 1},
+                ],
+                'more_items': 1,
+                'last_assetid': '21',
+            },
+            '21': {
+                'assets': [{'assetid': '31', 'classid': '3', 'instanceid': '0'}],
+                'descriptions': [
+                    {'market_hash_name': '612150-Conran Booster Pack', 'classid': '3', 'instanceid': '0', 'marketable': 1},
+                ],
+            },
+        }
+        downloaded_pages = []
+
+        def page_loader(profile_id, start_assetid, count):
+            downloaded_pages.append(start_assetid)
+            return inventory_pages[start_assetid]
+
+        # Stop as soon as every listing hash of interest is found.
+        inventory_index = inventory_utils.download_steam_inventory_index(
+            listing_hashes=['290970-1849 Booster Pack'],
+            page_loader=page_loader,
+            verbose=False,
+        )
+        assert downloaded_pages == [None]
+        assert inventory_utils.retrieve_asset_id('290970-1849 Booster Pack', inventory_index=inventory_index) == '21'
+
+        inventory_index = inventory_utils.download_steam_inventory_index(page_loader=page_loader)
+        assert downloaded_pages == [None, None, '21']
+        assert len(inventory_index['asset_ids']) == 2
+
+
+class TestCraftingSchedulerMethods(unittest.TestCase):
+    def test_run_crafting_scheduler(self):
+        badge_data = {
+            290970: {
+                'listing_hash': '290970-1849 Booster Pack',
+                'sell_price': 51,
+                'gem_amount': 400,
+                'gem_price': 100,
+                'next_creation_epoch': 1000,
+            },
+            281160: {
+                'listing_hash': '281160-Ultimate Chicken Horse Booster Pack',
+                'sell_price': 90,
+                'gem_amount': 8000,
+                'gem_price': 80,
+                'next_creation_epoch': 500,
+            },
+        }
+        market_order_dict = {
+            '290970-1849 Booster Pack': {'bid': 19, 'ask': 51, 'bid_volume': 2, 'ask_volume': 4},
+            '281160-Ultimate Chicken Horse Booster Pack': {'bid': 80, 'ask': 90, 'bid_volume': 1, 'ask_volume': 7},
+        }
+        for listing_hash in market_order_dict:
+            market_order_dict[listing_hash]['is_marketable'] = True
+
+        clock = [0]
+        refreshed_app_ids = []
+
+        def market_order_loader(selected_badge_data):
+            refreshed_app_ids.append(list(selected_badge_data))
+            return market_order_dict
+
+        def sleep(delay_in_seconds):
+            clock[0] += delay_in_seconds
+
+        sack_of_gems_prices = [0.30, 0.25]  # in euros, downloaded at each wake-up
+
+        crafting_log = crafting_scheduler.run_crafting_scheduler(
+            badge_data,
+            max_num_wake_ups=2,
+            market_order_loader=market_order_loader,
+            sack_of_gems_price_loader=lambda: sack_of_gems_prices.pop(0),
+            market_order_dict={},
+            get_epoch=lambda: clock[0],
+            sleep=sleep,
+            verbose=False,
+        )
+
+        # Wake up when each cooldown ends, and only refresh the order book of that booster pack.
+        assert refreshed_app_ids == [[281160], [290970]]
+        assert crafting_log == {500: [], 1000: [290970]}
+
+        # The gem price is computed with the price of a sack of gems at the wake-up, instead of the stale gem price.
+        assert badge_data[290970]['gem_price'] == 10
+        assert badge_data[281160]['gem_price'] == 240
+
+
+class TestSteamSimulatorMethods(unittest.TestCase):
+    def test_main(self):
+        assert steam_simulator.main(num_packs=5, latency_scale=0.001) is True
+
+    def test_simulate_create_then_sell(self):
+        price_dict_for_listing_hashes = {'290970-1849 Booster Pack': 19, '612150-Conran Booster Pack': 20}
+        account = steam_simulator.build_simulated_account(
+            {'290970-1849 Booster Pack': 400, '612150-Conran Booster Pack': 1000},
+            gem_balance=1000,
+        )
+
+        report = steam_simulator.simulate_create_then_sell(
+            price_dict_for_listing_hashes,
+            account,
+            rate_limits={'create': 1000, 'sell': 1000},
+            sleep=lambda x: None,
+        )
+
+        # Not enough gems for both packs.
+        assert report['num_created'] == 1
+        assert report['num_listed'] == 1
+        assert report['gem_balance'] in [0, 600]
+
+        # The cooldown of 24 hours applies.
+        report = steam_simulator.simulate_create_then_sell(
+            price_dict_for_listing_hashes,
+            account,
+            rate_limits={'create': 1000, 'sell': 1000},
+            sleep=lambda x: None,
+        )
+        assert report['num_listed'] == 1
+
+
+class TestMarketArbitrageWithFoilCardsMethods(unittest.TestCase):
+    def test_download_goo_values_for_batch(self):
+        queried_app_ids = []
+
+        class GooValueClient:
+            def get(self, url, params=None, cookies=None):
+                queried_app_ids.append(params['appid'])
+                if params['appid'] == '570' and queried_app_ids.count('570') == 1:
+                    raise ConnectionError()
+                return steam_simulator.SimulatedResponse(200, {'goo_value': str(params['item_type'] * 10)})
+
+        previous_http_client = request_utils.set_http_client(GooValueClient())
+        previous_cookie_override = personal_info.set_cookie_override({})
+
+        try:
+            with tempfile.TemporaryDirectory() as temporary_folder:
+                goo_details_file_name = str(Path(temporary_folder) / 'goo_details.json')
+                goo_value_cache_file_name = str(Path(temporary_folder) / 'goo_value_cache.json')
+                item_types = {440: 2, 570: 3, 730: 1}
+
+                # The run is interrupted, but the goo values which were downloaded are saved to disk.
+                with self.assertRaises(ConnectionError):
+                    market_arbitrage_with_foil_cards.download_goo_values_for_batch(
+                        item_types,
+                        {},
+                        goo_details_file_name=goo_details_file_name,
+                        max_num_workers=1,
+                        rate_limit=1000,
+                        goo_value_cache_file_name=goo_value_cache_file_name,
+                        verbose=False,
+                    )
+
+                all_goo_details = market_arbitrage_with_foil_cards.load_all_goo_details(
+                    goo_details_file_name,
+                    verbose=False,
+                )
+                assert all_goo_details['440'] == 20
+                assert '570' not in all_goo_details
+
+                # The next run resumes where the previous run stopped.
+                all_goo_details = market_arbitrage_with_foil_cards.download_goo_values_for_batch(
+                    {app_id: item_types[app_id] for app_id in item_types if str(app_id) not in all_goo_details},
+                    all_goo_details,
+                    goo_details_file_name=goo_details_file_name,
+                    num_queries_between_save=1,
+                    rate_limit=1000,
+                    goo_value_cache_file_name=goo_value_cache_file_name,
+                    verbose=False,
+                )
+                assert all_goo_details == {'440': 20, '570': 30, '730': 10}
+
+                # Goo values are cached by appID, item type and border color, so that they are never queried again.
+                all_goo_details = market_arbitrage_with_foil_cards.download_goo_values_for_batch(
+                    item_types,
+                    {},
+                    goo_details_file_name=goo_details_file_name,
+                    goo_value_cache_file_name=goo_value_cache_file_name,
+                    verbose=False,
+                )
+                assert all_goo_details == {'440': 20, '570': 30, '730': 10}
+
+                # A goo value queried again, with another item type, replaces the goo value loaded from disk.
+                all_goo_details = market_arbitrage_with_foil_cards.download_goo_values_for_batch(
+                    {440: 5},
+                    market_arbitrage_with_foil_cards.load_all_goo_details(goo_details_file_name, verbose=False),
+                    goo_details_file_name=goo_details_file_name,
+                    goo_value_cache_file_name=goo_value_cache_file_name,
+                    verbose=False,
+                )
+                assert all_goo_details == {'440': 50, '570': 30, '730': 10}
+                assert market_arbitrage_with_foil_cards.load_all_goo_details(goo_details_file_name, verbose=False) == {
+                    '440': 50,
+                    '570': 30,
+                    '730': 10,
+                }
+        finally:
+            request_utils.set_http_client(previous_http_client)
+            personal_info.set_cookie_override(previous_cookie_override)
+            request_utils.clear_token_buckets()
+
+        # Each appID is downloaded once per item type, except for the query which failed.
+        assert sorted(queried_app_ids) == ['440', '440', '570', '570', '730']
+
+    def test_find_goo_value_in_cache(self):
+        goo_value_cache = market_arbitrage_with_foil_cards.add_goo_value_to_cache({}, 232770, 15, 40, is_foil=False)
+
+        # The goo value with a foil border is derived from the goo value with the default border, and vice versa.
+        assert market_arbitrage_with_foil_cards.find_goo_value_in_cache(goo_value_cache, 232770, 15) == 400
+        assert market_arbitrage_with_foil_cards.find_goo_value_in_cache(goo_value_cache, 232770, 15, is_foil=False) == 40
+        assert market_arbitrage_with_foil_cards.find_goo_value_in_cache(goo_value_cache, 232770, 2) is None
+
+        goo_value_cache = market_arbitrage_with_foil_cards.add_goo_value_to_cache(goo_value_cache, 232770, 2, 1000)
+        assert market_arbitrage_with_foil_cards.find_goo_value_in_cache(goo_value_cache, 232770, 2, is_foil=False) == 100
+        assert goo_value_cache['232770-2-1']['goo_value'] == 1000
+
+    def test_infer_item_type_for_app_id(self):
+        groups_by_app_id = {
+            232770: ['232770-Card 1 (Foil)', '232770-Card 2 (Foil)'],
+            595770: ['595770-"Frontline" Striker (Foil)'],
+            730: ['730-Card (Foil)'],
+        }
+        known_item_types_for_foil_cards = market_arbitrage_with_foil_cards.build_dictionary_of_known_item_types(
+            {'232770-Card 2 (Foil)': {'item_nameid': 1, 'item_type_no': 16}, '730-Card (Foil)': {'item_nameid': 2}},
+        )
+        all_listing_details_for_normal_cards = {'595770-"Frontline" Striker': {'item_nameid': 3, 'item_type_no': 21}}
+        goo_value_cache = {
+            '730-7-1': {'goo_value': 100, 'fetch_epoch': 0},
+            '730-7-0': {'goo_value': 10, 'fetch_epoch': 0},
+            '440-2-1': {'goo_value': 100, 'fetch_epoch': 0},
+            '440-3-1': {'goo_value': 100, 'fetch_epoch': 0},
+        }
+        item_types_from_goo_value_cache = (
+            market_arbitrage_with_foil_cards.build_dictionary_of_item_types_from_goo_value_cache(goo_value_cache)
+        )
+
+        # The item type of appID 440 is ambiguous, because its goo values were queried with several item types.
+        assert item_types_from_goo_value_cache == {730: 7}
+
+        item_types = {
+            app_id: market_arbitrage_with_foil_cards.infer_item_type_for_app_id(
+                app_id,
+                groups_by_app_id,
+                known_item_types_for_foil_cards,
+                all_listing_details_for_normal_cards,
+                item_types_from_goo_value_cache,
+            )
+            for app_id in [232770, 595770, 730, 440]
+        }
+
+        assert item_types == {232770: 16, 595770: 21, 730: 7, 440: None}
+
+    def test_find_app_ids_with_unknown_item_type_for_their_representatives(self):
+        groups_by_app_id = {
+            1: ['1-A (Foil)'],
+            2: ['2-B (Foil)'],
+            3: ['3-C (Foil)'],
+            4: ['4-D (Foil)'],
+        }
+        all_listing_details = {'1-A (Foil)': {'item_nameid': 1, 'item_type_no': 2}}
+        all_listing_details_for_normal_cards = {
+            '2-B': {'item_nameid': 2, 'item_type_no': 16},
+            '3-C': {'item_nameid': 3, 'item_type_no': 5},
+        }
+
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            goo_value_cache_file_name = str(Path(temporary_folder) / 'goo_value_cache.json')
+
+            # The goo value of appID 3 was queried with the default item type, instead of its inferred item type.
+            goo_value_cache = market_arbitrage_with_foil_cards.add_goo_value_to_cache({}, 2, 16, 100)
+            goo_value_cache = market_arbitrage_with_foil_cards.add_goo_value_to_cache(goo_value_cache, 3, 2, 100)
+            market_arbitrage_with_foil_cards.save_goo_value_cache(goo_value_cache, goo_value_cache_file_name)
+
+            app_ids_with_unreliable_goo_details = (
+                market_arbitrage_with_foil_cards.find_app_ids_with_unknown_item_type_for_their_representatives(
+                    groups_by_app_id=groups_by_app_id,
+                    listing_candidates=[groups_by_app_id[app_id][0] for app_id in groups_by_app_id],
+                    all_listing_details=all_listing_details,
+                    listing_details_output_file_name=str(Path(temporary_folder) / 'listing_details.json'),
+                    all_listing_details_for_normal_cards=all_listing_details_for_normal_cards,
+                    goo_value_cache_file_name=goo_value_cache_file_name,
+                    verbose=False,
+                )
+            )
+
+        assert app_ids_with_unreliable_goo_details == [3, 4]
+
+    def test_find_representative_listing_hash_for_app_id(self):
+        all_listings = {
+            '232770-Card 2 (Foil)': {'sell_price': 10, 'sell_listings': 5},
+            '232770-Card 1 (Foil)': {'sell_price': 10, 'sell_listings': 1},
+            '595770-"Frontline" Striker (Foil)': {'sell_price': 50, 'sell_listings': 3},
+        }
+        groups_by_app_id = market_arbitrage_with_foil_cards.group_listing_hashes_by_app_id(all_listings, verbose=False)
+
+        cheapest_listing_hashes = market_arbitrage_with_foil_cards.find_cheapest_listing_hashes(
+            all_listings,
+            groups_by_app_id,
+        )
+        assert cheapest_listing_hashes == ['232770-Card 2 (Foil)', '595770-"Frontline" Striker (Foil)']
+
+        representative_listing_hashes = market_arbitrage_with_foil_cards.propagate_filter_to_representative_listing_hashes(
+            market_arbitrage_with_foil_cards.find_representative_listing_hashes(groups_by_app_id),
+            cheapest_listing_hashes[:1],
+        )
+        assert representative_listing_hashes == ['232770-Card 1 (Foil)']
+
+        representative_listing_hash = market_arbitrage_with_foil_cards.find_representative_listing_hash_for_app_id(
+            232770,
+            groups_by_app_id,
+            set(representative_listing_hashes),
+        )
+        assert representative_listing_hash == '232770-Card 1 (Foil)'
+
 
 class TestBatchCreatePacksMethods(unittest.TestCase):
     def test_main(self):
@@ -112,5 +1027,129 @@ class TestDropRateEstimatesMethods(unittest.TestCase):
         assert drop_rate_estimates.main() is True
 
 
+class TestRequestUtilsMethods(unittest.TestCase):
+    def test_coalesced_call(self):
+        num_calls = []
+
+        def fetch_function():
+            num_calls.append(1)
+            time.sleep(0.1)
+            return {'success': True}
+
+        request_key = request_utils.get_request_key(
+            'https://steamcommunity.com/market/itemordershistogram',
+            {'item_nameid': '28419077'},
+        )
+
+        threads = [
+            threading.Thread(
+                target=request_utils.coalesced_call,
+                args=(request_key, fetch_function),
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        response = request_utils.coalesced_call(request_key, fetch_function)
+        request_utils.clear_recent_responses()
+
+        assert response == {'success': True}
+        assert len(num_calls) == 1
+
+    def test_coalesced_get_without_memory(self):
+        queried_urls = []
+
+        class CountingClient:
+            def get(self, url, params=None, cookies=None, headers=None):
+                queried_urls.append(url)
+                return steam_simulator.SimulatedResponse(200, {'success': 1})
+
+        url = 'https://steamcommunity.com/market/itemordershistogram'
+        previous_http_client = request_utils.set_http_client(CountingClient())
+
+        try:
+            request_utils.coalesced_get(url, params={'item_nameid': '28419077'})
+            request_utils.coalesced_get(url, params={'item_nameid': '28419077'})
+            assert len(queried_urls) == 1
+
+            # With a freshness of 0 second, the latest data is downloaded, instead of a response kept in memory.
+            request_utils.coalesced_get(url, params={'item_nameid': '28419077'}, freshness_in_seconds=0)
+            assert len(queried_urls) == 2
+        finally:
+            request_utils.set_http_client(previous_http_client)
+            request_utils.clear_recent_responses()
+
+    def test_acquire_rate_limit_token(self):
+        clock = [0.0]
+        endpoint = 'https://steamcommunity.com/tradingcards/ajaxcreatebooster/'
+
+        waiting_times = [
+            request_utils.acquire_rate_limit_token(endpoint, 2, clock=lambda: clock[0], sleep=lambda x: None)
+            for _ in range(3)
+        ]
+
+        # Reserved tokens are queued: 2 requests per second.
+        assert waiting_times == [0, 0.5, 1.0]
+
+        clock[0] = 10.0
+        assert request_utils.acquire_rate_limit_token(endpoint, 2, clock=lambda: clock[0], sleep=lambda x: None) == 0
+
+        request_utils.clear_token_buckets()
+
+
+class TestJsonUtilsMethods(unittest.TestCase):
+    def test_save_json_in_background(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            fname = str(Path(temporary_folder) / 'checkpoint.json')
+
+            data = {'290970-1849 Booster Pack': 28419077}
+            json_utils.save_json_in_background(data, fname, compact=True)
+            data['281160-Ultimate Chicken Horse Booster Pack'] = 20930826
+
+            # Only the snapshot taken when the checkpoint was requested is written to disk.
+            assert json_utils.load_json(fname) == {'290970-1849 Booster Pack': 28419077}
+
+            json_utils.save_json(data, fname)
+            assert json_utils.load_json(fname) == data
+
+            # No temporary file is left behind.
+            assert len(list(Path(temporary_folder).iterdir())) == 1
+
+    def test_load_json_read_only(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            fname = str(Path(temporary_folder) / 'goo_details.json')
+
+            json_utils.save_json({'290970': 60}, fname)
+            data = json_utils.load_json_read_only(fname)
+
+            # Repeated loads share the same read-only view.
+            assert json_utils.load_json_read_only(fname) is data
+            with self.assertRaises(TypeError):
+                data['290970'] = 0
+
+            # Writes invalidate the view.
+            json_utils.save_json({'290970': 80}, fname)
+            assert json_utils.load_json_read_only(fname)['290970'] == 80
+
+
+class TestRankingUtilsMethods(unittest.TestCase):
+    def test_get_top_k(self):
+        profits = {'a': 5, 'b': 40, 'c': 5, 'd': -3, 'e': 12}
+
+        # Same order as a stable sort, including ties.
+        assert ranking_utils.get_top_k(profits, key=profits.get) == sorted(profits, key=profits.get, reverse=True)
+        assert ranking_utils.get_top_k(profits, key=profits.get, k=3) == ['b', 'e', 'a']
+        assert ranking_utils.get_top_k(profits, key=profits.get, threshold=1) == ['b', 'e', 'a', 'c']
+        assert list(ranking_utils.iterate_by_decreasing_key(profits, key=profits.get, threshold=1)) == [
+            'b',
+            'e',
+            'a',
+            'c',
+        ]
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,3 +1,10 @@
+import functools
+
+import numpy as np
+
+from src.money_utils import convert_cents_to_euros, convert_euros_to_cents
+
+
 def get_steam_transaction_fee() -> float:
     # Reference: https://support.steampowered.com/kb_article.php?ref=6088-UDXM-7214#steamfee
 
@@ -14,72 +21,160 @@ def get_game_specific_transaction_fee() -> float:
     return game_specific_transaction_fee
 
 
-def get_ground_truth_sell_price_without_fee(sell_price_including_fee: float) -> float:
-    # Reference: https://steamcommunity.com/discussions/forum/1/1679190184065722423/
-
-    # Manual fit of the fee cost for small prices (less than or equal to 0.66€)
-    if sell_price_including_fee <= 0.21:
-        total_fee_price = 0.02
-    elif sell_price_including_fee <= 0.32:
-        total_fee_price = 0.03
-    elif sell_price_including_fee <= 0.43:
-        total_fee_price = 0.04
-    elif sell_price_including_fee == 0.44:
-        total_fee_price = 0.05
-    elif sell_price_including_fee <= 0.55:
-        total_fee_price = 0.06
-    elif sell_price_including_fee <= 0.66:
-        total_fee_price = 0.07
-    else:
-        raise AssertionError()
-
-    sell_price_without_fee = sell_price_including_fee - total_fee_price
-    sell_price_without_fee = float(f'{sell_price_without_fee:.2f}')
+def get_steam_transaction_fee_in_percent() -> int:
+    return round(100 * get_steam_transaction_fee())
 
-    return sell_price_without_fee
 
+def get_game_specific_transaction_fee_in_percent() -> int:
+    return round(100 * get_game_specific_transaction_fee())
 
-def compute_sell_price_without_fee(sell_price_including_fee: float) -> float:
-    # Caveat: this is not exact! The price without fee can be off by 1 cent!
 
-    price = sell_price_including_fee
+def get_minimum_fee_in_cents() -> int:
+    # Each of the two fees is at least 1 cent.
+    minimum_fee_in_cents = 1
 
-    ###
+    return minimum_fee_in_cents
 
-    steam_transaction_fee = get_steam_transaction_fee()
 
-    steam_transaction_fee_price = max(
-        0.01,
-        price / (1 + steam_transaction_fee) * steam_transaction_fee,
+def get_max_price_in_cents_for_fee_table() -> int:
+    # The maximal price on the Steam Market is 1800€. Prices above this value are computed on the fly.
+    max_price_in_cents = 200000
+
+    return max_price_in_cents
+
+
+def compute_buyer_price_in_cents(seller_price_in_cents: int) -> int:
+    # Objective: return the price paid by the buyer, so that the seller receives the given amount.
+    #
+    # Reference: CalculateAmountToSendForDesiredReceivedAmount() in the JavaScript code of the Steam Market.
+    #
+    # Each fee is rounded down, and is at least 1 cent.
+
+    minimum_fee_in_cents = get_minimum_fee_in_cents()
+
+    steam_transaction_fee_in_cents = max(
+        seller_price_in_cents * get_steam_transaction_fee_in_percent() // 100,
+        minimum_fee_in_cents,
+    )
+    game_specific_transaction_fee_in_cents = max(
+        seller_price_in_cents * get_game_specific_transaction_fee_in_percent() // 100,
+        minimum_fee_in_cents,
     )
-    price -= steam_transaction_fee_price
 
-    ###
+    buyer_price_in_cents = (
+        seller_price_in_cents
+        + steam_transaction_fee_in_cents
+        + game_specific_transaction_fee_in_cents
+    )
+
+    return buyer_price_in_cents
+
 
-    game_specific_transaction_fee = get_game_specific_transaction_fee()
+def find_seller_price_in_cents(buyer_price_in_cents: int) -> int:
+    # Objective: return the amount received by the seller, i.e. the highest amount for which the buyer pays at most the
+    # given price. If the price cannot be matched exactly, the extra cent is kept by Steam.
+    #
+    # NB: this is the slow path, used to fill in the lookup table, and for prices outside of the lookup table.
 
-    game_specific_transaction_fee_price = max(
-        0.01,
-        price / (1 + game_specific_transaction_fee) * game_specific_transaction_fee,
+    if buyer_price_in_cents < compute_buyer_price_in_cents(0):
+        # This happens for invalid prices, e.g. -1 if the price could not be retrieved. Both minimal fees are deducted,
+        # so that the result stays negative.
+        return buyer_price_in_cents - compute_buyer_price_in_cents(0)
+
+    total_fee_percent = (
+        100
+        + get_steam_transaction_fee_in_percent()
+        + get_game_specific_transaction_fee_in_percent()
     )
-    price -= game_specific_transaction_fee_price
+    seller_price_in_cents = max(buyer_price_in_cents * 100 // total_fee_percent - 2, 0)
 
-    ###
+    while compute_buyer_price_in_cents(seller_price_in_cents + 1) <= buyer_price_in_cents:
+        seller_price_in_cents += 1
 
-    total_fee_price = steam_transaction_fee_price + game_specific_transaction_fee_price
+    return seller_price_in_cents
 
-    sell_price_without_fee = sell_price_including_fee - total_fee_price
-    sell_price_without_fee = float(f'{sell_price_without_fee:.2f}')
 
-    # Manually adjust the fee cost for small prices (until I have access to the right formula)
-    if sell_price_including_fee <= 0.66:
-        sell_price_without_fee = get_ground_truth_sell_price_without_fee(
-            sell_price_including_fee,
+@functools.cache
+def get_fee_tables() -> dict[str, np.ndarray]:
+    # Precompute both directions once, so that scalar and vectorized lookups are O(1):
+    # - 'buyer_price': seller receives (index, in cents) -> buyer pays (in cents),
+    # - 'seller_price': buyer pays (index, in cents) -> seller receives (in cents).
+
+    seller_prices = np.arange(get_max_price_in_cents_for_fee_table() + 1, dtype=np.int64)
+
+    buyer_prices = (
+        seller_prices
+        + np.maximum(
+            seller_prices * get_steam_transaction_fee_in_percent() // 100,
+            get_minimum_fee_in_cents(),
+        )
+        + np.maximum(
+            seller_prices * get_game_specific_transaction_fee_in_percent() // 100,
+            get_minimum_fee_in_cents(),
         )
+    )
+
+    # Buyer prices are sorted, so the seller price for a buyer price b is the last seller price s such that B(s) <= b.
+    buyer_price_range = np.arange(get_max_price_in_cents_for_fee_table() + 1, dtype=np.int64)
+    seller_prices_for_buyer_prices = (
+        np.searchsorted(buyer_prices, buyer_price_range, side='right') - 1
+    )
+
+    # Below the minimal buyer price, follow the convention of find_seller_price_in_cents().
+    is_below_minimum = seller_prices_for_buyer_prices < 0
+    seller_prices_for_buyer_prices[is_below_minimum] = (
+        buyer_price_range[is_below_minimum] - buyer_prices[0]
+    )
+
+    fee_tables = {
+        'buyer_price': buyer_prices,
+        'seller_price': seller_prices_for_buyer_prices,
+    }
+
+    return fee_tables
+
+
+def compute_seller_price_in_cents(buyer_price_in_cents: int) -> int:
+    seller_price_table = get_fee_tables()['seller_price']
+
+    if 0 <= buyer_price_in_cents < len(seller_price_table):
+        return int(seller_price_table[buyer_price_in_cents])
+
+    return find_seller_price_in_cents(buyer_price_in_cents)
+
+
+def compute_seller_prices_in_cents(buyer_prices_in_cents: np.ndarray) -> np.ndarray:
+    buyer_prices_in_cents = np.asarray(buyer_prices_in_cents, dtype=np.int64)
+    seller_price_table = get_fee_tables()['seller_price']
+
+    is_in_table = (buyer_prices_in_cents >= 0) & (buyer_prices_in_cents < len(seller_price_table))
+
+    seller_prices_in_cents = seller_price_table[np.where(is_in_table, buyer_prices_in_cents, 0)]
+
+    for i in np.flatnonzero(~is_in_table):
+        seller_prices_in_cents[i] = find_seller_price_in_cents(int(buyer_prices_in_cents[i]))
+
+    return seller_prices_in_cents
+
+
+def compute_sell_price_without_fee(sell_price_including_fee: float) -> float:
+    # Wrapper of compute_seller_price_in_cents() for prices in euros, e.g. for display.
+    sell_price_without_fee = convert_cents_to_euros(
+        compute_seller_price_in_cents(convert_euros_to_cents(sell_price_including_fee)),
+    )
 
     return sell_price_without_fee
 
 
+def compute_sell_prices_without_fee(sell_prices_including_fee: np.ndarray) -> np.ndarray:
+    # Vectorized version of compute_sell_price_without_fee().
+    sell_prices_without_fee = convert_cents_to_euros(
+        compute_seller_prices_in_cents(np.rint(100 * np.asarray(sell_prices_including_fee, dtype=float))),
+    )
+
+    return sell_prices_without_fee
+
+
 def main() -> bool:
     print('With fee\t\tWithout fee')
     for i in range(3, 25):
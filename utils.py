@@ -124,6 +124,13 @@ def get_goo_details_file_nam_for_for_foil_cards() -> str:
     return goo_details_file_nam_for_for_foil_cards
 
 
+def get_goo_value_cache_file_name() -> str:
+    # Goo values keyed by appID, item type and border color, so that each distinct item is queried at most once.
+    goo_value_cache_file_name = get_data_folder() + 'goo_value_cache.json'
+
+    return goo_value_cache_file_name
+
+
 def get_sack_of_gems_listing_file_name() -> str:
     sack_of_gems_listing_file_name = get_data_folder() + 'listing_sack_of_gems.json'
 
@@ -154,6 +161,12 @@ def get_next_creation_time_file_name() -> str:
     return next_creation_time_file_name
 
 
+def get_market_store_file_name() -> str:
+    market_store_file_name = get_data_folder() + 'market_data.sqlite'
+
+    return market_store_file_name
+
+
 def main() -> bool:
     for file_name in (
         get_badge_creation_file_name(from_javascript=False),
@@ -163,6 +176,7 @@ def main() -> bool:
         get_market_order_file_name(),
         get_next_creation_time_file_name(),
         get_listing_details_output_file_name(),
+        get_market_store_file_name(),
     ):
         print(file_name)
 
@@ -181,6 +195,12 @@ def get_listing_hash_suffixe() -> str:
     return listing_hash_suffixe
 
 
+def get_foil_suffix() -> str:
+    foil_suffix = ' (Foil)'
+
+    return foil_suffix
+
+
 def convert_listing_hash_to_app_name(listing_hash: str) -> str:
     tokens = listing_hash.split('-')[1:]
 
@@ -226,6 +246,12 @@ def get_category_name_for_booster_packs() -> str:
     return category_name
 
 
+def get_category_name_for_foil_cards() -> str:
+    category_name = 'foil cards'
+
+    return category_name
+
+
 def get_category_name_for_profile_backgrounds() -> str:
     category_name = 'profile backgrounds'
 